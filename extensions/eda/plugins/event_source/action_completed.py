@@ -0,0 +1,203 @@
+"""
+action_completed.py
+
+ansible-rulebook event source plugin that reports finished actions.
+
+Actions are watched using the highest action ID seen so far: every action
+scheduled afterwards, and every action still in progress when the source
+starts, is reported once all of its systems completed or failed. The
+schedule API doesn't filter actions by ID or date, so every check lists
+all completed, failed and in progress actions of the user - choose the
+delay accordingly on servers keeping a long action history.
+
+Arguments:
+  - hostname: SUSE Manager/Uyuni hostname or IP address
+  - username: API username
+  - password: API password
+  - port: API port (default: 443)
+  - verify: verify the SSL certificate (default: false)
+  - delay: seconds between checks (default: 30)
+  - action_types: only report actions of these types (e.g. Patch Update)
+  - since_id: report all actions with a greater ID instead of only
+    actions finishing after the start
+  - queue_size: maximum number of pending events, checks are paused while
+    the queue is full (default: 1000)
+
+Events:
+  action_id, action_name, action_type, scheduler, earliest and
+  successful (no system failed), plus systems - a list of id, name,
+  successful, message and timestamp for every system
+
+Examples:
+  sources:
+    - stdevel.uyuni.action_completed:
+        hostname: uiuiuiuyuni.local.loc
+        username: admin
+        password: admin
+        action_types:
+          - Patch Update
+
+"""
+import asyncio
+from typing import Any, Dict
+import logging
+from ansible_collections.stdevel.uyuni.plugins.module_utils.uyuni_async import (
+    AsyncUyuniAPIClient
+)
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ActionTracker:
+    """
+    Keeps track of actions that haven't been reported yet
+    """
+
+    def __init__(self, since_id=None):
+        """
+        Constructor creating the tracker
+
+        :param since_id: report actions with a greater ID, by default
+            actions finished before the first check are not reported
+        :type since_id: int
+        """
+        self.high_water_mark = since_id
+        self.pending = set()
+        self._next_state = None
+
+    def update(self, actions):
+        """
+        Returns the actions that finished since the last confirmed update.
+        They are returned again by the next update unless reporting them
+        is confirmed.
+
+        :param actions: actions by state as returned by get_actions_by_state
+        :type actions: dict
+        """
+        finished = {
+            x["id"]: x for x in actions["completed"] + actions["failed"]
+        }
+        in_progress = {x["id"] for x in actions["in_progress"]}
+        listed = set(finished) | in_progress
+
+        if self.high_water_mark is None:
+            # first check - only wait for actions still in progress
+            self._next_state = (max(listed, default=0), in_progress)
+            return []
+
+        pending = self.pending | {
+            x for x in listed if x > self.high_water_mark
+        }
+        done = sorted(
+            x for x in pending if x in finished and x not in in_progress
+        )
+        # forget reported actions and actions that were deleted
+        self._next_state = (
+            max(listed | {self.high_water_mark}),
+            (pending & listed) - set(done)
+        )
+        return [finished[x] for x in done]
+
+    def confirm(self):
+        """
+        Forgets the actions returned by the last update after they were
+        reported
+        """
+        if self._next_state is not None:
+            self.high_water_mark, self.pending = self._next_state
+            self._next_state = None
+
+
+def _event(action, systems):
+    """
+    Returns the event for a finished action
+    """
+    results = [
+        {
+            "id": system["server_id"],
+            "name": system.get("server_name"),
+            "successful": state == "completed",
+            "message": system.get("message"),
+            "timestamp": str(system.get("timestamp")),
+        }
+        for state in ("completed", "failed") for system in systems[state]
+    ]
+    return {
+        "action_id": action["id"],
+        "action_name": action.get("name"),
+        "action_type": action.get("type"),
+        "scheduler": action.get("scheduler"),
+        "earliest": str(action.get("earliest")),
+        "successful": not systems["failed"],
+        "systems": results,
+    }
+
+
+async def _watch(api_client, events, args):
+    """
+    Checks for finished actions once per interval and queues an event for
+    every action
+    """
+    delay = args.get("delay", 30)
+    action_types = args.get("action_types")
+    tracker = ActionTracker(args.get("since_id"))
+
+    while True:
+        try:
+            finished = tracker.update(await api_client.get_actions_by_state())
+            if action_types:
+                finished = [x for x in finished if x.get("type") in action_types]
+            systems = await api_client.get_actions_systems(
+                [x["id"] for x in finished]
+            )
+        except Exception as err:  # pylint: disable=broad-except
+            LOGGER.warning("Unable to check for finished actions: %s", err)
+        else:
+            for action in finished:
+                # blocks while the queue is full
+                await events.put(_event(action, systems[action["id"]]))
+            # only forget the actions once their events are queued
+            tracker.confirm()
+        await asyncio.sleep(delay)
+
+
+async def main(queue: asyncio.Queue, args: Dict[str, Any]):
+    """
+    Main function that queries the Uyuni and returns finished actions
+    """
+    events = asyncio.Queue(maxsize=args.get("queue_size", 1000))
+
+    # access the Uyuni API without blocking the event loop
+    async with AsyncUyuniAPIClient(
+        logging.ERROR,
+        args.get("hostname"),
+        args.get("username"),
+        args.get("password"),
+        port=args.get("port", 443),
+        verify=args.get("verify", False)
+    ) as api_client:
+        watcher = asyncio.create_task(_watch(api_client, events, args))
+        try:
+            while True:
+                event = await events.get()
+                await queue.put(event)
+                events.task_done()
+        finally:
+            watcher.cancel()
+
+
+if __name__ == "__main__":
+
+    class MockQueue:
+        """
+        Mock queue class
+        """
+
+        async def put(self, event):
+            """
+            Function that simply prints the event
+            """
+            print(event)
+
+    mock_arguments = {}
+    asyncio.run(main(MockQueue(), mock_arguments))
@@ -1,14 +1,28 @@
 """
 requires_reboot.py
 
-ansible-rulebook event source plugin that lists all hosts that require a reboot.
+ansible-rulebook event source plugin that reports hosts whose reboot
+requirement changed.
+
+The list of systems requiring a reboot is fetched once per interval and
+compared with the previous one. An event is only emitted when a host
+started (requires_reboot: true) or stopped (requires_reboot: false)
+requiring a reboot. Hosts requiring a reboot when the source starts are
+reported once unless initial_state is false.
 
 Arguments:
   - hostname: SUSE Manager/Uyuni hostname or IP address
   - username: API username
   - password: API password
-  - delay: seconds to wait between events
-  - hosts: list of hosts to check for reboots
+  - port: API port (default: 443)
+  - verify: verify the SSL certificate (default: false)
+  - delay: seconds between checks (default: 60)
+  - hosts: list of hosts to watch (default: all systems)
+  - group: system group whose members are watched (default: all systems),
+    the source fails if the group doesn't exist
+  - initial_state: report hosts requiring a reboot on start (default: true)
+  - queue_size: maximum number of pending events, checks are paused while
+    the queue is full (default: 1000)
 
 Examples:
   sources:
@@ -20,48 +34,103 @@ Examples:
         hosts:
           - uyuni-client.pinkepank.loc
 
+    - stdevel.uyuni.requires_reboot:
+        hostname: uiuiuiuyuni.local.loc
+        username: admin
+        password: admin
+        group: webservers
+
 """
 import asyncio
 from typing import Any, Dict
-from pyuyuni.management import JSONHTTPClient
-from pyuyuni.hosts import list_systems_requiring_reboot
 import logging
+from ansible_collections.stdevel.uyuni.plugins.module_utils.reboot import (
+    RebootSnapshot
+)
+from ansible_collections.stdevel.uyuni.plugins.module_utils.uyuni_async import (
+    AsyncUyuniAPIClient
+)
 
+LOGGER = logging.getLogger(__name__)
 
-async def main(queue: asyncio.Queue, args: Dict[str, Any]):
+
+async def _requiring_reboot(api_client, snapshot, hosts, group):
     """
-    Main function that queries the Uyuni and returns whether hosts require reboots
+    Returns the names of watched hosts that currently require a reboot
+    """
+    systems = await api_client.get_systems_requiring_reboot()
+    snapshot.update(systems)
+    if hosts:
+        return {x for x in hosts if snapshot.requires_reboot(x)}
+    if group:
+        members = set((await api_client.get_hosts_by_hostgroups(
+            [group], strict=True
+        ))[group])
+        return {x["name"] for x in systems if x["id"] in members}
+    return set(snapshot.names)
+
+
+async def _watch(api_client, events, args):
+    """
+    Checks the watched hosts once per interval and queues an event for
+    every host whose reboot requirement changed
     """
     delay = args.get("delay", 60)
     hosts = args.get("hosts", [])
+    group = args.get("group")
+    snapshot = RebootSnapshot(ttl=delay)
+
+    previous = None
+    while True:
+        try:
+            current = await _requiring_reboot(api_client, snapshot, hosts, group)
+        except Exception as err:  # pylint: disable=broad-except
+            LOGGER.warning("Unable to check for required reboots: %s", err)
+        else:
+            if previous is None:
+                previous = set() if args.get("initial_state", True) else current
+            # putting events blocks while the queue is full
+            for host in sorted(current - previous):
+                await events.put({"host": host, "requires_reboot": True})
+            for host in sorted(previous - current):
+                await events.put({"host": host, "requires_reboot": False})
+            previous = current
+        await asyncio.sleep(delay)
+
+
+async def main(queue: asyncio.Queue, args: Dict[str, Any]):
+    """
+    Main function that queries the Uyuni and returns whether hosts require reboots
+    """
     hostname = args.get("hostname")
     username = args.get("username")
     password = args.get("password")
     port = args.get("port", 443)
     verify = args.get("verify", False)
+    events = asyncio.Queue(maxsize=args.get("queue_size", 1000))
 
-    # access the Uyuni API
-    api_client = JSONHTTPClient(
+    # access the Uyuni API without blocking the event loop
+    async with AsyncUyuniAPIClient(
         logging.ERROR,
         hostname,
         username,
         password,
-        port,
-        verify
-    )
-
-    while True:
-        _systems = list_systems_requiring_reboot(api_client)
-        for host in hosts:
-            print(f"checking host {host}")
-            _flag = True if host in _systems else False
-            await queue.put(
-                {
-                    "host": host,
-                    "requires_reboot": _flag
-                }
+        port=port,
+        verify=verify
+    ) as api_client:
+        if args.get("group"):
+            # fail instead of watching nothing, raises EmptySetException
+            await api_client.get_hosts_by_hostgroups(
+                [args.get("group")], strict=True
             )
-            await asyncio.sleep(delay)
+        watcher = asyncio.create_task(_watch(api_client, events, args))
+        try:
+            while True:
+                event = await events.get()
+                await queue.put(event)
+                events.task_done()
+        finally:
+            watcher.cancel()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,19 @@
+"""
+Action plugin running the apply_highstate module on the controller
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+from ..modules import apply_highstate
+from ..plugin_utils.action import UyuniActionBase
+
+__metaclass__ = type
+
+
+class ActionModule(UyuniActionBase):
+    """
+    Applies a host's highstate using a shared API client
+    """
+
+    _MODULE = apply_highstate
+    _RUN = '_apply_highstate'
@@ -0,0 +1,19 @@
+"""
+Action plugin running the apply_states module on the controller
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+from ..modules import apply_states
+from ..plugin_utils.action import UyuniActionBase
+
+__metaclass__ = type
+
+
+class ActionModule(UyuniActionBase):
+    """
+    Applies states for a host using a shared API client
+    """
+
+    _MODULE = apply_states
+    _RUN = '_apply_states'
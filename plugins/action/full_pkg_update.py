@@ -0,0 +1,19 @@
+"""
+Action plugin running the full_pkg_update module on the controller
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+from ..modules import full_pkg_update
+from ..plugin_utils.action import UyuniActionBase
+
+__metaclass__ = type
+
+
+class ActionModule(UyuniActionBase):
+    """
+    Installs all available updates on a host using a shared API client
+    """
+
+    _MODULE = full_pkg_update
+    _RUN = '_full_pkg_update'
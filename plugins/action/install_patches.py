@@ -0,0 +1,19 @@
+"""
+Action plugin running the install_patches module on the controller
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+from ..modules import install_patches
+from ..plugin_utils.action import UyuniActionBase
+
+__metaclass__ = type
+
+
+class ActionModule(UyuniActionBase):
+    """
+    Installs patches on managed hosts using a shared API client
+    """
+
+    _MODULE = install_patches
+    _RUN = '_install_patches'
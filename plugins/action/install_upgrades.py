@@ -0,0 +1,19 @@
+"""
+Action plugin running the install_upgrades module on the controller
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+from ..modules import install_upgrades
+from ..plugin_utils.action import UyuniActionBase
+
+__metaclass__ = type
+
+
+class ActionModule(UyuniActionBase):
+    """
+    Installs package upgrades on a host using a shared API client
+    """
+
+    _MODULE = install_upgrades
+    _RUN = '_install_upgrades'
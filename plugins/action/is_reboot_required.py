@@ -0,0 +1,19 @@
+"""
+Action plugin running the is_reboot_required module on the controller
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+from ..modules import is_reboot_required
+from ..plugin_utils.action import UyuniActionBase
+
+__metaclass__ = type
+
+
+class ActionModule(UyuniActionBase):
+    """
+    Checks whether a host requires a reboot using a shared API client
+    """
+
+    _MODULE = is_reboot_required
+    _RUN = '_is_reboot_required'
@@ -0,0 +1,19 @@
+"""
+Action plugin running the openscap_run module on the controller
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+from ..modules import openscap_run
+from ..plugin_utils.action import UyuniActionBase
+
+__metaclass__ = type
+
+
+class ActionModule(UyuniActionBase):
+    """
+    Schedules an OpenSCAP run on a host using a shared API client
+    """
+
+    _MODULE = openscap_run
+    _RUN = '_schedule_openscap_run'
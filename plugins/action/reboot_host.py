@@ -0,0 +1,19 @@
+"""
+Action plugin running the reboot_host module on the controller
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+from ..modules import reboot_host
+from ..plugin_utils.action import UyuniActionBase
+
+__metaclass__ = type
+
+
+class ActionModule(UyuniActionBase):
+    """
+    Reboots a host using a shared API client
+    """
+
+    _MODULE = reboot_host
+    _RUN = '_reboot_host'
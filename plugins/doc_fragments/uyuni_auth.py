@@ -29,4 +29,69 @@ options:
     description: Uyuni login password
     required: True
     type: str
+  uyuni_cache_dir:
+    description:
+      - Directory for caching data like hostname to system ID resolutions between tasks and hosts.
+      - Use a directory on the host executing the module, e.g. C(~/.ansible/tmp/uyuni).
+      - Nothing is cached between tasks if not set.
+    type: path
+  uyuni_session_cache:
+    description:
+      - Reuse API sessions between tasks and hosts instead of logging in and out for every task.
+      - Session keys are stored in a file only readable by the current user below C(uyuni_cache_dir) or C(~/.ansible/tmp/uyuni).
+      - Expired sessions are renewed transparently, only one worker starts a new session and logs out the expired one.
+      - Shared sessions are not logged out at the end of a task, they are ended by the server's session timeout otherwise.
+    default: False
+    type: bool
+  uyuni_validate_api:
+    description:
+      - Check whether the API version of the Uyuni server is supported.
+      - The version is cached per server for a day (on disk if C(uyuni_cache_dir) is set).
+    default: True
+    type: bool
+  uyuni_retries:
+    description:
+      - Maximum retries of API calls that failed because the server was unavailable or overloaded (connection errors, HTTP 429, 502, 503, 504).
+      - Only calls reading data are retried, with exponential backoff and jitter.
+      - Calls changing data (e.g. scheduling actions) are only retried if the connection was refused.
+      - After 5 such failures in a row, calls fail immediately for 30 seconds to relieve the server.
+      - If C(uyuni_cache_dir) is set, these failures are counted for all tasks on the host running the module, e.g. all forks of a play.
+      - C(0) disables retries.
+    default: 3
+    type: int
+  uyuni_max_requests_per_second:
+    description:
+      - Limits the API requests per second sent to a server by all tasks on the host running the module, e.g. all forks of a play.
+      - Requests are coordinated through lock files below C(uyuni_cache_dir) or C(~/.ansible/tmp/uyuni).
+      - C(0) disables the limit.
+    default: 0
+    type: float
+  uyuni_max_in_flight:
+    description:
+      - Limits the API requests sent to a server at the same time by all tasks on the host running the module.
+      - Requests are coordinated like for C(uyuni_max_requests_per_second).
+      - C(0) disables the limit.
+    default: 0
+    type: int
+  uyuni_metrics:
+    description:
+      - Add a summary of the API calls made by the task to the result as C(uyuni_metrics).
+      - It lists calls, errors, seconds, transferred bytes, retries and fault codes per API method, slowest first.
+    default: False
+    type: bool
+  uyuni_metrics_textfile:
+    description:
+      - Write API call metrics (counters and a latency histogram per method) to this file for the node_exporter textfile collector.
+      - The calls of every task are added to the counters in the file.
+      - The counters are kept in a state file with the additional suffix C(.json) next to it, so all hosts and forks can share a path.
+      - For example C(/var/lib/node_exporter/uyuni.prom).
+    type: path
+  uyuni_trace_file:
+    description:
+      - Append a span per API call in the OTLP/JSON format to this file, e.g. for the OpenTelemetry Collector's otlpjsonfile receiver.
+    type: path
+  uyuni_trace_endpoint:
+    description:
+      - Send a span per API call to this OTLP/HTTP traces endpoint, e.g. C(http://localhost:4318/v1/traces).
+    type: str
 '''
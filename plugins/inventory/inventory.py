@@ -26,6 +26,8 @@ DOCUMENTATION = '''
     short_description: Uyuni inventory source
     author:
         - Christian Stankowic (@stdevel)
+    extends_documentation_fragment:
+        - inventory_cache
     description:
         - Get inventory hosts from the Uyuni API.
         - "Uses a configuration file as an inventory source, it must end in
@@ -92,6 +94,37 @@ DOCUMENTATION = '''
         description: Limits to systems requiring a reboot only
         type: boolean
         default: false
+      max_workers:
+        description:
+          - Number of threads fetching group memberships, network information and custom values in parallel.
+          - Every thread uses its own API session.
+        type: int
+        default: 1
+      retries:
+        description:
+          - Maximum retries of API calls that failed because the server was unavailable or overloaded, with exponential backoff.
+          - C(0) disables retries.
+        type: int
+        default: 3
+      max_requests_per_second:
+        description: Limits the API requests per second sent by all threads, C(0) disables the limit.
+        type: float
+        default: 0
+      incremental:
+        description:
+          - Keeps a local snapshot of the fetched systems and only re-fetches systems that appeared
+            or whose last check-in or boot time changed since the previous run.
+        type: boolean
+        default: false
+      incremental_snapshot:
+        description:
+          - Path of the snapshot file used by O(incremental).
+          - Defaults to a file per inventory source below C(~/.ansible/tmp/uyuni).
+        type: path
+      incremental_max_age:
+        description: Seconds after which systems are re-fetched even if they didn't change.
+        type: int
+        default: 86400
 '''
 
 EXAMPLES = r'''
@@ -109,6 +142,18 @@ groups:
   - demo
 ...
 
+---
+# cache the inventory for an hour, repeated runs don't log in at all
+plugin: stdevel.uyuni.inventory
+host: 192.168.180.1
+user: admin
+password: admin
+cache: true
+cache_plugin: ansible.builtin.jsonfile
+cache_connection: /tmp/uyuni_inventory
+cache_timeout: 3600
+...
+
 ---
 # for use in AWX / AAP (Inventory Source "Sourced from a Project"),
 # together with a custom credential that injects environment variables UYUNI_HOST, UYUNI_USER, UYUNI_PASSWORD
@@ -117,10 +162,18 @@ show_custom_values: true
 ...
 '''
 
+import hashlib
+import os
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from ansible.plugins.inventory import (
     BaseInventoryPlugin, Constructable, Cacheable
 )
+from ..module_utils.cache import JSONFileStore, default_cache_dir
 from ..module_utils.helper_functions import _configure_connection
+from ..module_utils.ratelimit import RateLimiter
 
 
 class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
@@ -143,6 +196,9 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
         self.password = None
         self.port = None
         self.verify_ssl = None
+        self.rate_limiter = None
+        self._config_path = None
+        self._worker_instances = queue.SimpleQueue()
 
     def verify_file(self, path):
         """
@@ -158,83 +214,243 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
                 )
         return valid
 
+    def _connection_params(self):
+        """
+        Returns the API connection parameters
+        """
+        return dict(
+            host=str(self.get_option('host')),
+            username=str(self.get_option('user')),
+            password=str(self.get_option('password')),
+            port=str(self.get_option('port')),
+            verify_ssl=self.get_option('verify_ssl'),
+            rate_limiter=self.rate_limiter,
+            retries=self.get_option('retries')
+        )
+
     def _api_connect(self):
         """
         Connects to the Uyuni API
         """
-        self.api_instance = _configure_connection(
-            dict(
-                host=str(self.get_option('host')),
-                username=str(self.get_option('user')),
-                password=str(self.get_option('password')),
-                port=str(self.get_option('port')),
-                verify_ssl=self.get_option('verify_ssl')
+        if self.get_option('max_requests_per_second'):
+            self.rate_limiter = RateLimiter(
+                self.get_option('max_requests_per_second')
             )
-        )
+        self.api_instance = _configure_connection(self._connection_params())
 
-    def _populate(self):
-        # get groups and hosts
-        all_groups = self.api_instance.get_all_hostgroups()
-        hosts = self.api_instance.get_all_hosts()
+    def _worker_call(self, method, items):
+        """
+        Calls a bulk API method using an idle worker API instance
+        """
+        try:
+            api_instance = self._worker_instances.get_nowait()
+        except queue.Empty:
+            params = self._connection_params()
+            params['pool_size'] = 1
+            api_instance = _configure_connection(params)
+        try:
+            return getattr(api_instance, method)(items)
+        finally:
+            self._worker_instances.put(api_instance)
 
-        if self.get_option('groups'):
-            # limit to group selection
-            groups = [x for x in all_groups if x in self.get_option('groups')]
-        else:
-            # all groups
-            groups = all_groups
+    def _close_workers(self):
+        """
+        Ends the sessions of the worker API instances
+        """
+        while True:
+            try:
+                api_instance = self._worker_instances.get_nowait()
+            except queue.Empty:
+                return
+            api_instance.logout()
 
-        for group in groups:
-            # add selected/all groups
-            self.inventory.add_group(group)
+    def _fetch(self, method, items):
+        """
+        Calls a bulk API method returning a dict for items, splitting the
+        items across max_workers threads - results are merged in order
+        """
+        max_workers = self.get_option('max_workers') or 1
+        if max_workers <= 1 or len(items) <= 1:
+            return getattr(self.api_instance, method)(items)
 
-        # get systems requiring reboot
-        _reboot = self.api_instance.get_hosts_by_required_reboot()
+        chunk_size = min(
+            -(-len(items) // max_workers),
+            self.api_instance.MULTICALL_BATCH_SIZE
+        )
+        chunks = [
+            items[x:x + chunk_size] for x in range(0, len(items), chunk_size)
+        ]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(
+                lambda chunk: self._worker_call(method, chunk), chunks
+            )
+            merged = {}
+            for result in results:
+                merged.update(result)
+        return merged
 
-        # add _all_ the hosts
-        for host in hosts:
-            # get host groups
-            _groups = self.api_instance.get_hostgroups_by_host(int(host['id']))
+    def _fetch_data(self):
+        """
+        Fetches groups and hosts including their network information,
+        group memberships and custom values from the API
+        """
+        try:
+            # get groups and hosts
+            all_groups = self.api_instance.get_all_hostgroups()
+            hosts = self.api_instance.get_all_hosts()
 
             if self.get_option('groups'):
-                # only add if host is filtered groups
-                if not any(x in _groups for x in self.get_option('groups')):
-                    continue
-
-            # check if reboot required
-            if self.get_option('pending_reboot_only'):
-                try:
-                    if host['name'] not in _reboot:
+                # limit to group selection
+                groups = [x for x in all_groups if x in self.get_option('groups')]
+            else:
+                # all groups
+                groups = all_groups
+
+            # get group memberships once per group instead of once per host
+            _groups = {}
+            for group, members in self._fetch('get_hosts_by_hostgroups', groups).items():
+                for member in members:
+                    _groups.setdefault(member, []).append(group)
+
+            # get systems requiring reboot
+            _reboot = self.api_instance.reboot_snapshot
+
+            # filter _all_ the hosts
+            selected = []
+            for host in hosts:
+                if self.get_option('groups'):
+                    # only add if host is filtered groups
+                    if not _groups.get(host['id']):
+                        continue
+
+                # check if reboot required
+                if self.get_option('pending_reboot_only'):
+                    if not _reboot.requires_reboot(int(host['id'])):
                         continue
-                except TypeError:
-                    continue
+                selected.append(host)
+
+            # get IP addresses and parameters in bulk
+            _details = self._fetch_details(selected)
+
+            return dict(
+                groups=groups,
+                hosts=[
+                    dict(
+                        id=int(host['id']),
+                        name=host['name'],
+                        groups=_groups.get(host['id'], []),
+                        **_details[str(host['id'])]
+                    ) for host in selected
+                ]
+            )
+        finally:
+            self._close_workers()
+
+    def _fetch_details(self, hosts):
+        """
+        Returns addresses and custom values by system ID. In incremental
+        mode, only new and changed systems are fetched from the API.
+        """
+        store = None
+        snapshot = {}
+        options = dict(show_custom_values=bool(self.get_option('show_custom_values')))
+        if self.get_option('incremental'):
+            store = JSONFileStore(self._snapshot_path())
+            snapshot = store.load()
+            if snapshot.get('options') != options:
+                snapshot = {}
+        systems = snapshot.get('systems', {})
+
+        now = time.time()
+        changed = []
+        for host in hosts:
+            system = systems.get(str(host['id']))
+            if (
+                not system or
+                system['last_checkin'] != str(host.get('last_checkin')) or
+                system['last_boot'] != str(host.get('last_boot')) or
+                now - system['fetched'] > self.get_option('incremental_max_age')
+            ):
+                changed.append(host)
+        self.display.vvv(
+            f"Fetching details of {len(changed)} out of {len(hosts)} systems"
+        )
 
+        _ids = [int(host['id']) for host in changed]
+        _network = self._fetch('get_hosts_network', _ids)
+        _params = {}
+        if self.get_option('show_custom_values'):
+            _params = self._fetch('get_hosts_params', _ids)
+
+        for host in changed:
+            systems[str(host['id'])] = dict(
+                last_checkin=str(host.get('last_checkin')),
+                last_boot=str(host.get('last_boot')),
+                fetched=now,
+                details=dict(
+                    ip=_network[int(host['id'])].get('ip'),
+                    ip6=_network[int(host['id'])].get('ip6'),
+                    params=_params.get(int(host['id']), {})
+                )
+            )
+
+        # forget systems that disappeared
+        details = {
+            str(host['id']): systems[str(host['id'])]['details'] for host in hosts
+        }
+        if store:
+            store.save(dict(
+                options=options,
+                updated=now,
+                systems={
+                    str(host['id']): systems[str(host['id'])] for host in hosts
+                }
+            ))
+        return details
+
+    def _snapshot_path(self):
+        """
+        Returns the path of the incremental snapshot file
+        """
+        if self.get_option('incremental_snapshot'):
+            return self.get_option('incremental_snapshot')
+        source = hashlib.sha1(
+            f"{self._config_path}:{self.get_option('host')}:{self.get_option('user')}".encode('utf-8')
+        ).hexdigest()
+        return os.path.join(default_cache_dir(), f"inventory_{source}.json")
+
+    def _populate(self, data):
+        """
+        Adds fetched groups and hosts to the inventory
+        """
+        for group in data['groups']:
+            # add selected/all groups
+            self.inventory.add_group(group)
+
+        for host in data['hosts']:
             # add host
             self.inventory.add_host(host['name'])
 
-            # get IP address
-            _network = self.api_instance.get_host_network(int(host['id']))
+            # set IP address
             if self.get_option('ipv6_only'):
                 self.inventory.set_variable(
-                    host['name'], 'ansible_host', _network['ip6']
+                    host['name'], 'ansible_host', host['ip6']
                 )
             else:
                 self.inventory.set_variable(
-                    host['name'], 'ansible_host', _network['ip']
+                    host['name'], 'ansible_host', host['ip']
                 )
 
             # add parameters
             if self.get_option('show_custom_values'):
-                _params = self.api_instance.get_host_params(int(host['id']))
-                for param in _params:
+                for param, value in host['params'].items():
                     self.inventory.set_variable(
-                        host['name'], param, _params[param]
+                        host['name'], param, value
                     )
 
             # add hostgroups
-            for _group in _groups:
-                if _group in groups:
-                    self.inventory.add_child(_group, host['name'])
+            for _group in host['groups']:
+                self.inventory.add_child(_group, host['name'])
 
     def parse(self, inventory, loader, path, cache=True):
         """
@@ -244,9 +460,30 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
 
         # read config from file, this sets 'options'
         self._read_config_data(path)
+        self._config_path = os.path.abspath(path)
+
+        cache_key = self.get_cache_key(path)
+        # cache may be True or False at this point to indicate if the
+        # inventory is being refreshed, get the user's cache option too
+        user_cache_setting = self.get_option('cache')
+        attempt_to_read_cache = user_cache_setting and cache
+        cache_needs_update = user_cache_setting and not cache
+
+        data = None
+        if attempt_to_read_cache:
+            try:
+                data = self._cache[cache_key]
+            except KeyError:
+                # cache expired or doesn't exist yet
+                cache_needs_update = True
+
+        if data is None:
+            # create API instance
+            self._api_connect()
+            data = self._fetch_data()
 
-        # create API instance
-        self._api_connect()
+        if cache_needs_update:
+            self._cache[cache_key] = data
 
         # create inventory
-        self._populate()
+        self._populate(data)
@@ -0,0 +1,468 @@
+"""
+Persistent caches for Uyuni API data
+"""
+
+from __future__ import (absolute_import, division, print_function)
+import fcntl
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from xmlrpc.client import DateTime
+
+__metaclass__ = type
+
+
+def default_cache_dir():
+    """
+    Returns the directory used for persistent caches, below Ansible's
+    local temporary directory
+    """
+    return os.path.join(
+        os.path.expanduser(
+            os.environ.get('ANSIBLE_LOCAL_TEMP', '~/.ansible/tmp')
+        ),
+        'uyuni'
+    )
+
+
+class JSONFileStore:
+    """
+    Stores a dict as JSON file that is only readable by the current user.
+    Files are replaced atomically, unreadable files are treated as empty.
+    Use update() to change data other processes may change as well.
+
+    .. class:: JSONFileStore
+    """
+
+    def __init__(self, path, compress=False):
+        """
+        Constructor creating the store
+
+        :param path: file path
+        :type path: str
+        :param compress: store gzip-compressed JSON
+        :type compress: bool
+        """
+        self.path = path
+        self.compress = compress
+
+    def _open(self, path_or_handle, mode):
+        """
+        Opens a (compressed) file for reading or writing text
+        """
+        if self.compress:
+            return gzip.open(path_or_handle, mode + 't', encoding='utf-8')
+        return open(path_or_handle, mode, encoding='utf-8')
+
+    def load(self):
+        """
+        Returns the stored data or an empty dict
+        """
+        try:
+            with self._open(self.path, 'r') as handle:
+                data = json.load(handle)
+        except (OSError, EOFError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def save(self, data):
+        """
+        Replaces the stored data
+
+        :param data: JSON-serializable data, other values are stored as strings
+        :type data: dict
+        """
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        handle, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp')
+        os.close(handle)
+        try:
+            with self._open(tmp_path, 'w') as tmp_file:
+                json.dump(data, tmp_file, separators=(',', ':'), default=str)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def update(self, func):
+        """
+        Loads, changes and saves the stored data while holding an exclusive
+        lock, so that processes updating the store at the same time don't
+        lose each other's changes. Returns the result of func.
+
+        :param func: function changing the loaded dict in place
+        :type func: callable
+        """
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        handle = os.open(self.path + '.lock', os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            data = self.load()
+            result = func(data)
+            self.save(data)
+            return result
+        finally:
+            # closing releases the lock
+            os.close(handle)
+
+    def delete(self):
+        """
+        Removes the stored data
+        """
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class TTLCache:
+    """
+    Thread-safe mapping with a maximum size and per-entry expiry. The
+    least recently used entries are evicted first.
+
+    .. class:: TTLCache
+    """
+
+    def __init__(self, maxsize=1024, ttl=300, clock=time.time):
+        """
+        Constructor creating the cache
+
+        :param maxsize: maximum number of entries
+        :type maxsize: int
+        :param ttl: seconds after which entries expire
+        :type ttl: int
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        """
+        Returns a cached value or default if missing or expired
+        """
+        with self._lock:
+            try:
+                value, expires = self._data[key]
+            except KeyError:
+                return default
+            if expires <= self._clock():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires=None):
+        """
+        Caches a value
+
+        :param expires: absolute expiry time (default: now + ttl)
+        :type expires: float
+        """
+        with self._lock:
+            self._data[key] = (
+                value, expires if expires is not None else self._clock() + self.ttl
+            )
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def dump(self):
+        """
+        Returns all valid entries as dict of [value, expiry time] lists
+        """
+        now = self._clock()
+        with self._lock:
+            return {
+                key: [value, expires] for key, (value, expires) in self._data.items()
+                if expires > now
+            }
+
+    def load(self, entries):
+        """
+        Adds entries returned by dump(), keeping unexpired ones only
+        """
+        now = self._clock()
+        for key, (value, expires) in entries.items():
+            if expires > now:
+                self.set(key, value, expires)
+
+    def clear(self):
+        """
+        Removes all entries
+        """
+        with self._lock:
+            self._data.clear()
+
+
+def _encode_dates(details):
+    """
+    Returns errata details with XMLRPC dates replaced by JSON objects
+    """
+    return {
+        key: {'__datetime__': value.value} if isinstance(value, DateTime) else value
+        for key, value in details.items()
+    }
+
+
+def _decode_dates(details):
+    """
+    Returns errata details with the dates encoded by _encode_dates
+    restored
+    """
+    return {
+        key: DateTime(value['__datetime__'])
+        if isinstance(value, dict) and '__datetime__' in value else value
+        for key, value in details.items()
+    }
+
+
+class ErrataCache:
+    """
+    Cache for errata details, which don't change once published. Entries
+    are kept by advisory name and ID and loaded lazily from an optional
+    store. An entry is only dropped when the advisory's update date in
+    errata listings changes or the cache is cleared. Stored details are
+    returned like fetched ones, including their XMLRPC dates.
+
+    .. class:: ErrataCache
+    """
+
+    def __init__(self, store=None):
+        """
+        Constructor creating the cache
+
+        :param store: compressed persistent store
+        :type store: JSONFileStore
+        """
+        self._store = store
+        self._errata = None
+        self._ids = None
+        self._removed = set()
+        self._changed = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        """
+        Loads the stored errata on first access
+        """
+        if self._errata is None:
+            self._errata = {
+                name: dict(entry, details=_decode_dates(entry['details']))
+                for name, entry in (self._store.load() if self._store else {}).items()
+            }
+            self._ids = {
+                entry['details'].get('id'): name
+                for name, entry in self._errata.items()
+            }
+
+    def get(self, advisory):
+        """
+        Returns cached errata details or None
+
+        :param advisory: advisory name or errata ID
+        :type advisory: str or int
+        """
+        with self._lock:
+            self._load()
+            if isinstance(advisory, int):
+                advisory = self._ids.get(advisory)
+            entry = self._errata.get(advisory)
+            return entry['details'] if entry else None
+
+    def add(self, name, details):
+        """
+        Caches errata details
+
+        :param name: advisory name
+        :type name: str
+        :param details: errata details as returned by errata.getDetails
+        :type details: dict
+        """
+        with self._lock:
+            self._load()
+            self._errata[name] = dict(details=details, update_date=None)
+            self._ids[details.get('id')] = name
+            self._removed.discard(name)
+            self._changed = True
+
+    def validate(self, update_dates):
+        """
+        Drops entries whose update date changed since the last listing
+
+        :param update_dates: update dates from errata listings by advisory name
+        :type update_dates: dict
+        """
+        with self._lock:
+            self._load()
+            for name, update_date in update_dates.items():
+                entry = self._errata.get(name)
+                if not entry or entry['update_date'] == str(update_date):
+                    continue
+                if entry['update_date'] is None:
+                    # first listing since the details were fetched
+                    entry['update_date'] = str(update_date)
+                else:
+                    del self._errata[name]
+                    self._ids.pop(entry['details'].get('id'), None)
+                    self._removed.add(name)
+                self._changed = True
+
+    def save(self):
+        """
+        Writes changes to the store, merging entries added by other
+        processes meanwhile
+        """
+        with self._lock:
+            if not self._store or not self._changed:
+                return
+            errata = self._store.load()
+            errata.update({
+                name: dict(entry, details=_encode_dates(entry['details']))
+                for name, entry in self._errata.items()
+            })
+            for name in self._removed:
+                errata.pop(name, None)
+            self._store.save(errata)
+            self._removed.clear()
+            self._changed = False
+
+    def clear(self):
+        """
+        Removes all entries including the stored ones
+        """
+        with self._lock:
+            self._errata = {}
+            self._ids = {}
+            self._removed.clear()
+            self._changed = False
+            if self._store:
+                self._store.delete()
+
+
+def session_key_store(cache_dir=None):
+    """
+    Returns the store for session keys in a cache directory
+
+    :param cache_dir: cache directory (default: default_cache_dir())
+    :type cache_dir: str
+    """
+    return SessionKeyStore(JSONFileStore(
+        os.path.join(cache_dir or default_cache_dir(), 'sessions.json')
+    ))
+
+
+class SessionKeyStore:
+    """
+    Persistent API session keys by server and credentials, allowing other
+    processes to reuse a session instead of logging in again
+
+    .. class:: SessionKeyStore
+    """
+
+    def __init__(self, store, clock=time.time):
+        """
+        Constructor creating the store
+
+        :param store: persistent store
+        :type store: JSONFileStore
+        """
+        self._store = store
+        self._clock = clock
+
+    @staticmethod
+    def _key(server, username, password):
+        """
+        Returns the entry name for a server and credentials, so that keys
+        are only handed out for the password they were created with
+        """
+        return hashlib.sha256(
+            "\0".join((server, username, password)).encode('utf-8')
+        ).hexdigest()
+
+    def get(self, server, username, password):
+        """
+        Returns a valid session key and its expiry time or (None, None)
+
+        :param server: API URL
+        :type server: str
+        """
+        entry = self._store.load().get(self._key(server, username, password))
+        if not entry or entry[1] <= self._clock():
+            return None, None
+        return entry[0], entry[1]
+
+    def set(self, server, username, password, session_key, expires):
+        """
+        Stores a session key
+
+        :param expires: absolute expiry time
+        :type expires: float
+        """
+        name = self._key(server, username, password)
+
+        def store(entries):
+            self._prune(entries)
+            entries[name] = [session_key, expires]
+
+        self._store.update(store)
+
+    def renew(self, server, username, password, rejected_key, new_session):
+        """
+        Returns a valid session key other than the rejected one and its
+        expiry time. A new session is only started if no other process
+        did so already - the store is locked meanwhile, so that processes
+        renewing at the same time don't leave sessions behind.
+
+        :param rejected_key: session key rejected by the server or expired
+        :type rejected_key: str
+        :param new_session: function starting a session and returning its
+            key and expiry time
+        :type new_session: callable
+        """
+        name = self._key(server, username, password)
+
+        def renew(entries):
+            entry = entries.get(name)
+            if entry and entry[0] != rejected_key and entry[1] > self._clock():
+                return entry[0], entry[1]
+            self._prune(entries)
+            session_key, expires = new_session()
+            entries[name] = [session_key, expires]
+            return session_key, expires
+
+        return self._store.update(renew)
+
+    def delete(self, server, username, password, session_key=None):
+        """
+        Removes a session key
+
+        :param session_key: only remove the entry if it stores this key
+        :type session_key: str
+        """
+        name = self._key(server, username, password)
+
+        def delete(entries):
+            entry = entries.get(name)
+            if entry and session_key in (None, entry[0]):
+                del entries[name]
+
+        self._store.update(delete)
+
+    def _prune(self, entries):
+        """
+        Removes expired entries
+        """
+        now = self._clock()
+        for name in [x for x, entry in entries.items() if entry[1] <= now]:
+            del entries[name]
@@ -91,3 +91,11 @@ class SSLCertVerificationError(Exception):
 
     .. class:: SSLCertVerificationError
     """
+
+
+class CircuitOpenException(SessionException):
+    """
+    Exception for calls not sent because the server kept failing
+
+    .. class:: CircuitOpenException
+    """
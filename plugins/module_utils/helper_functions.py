@@ -3,7 +3,17 @@ Uyuni helper functions
 """
 
 from __future__ import (absolute_import, division, print_function)
+import atexit
 import logging
+import os
+from .cache import default_cache_dir, session_key_store
+from .instrumentation import (
+    Instrumentation,
+    OTLPFileSpanExporter,
+    OTLPHTTPSpanExporter
+)
+from .ratelimit import SharedRateLimiter
+from .retry import RetryPolicy, SharedCircuitBreaker
 from .uyuni import UyuniAPIClient
 from .exceptions import SSLCertVerificationError
 __metaclass__ = type
@@ -44,8 +54,8 @@ def get_recently_installed_patches(system_id, api_client):
     """
     Get all recently installed patches
     """
-    # find already installed errata by searching actions
-    actions = api_client.get_host_actions(
+    # find already installed errata by searching patch actions
+    actions = api_client.get_errata_task_status(
         system_id
     )
     errata = [
@@ -55,7 +65,7 @@ def get_recently_installed_patches(system_id, api_client):
             and x["successful_count"] == 1)
     ]
     # return errata IDs
-    return [api_client.get_patch_by_name(x) for x in errata]
+    return api_client.get_patches_by_name(errata)
 
 
 def is_blocklisted(upgrade: str, blacklist: list):
@@ -70,10 +80,167 @@ def is_blocklisted(upgrade: str, blacklist: list):
     return any(entry in upgrade for entry in blacklist)
 
 
+def uyuni_argument_spec(**kwargs):
+    """
+    Returns the argument specification shared by all modules, extended
+    by module-specific options
+    """
+    argument_spec = dict(
+        uyuni_host=dict(required=True),
+        uyuni_user=dict(required=True),
+        uyuni_password=dict(required=True, no_log=True),
+        uyuni_port=dict(default=443, type='int'),
+        uyuni_verify_ssl=dict(default=True, type='bool'),
+        uyuni_cache_dir=dict(type='path'),
+        uyuni_session_cache=dict(default=False, type='bool'),
+        uyuni_validate_api=dict(default=True, type='bool'),
+        uyuni_retries=dict(default=3, type='int'),
+        uyuni_max_requests_per_second=dict(default=0, type='float'),
+        uyuni_max_in_flight=dict(default=0, type='int'),
+        uyuni_metrics=dict(default=False, type='bool'),
+        uyuni_metrics_textfile=dict(type='path'),
+        uyuni_trace_file=dict(type='path'),
+        uyuni_trace_endpoint=dict(type='str')
+    )
+    argument_spec.update(kwargs)
+    return argument_spec
+
+
+def get_connection_params(params):
+    """
+    Returns API connection parameters from module parameters
+    """
+    return dict(
+        host=params.get('uyuni_host'),
+        username=params.get('uyuni_user'),
+        password=params.get('uyuni_password'),
+        port=params.get('uyuni_port'),
+        verify_ssl=params.get('uyuni_verify_ssl'),
+        cache_dir=params.get('uyuni_cache_dir'),
+        session_cache=params.get('uyuni_session_cache'),
+        validate_api=params.get('uyuni_validate_api'),
+        retries=params.get('uyuni_retries'),
+        max_requests_per_second=params.get('uyuni_max_requests_per_second'),
+        max_in_flight=params.get('uyuni_max_in_flight'),
+        metrics=params.get('uyuni_metrics'),
+        metrics_textfile=params.get('uyuni_metrics_textfile'),
+        trace_file=params.get('uyuni_trace_file'),
+        trace_endpoint=params.get('uyuni_trace_endpoint')
+    )
+
+
+def _server_state_dir(connection_params):
+    """
+    Returns the directory for state shared by all processes connecting
+    to the same server through the same cache directory
+    """
+    return os.path.join(
+        connection_params.get('cache_dir') or default_cache_dir(),
+        'ratelimit',
+        f"{connection_params.get('host')}_{connection_params.get('port')}"
+    )
+
+
+def get_rate_limiter(connection_params):
+    """
+    Returns the rate limiter to use, shared with all processes connecting
+    to the same server through the same cache directory - None if
+    requests are not limited
+    """
+    if connection_params.get('rate_limiter'):
+        return connection_params.get('rate_limiter')
+    rate = connection_params.get('max_requests_per_second') or 0
+    max_in_flight = connection_params.get('max_in_flight') or 0
+    if not (rate or max_in_flight):
+        return None
+    return SharedRateLimiter(
+        _server_state_dir(connection_params),
+        rate=rate,
+        max_in_flight=max_in_flight
+    )
+
+
+def get_retry_policy(connection_params):
+    """
+    Returns a policy retrying calls that failed because the server was
+    unavailable, None if retries are disabled. The circuit breaker is
+    kept in memory, it is only shared with all processes connecting to the
+    same server if a cache directory was set explicitly.
+    """
+    if not connection_params.get('retries'):
+        return None
+    breaker = None
+    if connection_params.get('cache_dir'):
+        breaker = SharedCircuitBreaker(_server_state_dir(connection_params))
+    return RetryPolicy(
+        retries=connection_params.get('retries'),
+        breaker=breaker
+    )
+
+
+def get_instrumentation(connection_params):
+    """
+    Returns an instrumentation registry if metrics or traces were
+    requested, None otherwise
+    """
+    span_exporters = []
+    if connection_params.get('trace_file'):
+        span_exporters.append(
+            OTLPFileSpanExporter(connection_params.get('trace_file'))
+        )
+    if connection_params.get('trace_endpoint'):
+        span_exporters.append(
+            OTLPHTTPSpanExporter(connection_params.get('trace_endpoint'))
+        )
+    if not (
+            span_exporters or connection_params.get('metrics')
+            or connection_params.get('metrics_textfile')
+    ):
+        return None
+    return Instrumentation(
+        max_spans=Instrumentation.MAX_SPANS if span_exporters else 0,
+        span_exporters=span_exporters
+    )
+
+
+def publish_metrics(module, api_instance, result):
+    """
+    Publishes the API calls made by the module, to be called right before
+    it exits: adds a summary to the result (uyuni_metrics), adds the calls
+    to the Prometheus textfile and exports the spans as requested by the
+    module parameters. Failing to export only results in a warning. The
+    client's instrumentation needs to be created for the task before
+    connecting, so that logging in and checking the API version are
+    included. Returns the result.
+    """
+    instrumentation = api_instance.instrumentation
+    if not instrumentation:
+        return result
+    params = module.params
+    if params.get('uyuni_metrics'):
+        result['uyuni_metrics'] = instrumentation.summary()
+    try:
+        if params.get('uyuni_metrics_textfile'):
+            instrumentation.write_prometheus_textfile(
+                params.get('uyuni_metrics_textfile'),
+                labels=dict(server=params.get('uyuni_host'))
+            )
+        instrumentation.flush()
+    except Exception as err:  # pylint: disable=broad-except
+        result.setdefault('warnings', []).append(
+            f"Failed to export API metrics: {err}"
+        )
+    return result
+
+
 def _configure_connection(connection_params):
     """
     Configures API connection
     """
+    session_store = None
+    if connection_params.get('session_cache'):
+        session_store = session_key_store(connection_params.get('cache_dir'))
+
     # try to create API instance
     try:
         api_instance = UyuniAPIClient(
@@ -82,8 +249,18 @@ def _configure_connection(connection_params):
             connection_params.get('username'),
             connection_params.get('password'),
             port=connection_params.get('port'),
-            verify=connection_params.get('verify_ssl')
+            verify=connection_params.get('verify_ssl'),
+            pool_size=connection_params.get('pool_size'),
+            rate_limiter=get_rate_limiter(connection_params),
+            cache_dir=connection_params.get('cache_dir'),
+            session_store=session_store,
+            validate_api=connection_params.get('validate_api', True),
+            instrumentation=get_instrumentation(connection_params),
+            retry_policy=get_retry_policy(connection_params)
         )
+        if not session_store:
+            # don't leave sessions behind that nobody is going to reuse
+            atexit.register(api_instance.logout)
         return api_instance
     except SSLCertVerificationError as err:
         raise BaseException("Failed to verify SSL certificate") from err
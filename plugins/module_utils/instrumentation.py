@@ -0,0 +1,558 @@
+"""
+Instrumentation of Uyuni XMLRPC API calls
+"""
+
+from __future__ import (absolute_import, division, print_function)
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import Counter, deque
+from xmlrpc.client import Fault
+
+from .cache import JSONFileStore
+
+__metaclass__ = type
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+"""
+tuple: Upper bounds in seconds of the call latency histogram buckets
+"""
+SPAN_KIND_CLIENT = 3
+"""
+int: OpenTelemetry span kind of outgoing calls
+"""
+STATUS_OK = 1
+STATUS_ERROR = 2
+"""
+int: OpenTelemetry span status codes
+"""
+
+
+class TransferLog(threading.local):
+    """
+    Per-thread stack of the calls in progress, transports add the bytes
+    and requests they send to the innermost call
+
+    .. class:: TransferLog
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.frames = []
+
+    def add(self, sent=0, received=0, requests=0):
+        """
+        Adds transferred bytes and sent requests to the current call
+
+        :param sent: request bytes
+        :type sent: int
+        :param received: response bytes
+        :type received: int
+        :param requests: HTTP requests
+        :type requests: int
+        """
+        if self.frames:
+            frame = self.frames[-1]
+            frame["sent"] += sent
+            frame["received"] += received
+            frame["requests"] += requests
+
+
+def _new_method_stats():
+    """
+    Returns empty statistics of an API method
+    """
+    return {
+        "calls": 0,
+        "errors": 0,
+        "seconds": 0.0,
+        "max_seconds": 0.0,
+        "bytes_sent": 0,
+        "bytes_received": 0,
+        "retries": 0,
+        "faults": Counter(),
+        "buckets": [0] * len(LATENCY_BUCKETS),
+    }
+
+
+def _copy_method_stats(stats):
+    """
+    Returns an independent copy of method statistics
+    """
+    return dict(stats, faults=Counter(stats["faults"]), buckets=list(stats["buckets"]))
+
+
+def _add_method_stats(total, stats):
+    """
+    Returns the sum of method statistics, total may be None
+    """
+    if not total:
+        return _copy_method_stats(stats)
+    return dict(
+        {
+            x: total[x] + stats[x] for x in (
+                "calls", "errors", "seconds", "bytes_sent", "bytes_received",
+                "retries"
+            )
+        },
+        max_seconds=max(total["max_seconds"], stats["max_seconds"]),
+        faults=Counter(total["faults"]) + Counter(stats["faults"]),
+        buckets=[x + y for x, y in zip(total["buckets"], stats["buckets"])],
+    )
+
+
+def _prometheus(series):
+    """
+    Returns method statistics in the Prometheus text exposition format
+
+    :param series: (labels, statistics by method) pairs
+    :type series: list
+    """
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    def label_set(labels, **extra):
+        pairs = dict(labels or {}, **extra)
+        return "{" + ",".join(
+            f'{name}="{escape(value)}"' for name, value in pairs.items()
+        ) + "}"
+
+    def samples():
+        for labels, methods in series:
+            for method, stats in sorted(methods.items()):
+                yield labels, method, stats
+
+    metrics = (
+        ("uyuni_api_calls_total", "counter", "API calls", "calls"),
+        ("uyuni_api_call_errors_total", "counter", "Failed API calls", "errors"),
+        ("uyuni_api_request_bytes_total", "counter", "Bytes sent", "bytes_sent"),
+        ("uyuni_api_response_bytes_total", "counter", "Bytes received", "bytes_received"),
+        ("uyuni_api_retries_total", "counter", "Repeated requests", "retries"),
+    )
+    lines = []
+    for name, kind, description, key in metrics:
+        lines += [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+        lines += [
+            f"{name}{label_set(labels, method=method)} {stats[key]}"
+            for labels, method, stats in samples()
+        ]
+
+    name = "uyuni_api_faults_total"
+    lines += [f"# HELP {name} API faults by code", f"# TYPE {name} counter"]
+    for labels, method, stats in samples():
+        lines += [
+            f"{name}{label_set(labels, method=method, code=code)} {count}"
+            for code, count in sorted(stats["faults"].items())
+        ]
+
+    name = "uyuni_api_call_duration_seconds"
+    lines += [f"# HELP {name} API call latency", f"# TYPE {name} histogram"]
+    for labels, method, stats in samples():
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, stats["buckets"]):
+            cumulative += count
+            lines.append(
+                f"{name}_bucket{label_set(labels, method=method, le=bound)} {cumulative}"
+            )
+        lines += [
+            f"{name}_bucket{label_set(labels, method=method, le='+Inf')} {stats['calls']}",
+            f"{name}_sum{label_set(labels, method=method)} {stats['seconds']}",
+            f"{name}_count{label_set(labels, method=method)} {stats['calls']}",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+class Instrumentation:
+    """
+    Registry recording every API call of the clients it is attached to:
+    method, latency, request and response sizes, faults and retries.
+    Calls are also kept as OpenTelemetry-style spans until they are
+    exported. Attach it with UyuniAPIClient(instrumentation=...) or
+    client.instrument(); clients without instrumentation skip all of it.
+
+    .. class:: Instrumentation
+    """
+
+    MAX_SPANS = 10000
+    """
+    int: Default maximum number of unexported spans to keep
+    """
+
+    def __init__(
+            self, max_spans=MAX_SPANS, span_exporters=None,
+            service_name="stdevel.uyuni", clock=time.perf_counter
+    ):
+        """
+        Constructor creating the registry
+
+        :param max_spans: maximum number of unexported spans to keep,
+            0 disables spans
+        :type max_spans: int
+        :param span_exporters: exporters receiving the spans on flush()
+        :type span_exporters: list
+        :param service_name: service name of exported spans
+        :type service_name: str
+        """
+        self.transfers = TransferLog()
+        self.span_exporters = list(span_exporters or [])
+        self.service_name = service_name
+        self.trace_id = os.urandom(16).hex()
+        self._clock = clock
+        self._methods = {}
+        self._spans = deque(maxlen=max_spans) if max_spans else None
+        self._lock = threading.Lock()
+
+    def middleware(self, call, method, args, server=None):
+        """
+        RPCProxy middleware timing a call and recording its transfers.
+        It needs to come first so that repeated requests of a call count
+        as retries.
+        """
+        frames = self.transfers.frames
+        frame = {
+            "sent": 0, "received": 0, "requests": 0,
+            "span_id": os.urandom(8).hex(),
+        }
+        parent = frames[-1]["span_id"] if frames else None
+        frames.append(frame)
+        start_ns = time.time_ns()
+        start = self._clock()
+        error = None
+        try:
+            return call(method, args)
+        except Exception as err:
+            error = err
+            raise
+        finally:
+            duration = self._clock() - start
+            frames.pop()
+            attributes = {"server.address": server} if server else {}
+            if method == "system.multicall" and args:
+                attributes["uyuni.batch_size"] = len(args[0])
+            self.record(
+                method, duration, sent=frame["sent"],
+                received=frame["received"],
+                retries=max(frame["requests"] - 1, 0), error=error,
+                start_ns=start_ns, span_id=frame["span_id"],
+                parent_span_id=parent, attributes=attributes
+            )
+
+    def record(
+            self, method, duration, sent=0, received=0, retries=0,
+            error=None, start_ns=None, span_id=None, parent_span_id=None,
+            attributes=None
+    ):
+        """
+        Records a finished call
+
+        :param method: API method name (e.g. system.getId)
+        :type method: str
+        :param duration: call duration in seconds
+        :type duration: float
+        :param sent: request bytes
+        :type sent: int
+        :param received: response bytes
+        :type received: int
+        :param retries: repeated requests
+        :type retries: int
+        :param error: exception raised by the call
+        :type error: Exception
+        """
+        fault_code = error.faultCode if isinstance(error, Fault) else None
+        with self._lock:
+            stats = self._methods.get(method)
+            if stats is None:
+                stats = self._methods[method] = _new_method_stats()
+            stats["calls"] += 1
+            stats["errors"] += error is not None
+            stats["seconds"] += duration
+            stats["max_seconds"] = max(stats["max_seconds"], duration)
+            stats["bytes_sent"] += sent
+            stats["bytes_received"] += received
+            stats["retries"] += retries
+            if fault_code is not None:
+                stats["faults"][str(fault_code)] += 1
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if duration <= bound:
+                    stats["buckets"][index] += 1
+                    break
+
+            if self._spans is None:
+                return
+            if start_ns is None:
+                start_ns = time.time_ns() - int(duration * 1e9)
+            service, _, name = method.rpartition(".")
+            span_attributes = {
+                "rpc.system": "xmlrpc",
+                "rpc.service": service,
+                "rpc.method": name,
+                "uyuni.request.bytes": sent,
+                "uyuni.response.bytes": received,
+                "uyuni.retries": retries,
+            }
+            span_attributes.update(attributes or {})
+            status = {"code": STATUS_OK}
+            if error is not None:
+                status = {"code": STATUS_ERROR, "message": str(error)}
+                if fault_code is not None:
+                    span_attributes["uyuni.fault_code"] = fault_code
+            self._spans.append({
+                "trace_id": self.trace_id,
+                "span_id": span_id or os.urandom(8).hex(),
+                "parent_span_id": parent_span_id,
+                "name": method,
+                "start_time_unix_nano": start_ns,
+                "end_time_unix_nano": start_ns + int(duration * 1e9),
+                "attributes": span_attributes,
+                "status": status,
+            })
+
+    def snapshot(self):
+        """
+        Returns a copy of the statistics to compute summaries since then
+        """
+        with self._lock:
+            return {
+                method: _copy_method_stats(stats)
+                for method, stats in self._methods.items()
+            }
+
+    def _stats_since(self, since=None):
+        """
+        Returns the statistics recorded after a snapshot
+        """
+        current = self.snapshot()
+        if not since:
+            return current
+        result = {}
+        for method, stats in current.items():
+            before = since.get(method)
+            if before:
+                stats = dict(
+                    {
+                        x: stats[x] - before[x] for x in (
+                            "calls", "errors", "seconds", "bytes_sent",
+                            "bytes_received", "retries"
+                        )
+                    },
+                    # exact if the slowest call was made since
+                    max_seconds=min(
+                        stats["max_seconds"], stats["seconds"] - before["seconds"]
+                    ),
+                    faults=stats["faults"] - before["faults"],
+                    buckets=[x - y for x, y in zip(stats["buckets"], before["buckets"])],
+                )
+            if stats["calls"]:
+                result[method] = stats
+        return result
+
+    def summary(self, since=None):
+        """
+        Returns a JSON-serializable summary of the calls, methods taking
+        the most time come first
+
+        :param since: only include calls after this snapshot()
+        :type since: dict
+        """
+        methods = self._stats_since(since)
+        summary = {
+            x: sum(stats[x] for stats in methods.values()) for x in (
+                "calls", "errors", "seconds", "bytes_sent", "bytes_received",
+                "retries"
+            )
+        }
+        summary["seconds"] = round(summary["seconds"], 6)
+        summary["methods"] = {
+            method: {
+                "calls": stats["calls"],
+                "errors": stats["errors"],
+                "seconds": round(stats["seconds"], 6),
+                "max_seconds": round(stats["max_seconds"], 6),
+                "bytes_sent": stats["bytes_sent"],
+                "bytes_received": stats["bytes_received"],
+                "retries": stats["retries"],
+                "faults": dict(stats["faults"]),
+            } for method, stats in sorted(
+                methods.items(), key=lambda x: x[1]["seconds"], reverse=True
+            )
+        }
+        return summary
+
+    def prometheus(self, labels=None):
+        """
+        Returns the statistics in the Prometheus text exposition format
+
+        :param labels: labels to add to every sample (e.g. server)
+        :type labels: dict
+        """
+        return _prometheus([(labels, self.snapshot())])
+
+    def write_prometheus_textfile(self, path, labels=None, since=None):
+        """
+        Adds the calls made since a snapshot to the counters in a file for
+        the node_exporter textfile collector. The counters are kept in a
+        state file next to it (path + '.json') that is updated under a
+        lock, so tasks and processes writing the same file add up their
+        calls and counters never go backwards. The file is replaced
+        atomically.
+
+        :param path: file path, should end with .prom
+        :type path: str
+        :param labels: labels to add to every sample
+        :type labels: dict
+        :param since: only add calls after this snapshot()
+        :type since: dict
+        """
+        calls = self._stats_since(since)
+        series = json.dumps(labels or {}, sort_keys=True)
+
+        def add(data):
+            methods = data.setdefault(series, {})
+            for method, stats in calls.items():
+                methods[method] = _add_method_stats(methods.get(method), stats)
+            _write_textfile(path, _prometheus([
+                (json.loads(key), value) for key, value in sorted(data.items())
+            ]))
+
+        JSONFileStore(os.path.abspath(path) + ".json").update(add)
+
+    def spans(self):
+        """
+        Returns the unexported spans
+        """
+        with self._lock:
+            return list(self._spans or [])
+
+    def flush(self):
+        """
+        Passes the unexported spans to all span exporters
+        """
+        with self._lock:
+            if not self._spans:
+                return
+            spans = list(self._spans)
+            self._spans.clear()
+        for exporter in self.span_exporters:
+            exporter.export(spans, self.service_name)
+
+
+def _write_textfile(path, text):
+    """
+    Replaces a file atomically with a text readable by everybody
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    handle, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp")
+    try:
+        with os.fdopen(handle, "w", encoding="utf-8") as tmp_file:
+            tmp_file.write(text)
+        # the collector usually runs as another user
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def otlp_json(spans, service_name):
+    """
+    Returns spans as OTLP/JSON trace export request
+
+    :param spans: spans recorded by Instrumentation
+    :type spans: list
+    :param service_name: service.name resource attribute
+    :type service_name: str
+    """
+    def attribute(key, value):
+        if isinstance(value, bool):
+            return {"key": key, "value": {"boolValue": value}}
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+    return {"resourceSpans": [{
+        "resource": {"attributes": [attribute("service.name", service_name)]},
+        "scopeSpans": [{
+            "scope": {"name": "stdevel.uyuni"},
+            "spans": [
+                dict(
+                    {
+                        "traceId": x["trace_id"],
+                        "spanId": x["span_id"],
+                        "name": x["name"],
+                        "kind": SPAN_KIND_CLIENT,
+                        "startTimeUnixNano": str(x["start_time_unix_nano"]),
+                        "endTimeUnixNano": str(x["end_time_unix_nano"]),
+                        "attributes": [
+                            attribute(key, value) for key, value in x["attributes"].items()
+                        ],
+                        "status": x["status"],
+                    },
+                    **({"parentSpanId": x["parent_span_id"]} if x["parent_span_id"] else {})
+                ) for x in spans
+            ],
+        }],
+    }]}
+
+
+class OTLPFileSpanExporter:
+    """
+    Appends spans as OTLP/JSON lines to a file, e.g. for the
+    OpenTelemetry Collector's otlpjsonfile receiver
+
+    .. class:: OTLPFileSpanExporter
+    """
+
+    def __init__(self, path):
+        """
+        :param path: file path
+        :type path: str
+        """
+        self.path = path
+
+    def export(self, spans, service_name):
+        """
+        Writes the spans
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as export_file:
+            export_file.write(
+                json.dumps(otlp_json(spans, service_name), separators=(",", ":")) + "\n"
+            )
+
+
+class OTLPHTTPSpanExporter:
+    """
+    Sends spans to an OTLP/HTTP endpoint using the JSON encoding
+
+    .. class:: OTLPHTTPSpanExporter
+    """
+
+    def __init__(self, endpoint, headers=None, timeout=10):
+        """
+        :param endpoint: traces URL (e.g. http://localhost:4318/v1/traces)
+        :type endpoint: str
+        :param headers: additional HTTP headers (e.g. authorization)
+        :type headers: dict
+        :param timeout: seconds to wait for the endpoint
+        :type timeout: float
+        """
+        self.endpoint = endpoint
+        self.headers = dict(headers or {})
+        self.timeout = timeout
+
+    def export(self, spans, service_name):
+        """
+        Sends the spans
+        """
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(otlp_json(spans, service_name)).encode("utf-8"),
+            headers=dict(self.headers, **{"Content-Type": "application/json"}),
+            method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
@@ -0,0 +1,228 @@
+"""
+Batching of Uyuni XMLRPC API calls using system.multicall
+"""
+
+from __future__ import (absolute_import, division, print_function)
+from xmlrpc.client import Fault
+
+from .exceptions import EmptySetException, SessionException
+from .rpc import is_invalid_session
+
+__metaclass__ = type
+
+NOT_FOUND_FAULTS = (
+    -208,  # no such errata
+    -209,  # no such package
+    -210,  # no such system
+    -213,  # no such user
+)
+"""
+tuple: Fault codes of missing objects
+"""
+
+GENERIC_FAULT = -1
+"""
+int: Fault code of errors without a specific code, also used for some
+missing objects like server groups or actions
+"""
+
+LOOKUP_MESSAGES = (
+    "no such",
+    "unable to locate",
+)
+"""
+tuple: Messages of generic faults that indicate a missing object
+"""
+
+
+def fault_to_exception(err, subject):
+    """
+    Maps a XMLRPC fault to the exception types used by the API client
+
+    :param err: XMLRPC fault
+    :type err: Fault
+    :param subject: name of the requested object for error messages
+    :type subject: str
+    """
+    if err.faultCode in NOT_FOUND_FAULTS or (
+            err.faultCode == GENERIC_FAULT
+            and any(x in err.faultString.lower() for x in LOOKUP_MESSAGES)
+    ):
+        return EmptySetException(f"Not found: {subject}")
+    return SessionException(
+        f"Generic remote communication error: {err.faultString!r}"
+    )
+
+
+class BatchResult:
+    """
+    Placeholder for the result of a queued API call
+
+    .. class:: BatchResult
+    """
+
+    _PENDING = object()
+
+    def __init__(self, method, args):
+        """
+        Constructor creating the placeholder
+
+        :param method: API method name (e.g. system.getNetwork)
+        :type method: str
+        :param args: call arguments without session key
+        :type args: tuple
+        """
+        self.method = method
+        self.args = args
+        self._value = self._PENDING
+        self._fault = None
+
+    @property
+    def done(self):
+        """
+        Returns whether the call has been sent
+        """
+        return self._value is not self._PENDING or self._fault is not None
+
+    def get(self):
+        """
+        Returns the call result or raises the mapped exception
+
+        :raises: EmptySetException, SessionException
+        """
+        if self._fault is not None:
+            raise fault_to_exception(
+                self._fault, f"{self.method}{self.args!r}"
+            ) from self._fault
+        if self._value is self._PENDING:
+            raise SessionException(
+                f"Batched call {self.method!r} has not been sent yet"
+            )
+        return self._value
+
+
+class _BatchMethod:
+    """
+    Callable queueing a particular API method
+    """
+
+    def __init__(self, batch, name):
+        self._batch = batch
+        self._name = name
+
+    def __getattr__(self, name):
+        return _BatchMethod(self._batch, f"{self._name}.{name}")
+
+    def __call__(self, *args):
+        return self._batch.queue(self._name, *args)
+
+
+class MultiCallBatch:
+    """
+    Queues API calls and sends them in chunks using system.multicall.
+    The session key is prepended to every queued call. Servers without
+    multicall support are detected once and then served by single calls.
+
+    .. class:: MultiCallBatch
+    """
+
+    def __init__(self, api_client, batch_size):
+        """
+        Constructor creating the batch
+
+        :param api_client: API client to send calls with
+        :type api_client: UyuniAPIClient
+        :param batch_size: maximum number of calls per multicall request
+        :type batch_size: int
+        """
+        if batch_size < 1:
+            raise ValueError("Batch size needs to be at least 1")
+        self._client = api_client
+        self.batch_size = batch_size
+        self._queue = []
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return _BatchMethod(self, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+        else:
+            self._queue = []
+
+    def queue(self, method, *args):
+        """
+        Queues a call and returns its result placeholder
+
+        :param method: API method name (e.g. system.getNetwork)
+        :type method: str
+        """
+        result = BatchResult(method, args)
+        self._queue.append(result)
+        return result
+
+    def flush(self):
+        """
+        Sends all queued calls
+        """
+        queue, self._queue = self._queue, []
+        for index in range(0, len(queue), self.batch_size):
+            chunk = queue[index:index + self.batch_size]
+            if self._client.multicall_supported:
+                try:
+                    self._send_multicall(chunk)
+                    continue
+                except Fault as err:
+                    if "multicall" not in err.faultString.lower():
+                        raise SessionException(
+                            f"Generic remote communication error: {err.faultString!r}"
+                        ) from err
+                    self._client.LOGGER.info(
+                        "system.multicall not supported, sending single calls"
+                    )
+                    self._client.multicall_supported = False
+            self._send_single(chunk)
+
+    def _send_multicall(self, chunk, renewed=False):
+        """
+        Sends a chunk of calls as one multicall request. Calls rejected
+        because of an expired session are sent again with a new session.
+        """
+        # pylint: disable=protected-access
+        key = self._client._api_key
+        responses = self._client._session.system.multicall(
+            [{"methodName": x.method, "params": [key] + list(x.args)} for x in chunk]
+        )
+        rejected = []
+        for result, response in zip(chunk, responses):
+            if isinstance(response, dict):
+                fault = Fault(
+                    response.get("faultCode"), response.get("faultString", "")
+                )
+                if not renewed and is_invalid_session(fault):
+                    rejected.append(result)
+                else:
+                    result._fault = fault
+            else:
+                result._value = response[0]
+
+        if rejected:
+            self._client.renew_session(key)
+            self._send_multicall(rejected, renewed=True)
+
+    def _send_single(self, chunk):
+        """
+        Sends a chunk of calls one by one
+        """
+        # pylint: disable=protected-access
+        for result in chunk:
+            method = getattr(self._client._session, result.method)
+            try:
+                result._value = method(self._client._api_key, *result.args)
+            except Fault as err:
+                result._fault = err
@@ -0,0 +1,209 @@
+"""
+Polling helpers for waiting on Uyuni actions
+"""
+
+from __future__ import (absolute_import, division, print_function)
+import asyncio
+import random
+import time
+from collections import namedtuple
+
+__metaclass__ = type
+
+
+class BackoffPoller:
+    """
+    Calls a check function until it reports a result, sleeping between
+    polls with exponential backoff and jitter. After a run, the number of
+    polls and the seconds waited are available as attributes.
+
+    .. class:: BackoffPoller
+    """
+
+    def __init__(
+            self, timeout=3600, min_interval=5, max_interval=60,
+            factor=2, jitter=0.1, sleep=time.sleep, clock=time.monotonic
+    ):
+        """
+        Constructor creating the poller
+
+        :param timeout: maximum seconds to wait
+        :type timeout: int
+        :param min_interval: seconds to wait after the first poll
+        :type min_interval: float
+        :param max_interval: upper limit for the seconds between polls
+        :type max_interval: float
+        :param factor: multiplier applied to the interval after every poll
+        :type factor: float
+        :param jitter: relative random deviation of every interval (0-1)
+        :type jitter: float
+        """
+        if min_interval <= 0 or max_interval < min_interval:
+            raise ValueError("Invalid polling intervals")
+        self.timeout = timeout
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        self.jitter = jitter
+        self._sleep = sleep
+        self._clock = clock
+        self.polls = 0
+        self.waited = 0.0
+
+    def intervals(self):
+        """
+        Yields the (jittered) seconds to sleep between polls
+        """
+        interval = self.min_interval
+        while True:
+            yield min(
+                interval * random.uniform(1 - self.jitter, 1 + self.jitter),
+                self.max_interval
+            )
+            interval = min(interval * self.factor, self.max_interval)
+
+    def attempts(self):
+        """
+        Yields the number of every poll, sleeping in between, until the
+        timeout is exceeded
+
+        :raises: TimeoutError
+        """
+        start = self._start()
+        intervals = self.intervals()
+        while True:
+            yield self._next_poll(start)
+            self._sleep(self._next_delay(start, intervals))
+
+    async def async_attempts(self):
+        """
+        Yields the number of every poll like attempts(), but sleeps
+        without blocking the event loop
+
+        :raises: TimeoutError
+        """
+        start = self._start()
+        intervals = self.intervals()
+        while True:
+            yield self._next_poll(start)
+            await asyncio.sleep(self._next_delay(start, intervals))
+
+    def _start(self):
+        """
+        Resets the statistics and returns the start time
+        """
+        self.polls = 0
+        self.waited = 0.0
+        return self._clock()
+
+    def _next_poll(self, start):
+        """
+        Counts a poll and returns its number
+        """
+        self.polls += 1
+        self.waited = self._clock() - start
+        return self.polls
+
+    def _next_delay(self, start, intervals):
+        """
+        Returns the seconds to sleep before the next poll
+
+        :raises: TimeoutError
+        """
+        now = self._clock()
+        self.waited = now - start
+        deadline = start + self.timeout
+        if now >= deadline:
+            raise TimeoutError(
+                f"No result after {self.polls} polls and {self.waited:.0f} seconds"
+            )
+        return min(next(intervals), deadline - now)
+
+    def poll(self, check):
+        """
+        Calls check until it returns something else than None and returns
+        that value
+
+        :param check: function without arguments
+        :type check: callable
+        :raises: TimeoutError
+        """
+        for _ in self.attempts():
+            result = check()
+            if result is not None:
+                return result
+        return None
+
+
+ActionResult = namedtuple("ActionResult", "system_id action_id successful details")
+
+
+class ActionWaiter:
+    """
+    Waits for many (system ID, action ID) pairs at once. Every poll asks
+    for the completed and failed systems of all pending actions in a
+    single batch instead of downloading each system's event history.
+
+    .. class:: ActionWaiter
+    """
+
+    def __init__(self, api_client, poller=None):
+        """
+        Constructor creating the waiter
+
+        :param api_client: API client
+        :type api_client: UyuniAPIClient
+        :param poller: poller defining timeout and intervals
+        :type poller: BackoffPoller
+        """
+        self._client = api_client
+        self.poller = poller or BackoffPoller()
+
+    def wait(self, pairs):
+        """
+        Yields an ActionResult for every pair as soon as the action
+        finished on that system
+
+        :param pairs: (system ID, action ID) pairs
+        :type pairs: iterable
+        :raises: TimeoutError if actions are still pending after the timeout
+        """
+        pending = {(int(system_id), int(action_id)) for system_id, action_id in pairs}
+        if not pending:
+            return
+        try:
+            for _ in self.poller.attempts():
+                for result in self._poll(pending):
+                    pending.discard((result.system_id, result.action_id))
+                    yield result
+                if not pending:
+                    return
+        except TimeoutError as err:
+            raise TimeoutError(
+                f"{len(pending)} action(s) did not complete within "
+                f"{self.poller.timeout} seconds: {sorted(pending)!r}"
+            ) from err
+
+    def _poll(self, pending):
+        """
+        Returns results for all finished pending pairs
+        """
+        action_ids = sorted({action_id for _, action_id in pending})
+        with self._client.multicall() as batch:
+            states = {
+                action_id: (
+                    batch.schedule.listCompletedSystems(action_id),
+                    batch.schedule.listFailedSystems(action_id)
+                ) for action_id in action_ids
+            }
+
+        results = []
+        for action_id in action_ids:
+            completed, failed = (x.get() for x in states[action_id])
+            for successful, systems in ((True, completed), (False, failed)):
+                for system in systems:
+                    if (system["server_id"], action_id) in pending:
+                        results.append(ActionResult(
+                            system["server_id"], action_id, successful, system
+                        ))
+        return sorted(results, key=lambda x: (x.action_id, x.system_id))
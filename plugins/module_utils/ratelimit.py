@@ -0,0 +1,174 @@
+"""
+Client-side request rate limiting for the Uyuni API
+"""
+
+from __future__ import (absolute_import, division, print_function)
+import fcntl
+import os
+import random
+import struct
+import threading
+import time
+
+__metaclass__ = type
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter spacing requests evenly to a maximum rate
+
+    .. class:: RateLimiter
+    """
+
+    def __init__(self, rate, clock=time.monotonic, sleep=time.sleep):
+        """
+        Constructor creating the limiter
+
+        :param rate: maximum requests per second
+        :type rate: float
+        """
+        if rate <= 0:
+            raise ValueError("Rate needs to be positive")
+        self.rate = rate
+        self._clock = clock
+        self._sleep = sleep
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Blocks until the next request may be sent
+        """
+        with self._lock:
+            now = self._clock()
+            wait = self._next - now
+            self._next = max(now, self._next) + 1 / self.rate
+        if wait > 0:
+            self._sleep(wait)
+
+    def release(self):
+        """
+        Ends a request - nothing to do for a rate
+        """
+
+
+class SharedRateLimiter:
+    """
+    Token bucket and limit of simultaneous requests shared by all
+    processes and threads using the same directory, e.g. the forks of an
+    Ansible run. The bucket state is kept in a file updated under an
+    exclusive lock, every in-flight request holds the lock of one of
+    max_in_flight slot files. Locks of crashed processes are released by
+    the kernel, so nothing needs to be cleaned up.
+
+    .. class:: SharedRateLimiter
+    """
+
+    STATE = struct.Struct("dd")
+    """
+    Struct: Bucket state - tokens and time of the last update
+    """
+    SLOT_POLL_INTERVAL = 0.1
+    """
+    float: Maximum seconds between checks for a free slot
+    """
+
+    def __init__(
+            self, directory, rate=0, burst=None, max_in_flight=0,
+            clock=time.time, sleep=time.sleep
+    ):
+        """
+        Constructor creating the limiter
+
+        :param directory: directory for the lock files, one per server
+        :type directory: str
+        :param rate: maximum requests per second, 0 for no limit
+        :type rate: float
+        :param burst: requests allowed at once after being idle
+            (default: one second's worth of requests)
+        :type burst: float
+        :param max_in_flight: maximum simultaneous requests, 0 for no limit
+        :type max_in_flight: int
+        """
+        if rate < 0 or max_in_flight < 0:
+            raise ValueError("Limits must not be negative")
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self.rate = rate
+        self.burst = burst or max(rate, 1)
+        self.max_in_flight = max_in_flight
+        self._state_path = os.path.join(directory, "bucket")
+        self._slot_paths = [
+            os.path.join(directory, f"slot{index}") for index in range(max_in_flight)
+        ]
+        self._clock = clock
+        self._sleep = sleep
+        self._held = threading.local()
+
+    def acquire(self):
+        """
+        Blocks until a slot is free and the next request may be sent
+        """
+        if self._slot_paths:
+            self._acquire_slot()
+        if self.rate:
+            try:
+                self._acquire_token()
+            except BaseException:
+                self.release()
+                raise
+
+    def release(self):
+        """
+        Frees the slot of the current thread's request
+        """
+        held = getattr(self._held, "slots", None)
+        if held:
+            os.close(held.pop())
+
+    def _acquire_token(self):
+        """
+        Takes a token from the bucket, waiting for it if the bucket is
+        empty - waiting requests reserve tokens by going into debt, so
+        nobody needs to poll
+        """
+        handle = os.open(self._state_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            now = self._clock()
+            data = os.pread(handle, self.STATE.size, 0)
+            if len(data) == self.STATE.size:
+                tokens, updated = self.STATE.unpack(data)
+                tokens = min(tokens + max(now - updated, 0) * self.rate, self.burst)
+            else:
+                tokens = self.burst
+            tokens -= 1
+            os.pwrite(handle, self.STATE.pack(tokens, now), 0)
+        finally:
+            os.close(handle)
+        if tokens < 0:
+            self._sleep(-tokens / self.rate)
+
+    def _acquire_slot(self):
+        """
+        Locks a free slot file, polling with increasing intervals while
+        all slots are in use
+        """
+        interval = 0.005
+        while True:
+            start = random.randrange(len(self._slot_paths))
+            for path in self._slot_paths[start:] + self._slot_paths[:start]:
+                handle = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+                try:
+                    fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    os.close(handle)
+                    continue
+                except BaseException:
+                    os.close(handle)
+                    raise
+                if not hasattr(self._held, "slots"):
+                    self._held.slots = []
+                self._held.slots.append(handle)
+                return
+            self._sleep(interval)
+            interval = min(interval * 2, self.SLOT_POLL_INTERVAL)
@@ -0,0 +1,139 @@
+"""
+Snapshot of systems requiring a reboot
+"""
+
+from __future__ import (absolute_import, division, print_function)
+import threading
+import time
+
+__metaclass__ = type
+
+
+class RebootSnapshot:
+    """
+    Systems requiring a reboot, fetched at most once per TTL and indexed
+    by system ID and name for constant-time lookups
+
+    .. class:: RebootSnapshot
+    """
+
+    _SHARED = {}
+    _SHARED_LOCK = threading.Lock()
+
+    def __init__(self, fetch=None, ttl=60, clock=time.monotonic):
+        """
+        Constructor creating the snapshot
+
+        :param fetch: function returning systems as dicts (id, name) or
+            names, not needed when only using update()
+        :type fetch: callable
+        :param ttl: seconds to reuse a fetched list
+        :type ttl: float
+        """
+        self._fetch = fetch
+        self.ttl = ttl
+        self._clock = clock
+        self._expires = None
+        self._ids = frozenset()
+        self._names = frozenset()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_client(cls, api_client, ttl=60):
+        """
+        Returns the process-wide snapshot for the client's server and
+        user - which systems are visible depends on the organization. The
+        snapshot is refreshed using the client passed last.
+
+        :param api_client: API client
+        :type api_client: UyuniAPIClient
+        :param ttl: seconds to reuse a fetched list
+        :type ttl: float
+        """
+        # pylint: disable=protected-access
+        key = (api_client.url, api_client._username)
+        with cls._SHARED_LOCK:
+            snapshot = cls._SHARED.get(key)
+            if not snapshot:
+                snapshot = cls(ttl=ttl)
+                cls._SHARED[key] = snapshot
+            snapshot._fetch = api_client.get_systems_requiring_reboot
+            return snapshot
+
+    def invalidate(self):
+        """
+        Makes the next lookup fetch the systems again, e.g. after
+        scheduling a reboot
+        """
+        with self._lock:
+            self._expires = None
+
+    def refresh(self):
+        """
+        Fetches the systems requiring a reboot
+        """
+        self.update(self._fetch() or [])
+
+    def update(self, systems):
+        """
+        Replaces the snapshot with systems fetched by the caller
+
+        :param systems: systems as dicts (id, name) or names
+        :type systems: list
+        """
+        ids = set()
+        names = set()
+        for system in systems:
+            if isinstance(system, dict):
+                ids.add(system["id"])
+                names.add(system["name"])
+            else:
+                names.add(system)
+        with self._lock:
+            self._ids = frozenset(ids)
+            self._names = frozenset(names)
+            self._expires = self._clock() + self.ttl
+
+    @property
+    def expired(self):
+        """
+        Returns whether the snapshot needs to be refreshed
+        """
+        return self._expires is None or self._clock() >= self._expires
+
+    def _current(self):
+        """
+        Refreshes the snapshot if it expired
+        """
+        if self.expired:
+            self.refresh()
+
+    @property
+    def ids(self):
+        """
+        Returns the IDs of systems requiring a reboot
+        """
+        self._current()
+        return self._ids
+
+    @property
+    def names(self):
+        """
+        Returns the names of systems requiring a reboot
+        """
+        self._current()
+        return self._names
+
+    def requires_reboot(self, system):
+        """
+        Checks whether a system requires a reboot
+
+        :param system: profile ID or name
+        :type system: int or str
+        """
+        if isinstance(system, int):
+            return system in self.ids
+        return system in self.names
+
+    def __contains__(self, system):
+        return self.requires_reboot(system)
@@ -0,0 +1,383 @@
+"""
+Retries of transient Uyuni API failures and a circuit breaker
+"""
+
+from __future__ import (absolute_import, division, print_function)
+import fcntl
+import http.client
+import itertools
+import logging
+import os
+import ssl
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from xmlrpc.client import ProtocolError
+
+from .exceptions import CircuitOpenException
+from .polling import BackoffPoller
+
+__metaclass__ = type
+
+TRANSIENT_HTTP_STATUSES = (429, 502, 503, 504)
+"""
+tuple: HTTP statuses of an overloaded or restarting server
+"""
+IDEMPOTENT_PREFIXES = ("list", "get")
+"""
+tuple: Prefixes of API method names that only read data
+"""
+
+
+def is_idempotent(method, args=()):
+    """
+    Checks whether a call only reads data and can be sent again safely.
+    Multicalls are idempotent if all of their calls are.
+
+    :param method: API method name (e.g. system.listSystems)
+    :type method: str
+    :param args: call arguments
+    :type args: tuple
+    """
+    if method == "system.multicall":
+        return bool(args) and all(
+            is_idempotent(x.get("methodName", "")) for x in args[0]
+        )
+    return method.rpartition(".")[2].startswith(IDEMPOTENT_PREFIXES)
+
+
+def is_transient(err):
+    """
+    Checks whether an error was caused by an unavailable or overloaded
+    server rather than by the call itself
+
+    :param err: exception raised by a call
+    :type err: Exception
+    """
+    if isinstance(err, ProtocolError):
+        return err.errcode in TRANSIENT_HTTP_STATUSES
+    if isinstance(err, ssl.SSLCertVerificationError):
+        return False
+    return isinstance(err, (
+        ConnectionError, TimeoutError, http.client.HTTPException,
+        ssl.SSLEOFError
+    ))
+
+
+def _retry_after(err):
+    """
+    Returns the seconds to wait requested by the server, 0 if none
+    """
+    headers = getattr(err, "headers", None) or {}
+    try:
+        return max(float(headers.get("Retry-After", 0)), 0)
+    except (TypeError, ValueError):
+        # HTTP dates are not worth parsing for a few seconds
+        return 0
+
+
+class RetryBudget:
+    """
+    Limits retries to a share of all calls, so that retries can't
+    multiply the load of a struggling server. Every call earns ratio
+    tokens up to reserve, every retry costs one token.
+
+    .. class:: RetryBudget
+    """
+
+    def __init__(self, ratio=0.1, reserve=10):
+        """
+        Constructor creating the budget
+
+        :param ratio: retries allowed per call in the long run
+        :type ratio: float
+        :param reserve: retries allowed in a row, e.g. right after starting
+        :type reserve: int
+        """
+        self.ratio = ratio
+        self.reserve = reserve
+        self._tokens = float(reserve)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        """
+        Earns tokens for a call
+        """
+        with self._lock:
+            self._tokens = min(self._tokens + self.ratio, self.reserve)
+
+    def withdraw(self):
+        """
+        Returns whether a retry is within the budget and pays for it
+        """
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class CircuitBreaker:
+    """
+    Fails calls immediately after failure_threshold transient failures in
+    a row, without contacting the server. After reset_timeout seconds a
+    single call is let through: the circuit closes again if it succeeds
+    and stays open for another reset_timeout otherwise.
+
+    .. class:: CircuitBreaker
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, clock=time.monotonic):
+        """
+        Constructor creating the breaker
+
+        :param failure_threshold: transient failures in a row opening the
+            circuit
+        :type failure_threshold: int
+        :param reset_timeout: seconds until a call is let through again
+        :type reset_timeout: float
+        """
+        if failure_threshold < 1:
+            raise ValueError("Failure threshold needs to be at least 1")
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self):
+        """
+        Holds the lock protecting the state
+        """
+        with self._lock:
+            yield
+
+    @property
+    def state(self):
+        """
+        Returns the circuit state
+        """
+        with self._locked():
+            if self._opened is None:
+                return self.CLOSED
+            return self.HALF_OPEN if self._probing else self.OPEN
+
+    def allow(self, method):
+        """
+        Checks whether a call may be sent
+
+        :param method: API method name
+        :type method: str
+        :raises: CircuitOpenException
+        """
+        with self._locked():
+            if self._opened is None:
+                return
+            remaining = self._opened + self.reset_timeout - self._clock()
+            if remaining > 0:
+                raise CircuitOpenException(
+                    f"Not calling {method}: the Uyuni server failed "
+                    f"{self._failures} times in a row, trying again in "
+                    f"{remaining:.1f} seconds"
+                )
+            # let this call probe the server, others wait another period
+            self._opened = self._clock()
+            self._probing = True
+
+    def record(self, success):
+        """
+        Records the outcome of a call
+
+        :param success: False if the call failed transiently
+        :type success: bool
+        """
+        with self._locked():
+            if success:
+                self._failures = 0
+                self._opened = None
+            else:
+                self._failures += 1
+                if self._probing or self._failures >= self.failure_threshold:
+                    self._opened = self._clock()
+            self._probing = False
+
+
+class SharedCircuitBreaker(CircuitBreaker):
+    """
+    Circuit breaker shared by all processes and threads using the same
+    directory, e.g. the forks of an Ansible run, so that they stop
+    calling a failing server together. The state is kept in a file
+    updated under an exclusive lock.
+
+    .. class:: SharedCircuitBreaker
+    """
+
+    STATE = struct.Struct("ddd")
+    """
+    Struct: Circuit state - failures in a row, time the circuit opened
+    (0 if closed) and whether a call probes the server
+    """
+
+    def __init__(self, directory, failure_threshold=5, reset_timeout=30, clock=time.time):
+        """
+        Constructor creating the breaker
+
+        :param directory: directory for the state file, one per server
+        :type directory: str
+
+        See CircuitBreaker for the remaining parameters.
+        """
+        super().__init__(failure_threshold, reset_timeout, clock)
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self._state_path = os.path.join(directory, "breaker")
+
+    @contextmanager
+    def _locked(self):
+        """
+        Loads the state under an exclusive file lock and stores it again
+        """
+        with self._lock:
+            handle = os.open(self._state_path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+                data = os.pread(handle, self.STATE.size, 0)
+                failures, opened, probing = (
+                    self.STATE.unpack(data) if len(data) == self.STATE.size
+                    else (0, 0, 0)
+                )
+                self._failures = int(failures)
+                self._opened = opened or None
+                self._probing = bool(probing)
+                yield
+                os.pwrite(handle, self.STATE.pack(
+                    self._failures, self._opened or 0, self._probing
+                ), 0)
+            finally:
+                os.close(handle)
+
+
+class RetryPolicy:
+    """
+    Retries calls that failed because the server was unavailable or
+    overloaded, waiting with exponential backoff and jitter. Only calls
+    that read data (list*, get*) are retried, other calls only if the
+    connection was refused, i.e. nothing was sent. Retries are limited by
+    a budget and a circuit breaker stops calling a failing server.
+
+    .. class:: RetryPolicy
+    """
+
+    LOGGER = logging.getLogger("RetryPolicy")
+    """
+    logging: Logger instance
+    """
+
+    def __init__(
+            self, retries=3, min_delay=0.5, max_delay=10, jitter=0.5,
+            budget=None, breaker=None, sleep=time.sleep
+    ):
+        """
+        Constructor creating the policy
+
+        :param retries: maximum retries per call
+        :type retries: int
+        :param min_delay: seconds to wait before the first retry
+        :type min_delay: float
+        :param max_delay: upper limit for the seconds between retries
+        :type max_delay: float
+        :param jitter: relative random deviation of every delay (0-1)
+        :type jitter: float
+        :param budget: retry budget (default: 10% of the calls)
+        :type budget: RetryBudget
+        :param breaker: circuit breaker (default: opening after 5 failures)
+        :type breaker: CircuitBreaker
+        """
+        self.retries = retries
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.budget = budget if budget is not None else RetryBudget()
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self._sleep = sleep
+
+    def delays(self):
+        """
+        Returns an iterator of the seconds to wait before every retry
+        """
+        return BackoffPoller(
+            min_interval=self.min_delay, max_interval=self.max_delay,
+            jitter=self.jitter
+        ).intervals()
+
+    def before_call(self, method):
+        """
+        Checks whether a call may be sent
+
+        :raises: CircuitOpenException
+        """
+        self.breaker.allow(method)
+
+    def succeeded(self):
+        """
+        Records a call that reached the server
+        """
+        self.breaker.record(True)
+
+    def retry_delay(self, method, args, err, attempt, delays):
+        """
+        Records a failed call and returns the seconds to wait before
+        sending it again, None if it must not be retried
+
+        :param method: API method name
+        :type method: str
+        :param args: call arguments
+        :type args: tuple
+        :param err: exception raised by the call
+        :type err: Exception
+        :param attempt: number of retries made so far
+        :type attempt: int
+        :param delays: iterator returned by delays()
+        :type delays: iterator
+        """
+        if isinstance(err, CircuitOpenException):
+            return None
+        transient = is_transient(err)
+        self.breaker.record(not transient)
+        if (
+            not transient or attempt >= self.retries
+            or not (is_idempotent(method, args) or isinstance(err, ConnectionRefusedError))
+            or not self.budget.withdraw()
+        ):
+            return None
+        delay = min(max(next(delays), _retry_after(err)), self.max_delay)
+        self.LOGGER.info(
+            "Retrying %s in %.1f seconds after: %s", method, delay, err
+        )
+        return delay
+
+    def middleware(self, call, method, args):
+        """
+        RPCProxy middleware retrying failed calls
+        """
+        self.budget.deposit()
+        delays = self.delays()
+        for attempt in itertools.count():
+            self.before_call(method)
+            try:
+                result = call(method, args)
+            except Exception as err:
+                delay = self.retry_delay(method, args, err, attempt, delays)
+                if delay is None:
+                    raise
+                self._sleep(delay)
+                continue
+            self.succeeded()
+            return result
@@ -0,0 +1,104 @@
+"""
+Call wrapper for the Uyuni XMLRPC API
+"""
+
+from __future__ import (absolute_import, division, print_function)
+from functools import partial
+
+__metaclass__ = type
+
+INVALID_SESSION_FAULT = 2950
+"""
+int: Fault code returned for rejected credentials or session keys
+"""
+INVALID_SESSION_MESSAGES = (
+    "invalid session",
+    "could not find session",
+    "session expired",
+    "session has expired",
+)
+"""
+tuple: Fault message fragments that indicate an invalid session key
+"""
+
+
+def is_invalid_session(err):
+    """
+    Checks whether a XMLRPC fault was caused by an invalid or expired
+    session key
+
+    :param err: XMLRPC fault
+    :type err: Fault
+    """
+    if err.faultCode == INVALID_SESSION_FAULT:
+        return True
+    message = err.faultString.lower()
+    return any(x in message for x in INVALID_SESSION_MESSAGES)
+
+
+class _Method:
+    """
+    Callable sending a particular API method through an RPCProxy
+    """
+
+    def __init__(self, proxy, name):
+        self._proxy = proxy
+        self._name = name
+
+    def __getattr__(self, name):
+        return _Method(self._proxy, f"{self._name}.{name}")
+
+    def __call__(self, *args):
+        return self._proxy.call(self._name, args)
+
+
+class RPCProxy:
+    """
+    Wraps a ServerProxy and passes every call through a chain of
+    middlewares. A middleware is called with the next handler, the method
+    name and the arguments and returns the call result - it may change
+    the arguments, retry or record the call.
+
+    .. class:: RPCProxy
+    """
+
+    def __init__(self, server_proxy, middlewares=None):
+        """
+        Constructor creating the proxy
+
+        :param server_proxy: proxy sending the calls
+        :type server_proxy: ServerProxy
+        :param middlewares: middlewares, the first one is called first
+        :type middlewares: list
+        """
+        self._server_proxy = server_proxy
+        self.middlewares = list(middlewares or [])
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return _Method(self, name)
+
+    def __call__(self, attr):
+        # allows closing the connection and accessing the transport
+        return self._server_proxy(attr)
+
+    def call(self, method, args):
+        """
+        Sends a call through all middlewares
+
+        :param method: API method name (e.g. system.getId)
+        :type method: str
+        :param args: call arguments
+        :type args: tuple
+        """
+        handler = self._send
+        for middleware in reversed(self.middlewares):
+            handler = partial(middleware, handler)
+        return handler(method, args)
+
+    def _send(self, method, args):
+        """
+        Sends a call to the server
+        """
+        return getattr(self._server_proxy, method)(*args)
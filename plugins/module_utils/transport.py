@@ -0,0 +1,443 @@
+"""
+Connection pooling transports for the Uyuni XMLRPC API client
+"""
+
+from __future__ import (absolute_import, division, print_function)
+import asyncio
+import errno
+import http.client
+import threading
+import time
+from collections import deque
+from xmlrpc.client import ProtocolError, SafeTransport, Transport
+
+__metaclass__ = type
+
+STALE_CONNECTION_ERRNOS = (errno.ECONNRESET, errno.ECONNABORTED, errno.EPIPE)
+"""
+tuple: Socket errors that indicate a keep-alive connection closed by the peer
+"""
+
+
+class _CountingResponse:
+    """
+    Response wrapper counting the bytes read from a response without
+    Content-Length header
+    """
+
+    def __init__(self, response, transfers):
+        self._response = response
+        self._transfers = transfers
+
+    def getheader(self, name, default=None):
+        return self._response.getheader(name, default)
+
+    def read(self, amt=None):
+        data = self._response.read(amt)
+        self._transfers.add(received=len(data))
+        return data
+
+    def close(self):
+        self._response.close()
+
+
+class TransferCountingMixin:
+    """
+    Transport mixin reporting sent requests and transferred bytes to the
+    TransferLog of an Instrumentation, if one is set
+
+    .. class:: TransferCountingMixin
+    """
+
+    transfers = None
+    """
+    TransferLog: Log to add requests and bytes to
+    """
+
+    def send_content(self, connection, request_body):
+        if self.transfers is not None:
+            self.transfers.add(sent=len(request_body), requests=1)
+        super(TransferCountingMixin, self).send_content(connection, request_body)
+
+    def parse_response(self, response):
+        if self.transfers is not None:
+            length = response.getheader("Content-Length")
+            if length and length.isdigit():
+                self.transfers.add(received=int(length))
+            else:
+                response = _CountingResponse(response, self.transfers)
+        return super(TransferCountingMixin, self).parse_response(response)
+
+
+class CountingSafeTransport(TransferCountingMixin, SafeTransport):
+    """
+    Default HTTPS transport reporting its transfers
+
+    .. class:: CountingSafeTransport
+    """
+
+
+class PooledTransport(TransferCountingMixin, Transport):
+    """
+    XMLRPC transport keeping a bounded pool of keep-alive connections.
+
+    Unlike the default transport, which caches a single connection and
+    drops it after any error, this transport can be shared between threads
+    and transparently reconnects when the server closed an idle connection.
+
+    .. class:: PooledTransport
+    """
+
+    def __init__(self, pool_size=4, idle_timeout=15, rate_limiter=None, **kwargs):
+        """
+        Constructor creating the transport.
+
+        :param pool_size: maximum number of simultaneously open connections
+        :type pool_size: int
+        :param idle_timeout: seconds after which idle connections are dropped
+        :type idle_timeout: int
+        :param rate_limiter: limiter to acquire before and release after
+            every request
+        :type rate_limiter: RateLimiter
+        """
+        super(PooledTransport, self).__init__(**kwargs)
+        if pool_size < 1:
+            raise ValueError("Pool size needs to be at least 1")
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.rate_limiter = rate_limiter
+        self.connections_opened = 0
+        self._idle = {}
+        self._in_use = 0
+        self._lock = threading.Condition()
+
+    def _open_connection(self, host):
+        """
+        Opens a new HTTP connection to the given host
+        """
+        chost, self._extra_headers, x509 = self.get_host_info(host)
+        return http.client.HTTPConnection(chost)
+
+    def _acquire(self, host):
+        """
+        Returns a connection and a flag whether it has been used before.
+        Blocks while the pool is exhausted.
+        """
+        with self._lock:
+            while True:
+                idle = self._idle.setdefault(host, deque())
+                while idle:
+                    connection, last_used = idle.pop()
+                    if time.monotonic() - last_used < self.idle_timeout:
+                        self._in_use += 1
+                        return connection, True
+                    connection.close()
+                if self._in_use + self._idle_count() < self.pool_size:
+                    self._in_use += 1
+                    break
+                if self._idle_count():
+                    # pool is filled up with connections to other hosts
+                    self._evict_oldest()
+                    continue
+                self._lock.wait()
+
+        try:
+            connection = self._open_connection(host)
+        except Exception:
+            self._release(host, None)
+            raise
+        with self._lock:
+            self.connections_opened += 1
+        return connection, False
+
+    def _idle_count(self):
+        """
+        Returns the number of idle connections in the pool
+        """
+        return sum(len(x) for x in self._idle.values())
+
+    def _evict_oldest(self):
+        """
+        Closes the least recently used idle connection
+        """
+        host = min(
+            (x for x in self._idle if self._idle[x]),
+            key=lambda x: self._idle[x][0][1]
+        )
+        self._idle[host].popleft()[0].close()
+
+    def _release(self, host, connection):
+        """
+        Returns a connection to the pool - None discards the slot
+        """
+        with self._lock:
+            self._in_use -= 1
+            if connection is not None:
+                self._idle.setdefault(host, deque()).append(
+                    (connection, time.monotonic())
+                )
+            self._lock.notify()
+
+    def request(self, host, handler, request_body, verbose=False):
+        """
+        Sends a request once the rate limiter allows it, retrying once if
+        a reused connection turned out to be closed by the server
+        """
+        if not self.rate_limiter:
+            return self._request(host, handler, request_body, verbose)
+        self.rate_limiter.acquire()
+        try:
+            return self._request(host, handler, request_body, verbose)
+        finally:
+            self.rate_limiter.release()
+
+    def _request(self, host, handler, request_body, verbose):
+        """
+        Sends a request using a pooled connection
+        """
+        while True:
+            connection, reused = self._acquire(host)
+            try:
+                response = self._send(
+                    connection, handler, request_body, verbose
+                )
+            except http.client.RemoteDisconnected:
+                connection.close()
+                self._release(host, None)
+                if not reused:
+                    raise
+                continue
+            except OSError as err:
+                connection.close()
+                self._release(host, None)
+                if not reused or err.errno not in STALE_CONNECTION_ERRNOS:
+                    raise
+                continue
+            except Exception:
+                connection.close()
+                self._release(host, None)
+                raise
+            break
+
+        try:
+            if response.status != 200:
+                response.read()
+                raise ProtocolError(
+                    host + handler, response.status, response.reason,
+                    dict(response.getheaders())
+                )
+            self.verbose = verbose
+            result = self.parse_response(response)
+        except Exception:
+            connection.close()
+            self._release(host, None)
+            raise
+
+        if response.will_close:
+            connection.close()
+            connection = None
+        self._release(host, connection)
+        return result
+
+    def _send(self, connection, handler, request_body, verbose):
+        """
+        Sends the request body and returns the server response
+        """
+        if verbose:
+            connection.set_debuglevel(1)
+        headers = self._headers + self._extra_headers
+        connection.putrequest(
+            "POST", handler, skip_accept_encoding=True
+        )
+        if self.accept_gzip_encoding:
+            headers.append(("Accept-Encoding", "gzip"))
+        headers.append(("Content-Type", "text/xml"))
+        headers.append(("User-Agent", self.user_agent))
+        self.send_headers(connection, headers)
+        self.send_content(connection, request_body)
+        return connection.getresponse()
+
+    def close(self):
+        """
+        Closes all idle connections
+        """
+        with self._lock:
+            for idle in self._idle.values():
+                while idle:
+                    idle.pop()[0].close()
+
+
+class PooledSafeTransport(PooledTransport, SafeTransport):
+    """
+    HTTPS flavour of the pooled XMLRPC transport
+
+    .. class:: PooledSafeTransport
+    """
+
+    def _open_connection(self, host):
+        """
+        Opens a new HTTPS connection to the given host
+        """
+        chost, self._extra_headers, x509 = self.get_host_info(host)
+        return http.client.HTTPSConnection(
+            chost, None, context=self.context, **(x509 or {})
+        )
+
+
+class AsyncTransport:
+    """
+    Non-blocking HTTP/1.1 transport for XMLRPC requests using asyncio
+    streams. At most pool_size requests are in flight at once, each on its
+    own keep-alive connection.
+
+    .. class:: AsyncTransport
+    """
+
+    USER_AGENT = "Python-xmlrpc-asyncio"
+    """
+    str: User-Agent header sent with every request
+    """
+
+    def __init__(self, host, port, ssl_context=None, pool_size=10, timeout=60):
+        """
+        Constructor creating the transport
+
+        :param host: server hostname
+        :type host: str
+        :param port: server port
+        :type port: int
+        :param ssl_context: SSL context, plain HTTP is used if not set
+        :type ssl_context: ssl.SSLContext
+        :param pool_size: maximum number of simultaneous requests
+        :type pool_size: int
+        :param timeout: seconds to wait for a connection or response
+        :type timeout: float
+        """
+        if pool_size < 1:
+            raise ValueError("Pool size needs to be at least 1")
+        self.host = host
+        self.port = port
+        self.ssl_context = ssl_context
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.connections_opened = 0
+        self._idle = []
+        self._slots = asyncio.Semaphore(pool_size)
+
+    async def _open_connection(self):
+        """
+        Opens a new connection to the server
+        """
+        connection = await asyncio.wait_for(
+            asyncio.open_connection(
+                self.host, self.port, ssl=self.ssl_context,
+                server_hostname=self.host if self.ssl_context else None
+            ),
+            self.timeout
+        )
+        self.connections_opened += 1
+        return connection
+
+    async def request(self, handler, request_body):
+        """
+        Sends a request and returns the response body, retrying once if a
+        reused connection turned out to be closed by the server
+
+        :param handler: request path (e.g. /rpc/api)
+        :type handler: str
+        :param request_body: XMLRPC request
+        :type request_body: bytes
+        """
+        async with self._slots:
+            while True:
+                reused = bool(self._idle)
+                connection = self._idle.pop() if reused else await self._open_connection()
+                try:
+                    status, reason, headers, body, keep_alive = await asyncio.wait_for(
+                        self._exchange(connection, handler, request_body),
+                        self.timeout
+                    )
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    connection[1].close()
+                    if not reused:
+                        raise
+                    continue
+                except BaseException:
+                    connection[1].close()
+                    raise
+                break
+
+            if keep_alive:
+                self._idle.append(connection)
+            else:
+                connection[1].close()
+
+        if status != 200:
+            raise ProtocolError(
+                f"{self.host}:{self.port}{handler}", status, reason, headers
+            )
+        return body
+
+    async def _exchange(self, connection, handler, request_body):
+        """
+        Sends a request and reads the response
+        """
+        reader, writer = connection
+        writer.write(
+            f"POST {handler} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            f"User-Agent: {self.USER_AGENT}\r\n"
+            "Content-Type: text/xml\r\n"
+            f"Content-Length: {len(request_body)}\r\n"
+            "\r\n".encode("latin-1") + request_body
+        )
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed by server")
+        version, status, reason = (
+            status_line.decode("latin-1").rstrip("\r\n").split(" ", 2) + [""]
+        )[:3]
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        keep_alive = (
+            version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        )
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = await self._read_chunked(reader)
+        elif "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await reader.read()
+            keep_alive = False
+        return int(status), reason, headers, body, keep_alive
+
+    @staticmethod
+    async def _read_chunked(reader):
+        """
+        Reads a response body using chunked transfer encoding
+        """
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            if not size:
+                # skip trailers
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+
+    def close(self):
+        """
+        Closes all idle connections
+        """
+        while self._idle:
+            self._idle.pop()[1].close()
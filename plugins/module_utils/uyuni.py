@@ -3,15 +3,27 @@ Uyuni XMLRPC API client
 """
 
 from __future__ import (absolute_import, division, print_function)
+import hashlib
 import logging
+import os
 import ssl
+import threading
+import time
 import base64
 from datetime import datetime, timedelta
+from functools import partial
 from xmlrpc.client import DateTime, Fault, ServerProxy
 
+from .cache import ErrataCache, JSONFileStore, TTLCache
+from .multicall import MultiCallBatch
+from .polling import BackoffPoller
+from .reboot import RebootSnapshot
+from .rpc import RPCProxy, is_invalid_session
+from .transport import CountingSafeTransport, PooledSafeTransport
 from .utilities import split_rpm_filename
 from .exceptions import (
     APILevelNotSupportedException,
+    CircuitOpenException,
     EmptySetException,
     InvalidCredentialsException,
     SessionException,
@@ -41,10 +53,53 @@ class UyuniAPIClient:
     """
     dict: Default headers set for every HTTP request
     """
+    MULTICALL_BATCH_SIZE = 500
+    """
+    int: Default maximum number of calls per system.multicall request
+    """
+    ACTION_LOOKUP_WINDOW = timedelta(days=1)
+    """
+    timedelta: Default date window when searching system events for an action
+    """
+    HOST_ID_CACHE_TTL = 600
+    """
+    int: Seconds to cache hostname to system ID resolutions
+    """
+    HOST_ID_CACHE_SIZE = 50000
+    """
+    int: Maximum number of cached hostname to system ID resolutions
+    """
+    PROVIDING_ERRATA_CACHE_TTL = 86400
+    """
+    int: Seconds to cache the errata providing a package
+    """
+    PROVIDING_ERRATA_CACHE_SIZE = 200000
+    """
+    int: Maximum number of packages to cache providing errata for
+    """
+    SESSION_TTL = 3000
+    """
+    int: Seconds to reuse a session key, a bit shorter than the server's
+    default session lifetime of one hour
+    """
+    _PROVIDING_ERRATA = {}
+    """
+    dict: Process-wide providing errata caches by server URL and username
+    """
+    API_VERSION_CACHE_TTL = 86400
+    """
+    int: Seconds to cache a server's API version
+    """
+    _API_VERSIONS = TTLCache(ttl=API_VERSION_CACHE_TTL)
+    """
+    TTLCache: Process-wide API versions by server URL
+    """
 
     def __init__(
             self, log_level, hostname, username, password,
-            port=443, verify=True
+            port=443, verify=True, pool_size=None, rate_limiter=None,
+            cache_dir=None, session_key=None, session_store=None,
+            validate_api=True, instrumentation=None, retry_policy=None
     ):
         """
         Constructor creating the class. It requires specifying a
@@ -63,6 +118,26 @@ class UyuniAPIClient:
         :type port: int
         :param verify: SSL verification
         :type verify: bool
+        :param pool_size: keep-alive connections to pool (default: no pooling)
+        :type pool_size: int
+        :param rate_limiter: limiter shared by clients (implies pooling)
+        :type rate_limiter: RateLimiter
+        :param cache_dir: directory for caches shared between processes
+        :type cache_dir: str
+        :param session_key: key of an existing session to use instead of
+            logging in
+        :type session_key: str
+        :param session_store: store to share session keys with other
+            processes
+        :type session_store: SessionKeyStore
+        :param validate_api: check whether the server's API version is
+            supported
+        :type validate_api: bool
+        :param instrumentation: registry to record all API calls in
+        :type instrumentation: Instrumentation
+        :param retry_policy: policy retrying calls that failed because the
+            server was unavailable (default: no retries)
+        :type retry_policy: RetryPolicy
         """
         # set logging
         self.LOGGER.setLevel(log_level)
@@ -75,14 +150,34 @@ class UyuniAPIClient:
         self.LOGGER.debug("Set hostname to '%s'", hostname)
         self.url = f"https://{hostname}:{port}/rpc/api"
         self.verify = verify
+        self.pool_size = pool_size
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
 
         # start session and check API version if Uyuni API
-        self._api_key = None
+        self._api_key = session_key
+        self.session_expires = time.time() + self.SESSION_TTL
         self._username = username
         self._password = password
+        self._session_store = session_store
+        self._login_lock = threading.Lock()
+        if session_store and not session_key:
+            self._api_key, expires = session_store.get(
+                self.url, username, password
+            )
+            if self._api_key:
+                self.session_expires = expires
         self._session = None
+        self.multicall_supported = True
+        self.cache_dir = cache_dir
+        self._host_ids = TTLCache(self.HOST_ID_CACHE_SIZE, self.HOST_ID_CACHE_TTL)
+        self._host_id_store = None
+        self._errata = None
+        self.instrumentation = instrumentation
+        self._instrumentation_middleware = None
         self._connect()
-        self.validate_api_support()
+        if validate_api:
+            self.validate_api_support()
 
     def _connect(self):
         """
@@ -95,8 +190,82 @@ class UyuniAPIClient:
             else:
                 context = ssl.create_default_context()
 
-            self._session = ServerProxy(self.url, context=context)
-            self._api_key = self._session.auth.login(
+            if self.pool_size or self.rate_limiter:
+                server_proxy = ServerProxy(
+                    self.url,
+                    transport=PooledSafeTransport(
+                        pool_size=self.pool_size or 1,
+                        rate_limiter=self.rate_limiter,
+                        context=context
+                    )
+                )
+            else:
+                server_proxy = ServerProxy(
+                    self.url, transport=CountingSafeTransport(context=context)
+                )
+            self._session = RPCProxy(
+                server_proxy, [self._renew_invalid_session]
+            )
+            if self.retry_policy:
+                self._session.middlewares.insert(0, self.retry_policy.middleware)
+            if self.instrumentation:
+                self.instrument(self.instrumentation)
+            if not self._api_key:
+                self.login()
+        except ssl.SSLCertVerificationError as err:
+            self.LOGGER.error(err)
+            raise SSLCertVerificationError(str(err)) from err
+
+    def instrument(self, instrumentation):
+        """
+        Records all further API calls in an instrumentation registry,
+        replacing the current one - None stops recording
+
+        :param instrumentation: registry to record the calls in
+        :type instrumentation: Instrumentation
+        """
+        middlewares = self._session.middlewares
+        if self._instrumentation_middleware in middlewares:
+            middlewares.remove(self._instrumentation_middleware)
+        self.instrumentation = instrumentation
+        self._instrumentation_middleware = None
+        transport = self._session("transport")
+        transport.transfers = None
+        if instrumentation:
+            # first, so that replayed calls count as retries
+            self._instrumentation_middleware = partial(
+                instrumentation.middleware, server=self.url.split("/")[2]
+            )
+            middlewares.insert(0, self._instrumentation_middleware)
+            transport.transfers = instrumentation.transfers
+
+    def login(self):
+        """
+        Starts a new session, replacing and ending the current one
+        """
+        with self._login_lock:
+            previous_key = self._api_key
+            self._api_key, self.session_expires = self._new_session()
+            if self._session_store:
+                self._session_store.set(
+                    self.url, self._username, self._password,
+                    self._api_key, self.session_expires
+                )
+            if previous_key:
+                self._end_session(previous_key)
+
+    def _new_session(self):
+        """
+        Logs in and returns the key and expiry time of the new session
+        """
+        return self._request_session_key(), time.time() + self.SESSION_TTL
+
+    def _request_session_key(self):
+        """
+        Logs in and returns the key of the new session
+        """
+        try:
+            return self._session.auth.login(
                 self._username, self._password
             )
         except ssl.SSLCertVerificationError as err:
@@ -111,6 +280,88 @@ class UyuniAPIClient:
                 f"Generic remote communication error: {err.faultString!r}"
             ) from err
 
+    def logout(self):
+        """
+        Ends the current session and removes it from the session store
+        """
+        with self._login_lock:
+            session_key, self._api_key = self._api_key, None
+            if not session_key:
+                return
+            if self._session_store:
+                self._session_store.delete(
+                    self.url, self._username, self._password, session_key
+                )
+            self._end_session(session_key)
+
+    def _end_session(self, session_key):
+        """
+        Logs out a session, ignoring sessions that already expired and
+        unavailable servers
+        """
+        try:
+            self._session.auth.logout(session_key)
+        except (Fault, OSError, CircuitOpenException) as err:
+            self.LOGGER.debug("Unable to end session: %s", err)
+
+    def renew_session(self, rejected_key):
+        """
+        Starts a new session unless the rejected key was already replaced
+        by another thread. With a session store, a session another process
+        started meanwhile is used instead.
+
+        :param rejected_key: session key rejected by the server or expired
+        :type rejected_key: str
+        """
+        with self._login_lock:
+            if rejected_key != self._api_key:
+                return
+            self.LOGGER.info("Session expired, logging in again")
+
+            def replace_session():
+                session = self._new_session()
+                # nobody picks up the replaced key from the store anymore
+                self._end_session(rejected_key)
+                return session
+
+            if self._session_store:
+                self._api_key, self.session_expires = self._session_store.renew(
+                    self.url, self._username, self._password, rejected_key,
+                    replace_session
+                )
+            else:
+                self._api_key, self.session_expires = replace_session()
+
+    def _renew_invalid_session(self, call, method, args):
+        """
+        Middleware starting a new session if the server rejected the
+        session key of a call and replaying the call exactly once
+        """
+        try:
+            return call(method, args)
+        except Fault as err:
+            if (
+                method.startswith(("api.", "auth.")) or not args
+                or not isinstance(args[0], str) or not is_invalid_session(err)
+            ):
+                raise
+            self.renew_session(args[0])
+        return call(method, (self._api_key,) + tuple(args[1:]))
+
+    @property
+    def session_key(self):
+        """
+        Returns the key of the current session
+        """
+        return self._api_key
+
+    @property
+    def session_store(self):
+        """
+        Returns the store sharing session keys with other processes or None
+        """
+        return self._session_store
+
     def validate_api_support(self):
         """
         Checks whether the API version on the Uyuni server is supported.
@@ -121,7 +372,7 @@ class UyuniAPIClient:
         """
         try:
             # check whether API is supported
-            api_level = self._session.api.getVersion()
+            api_level = self.get_api_version()
             if float(api_level) < self.API_MIN:
                 raise APILevelNotSupportedException(
                     f"Your API version ({api_level!r}) doesn't support"
@@ -135,6 +386,80 @@ class UyuniAPIClient:
                 "Unable to verify API version"
             ) from err
 
+    def get_api_version(self):
+        """
+        Returns the server's API version. It is cached for all clients of
+        the process and, if a cache directory is set, on disk.
+        """
+        api_level = self._API_VERSIONS.get(self.url)
+        if api_level is not None:
+            return api_level
+
+        store = self._cache_store("api_version")
+        stored = store.load() if store else {}
+        if stored.get("expires", 0) > time.time():
+            api_level = stored["version"]
+            self._API_VERSIONS.set(self.url, api_level, stored["expires"])
+            return api_level
+
+        api_level = self._session.api.getVersion()
+        expires = time.time() + self.API_VERSION_CACHE_TTL
+        self._API_VERSIONS.set(self.url, api_level, expires)
+        if store:
+            store.save({"version": api_level, "expires": expires})
+        return api_level
+
+    def _cache_store(self, name):
+        """
+        Returns the persistent store of a cache for this server and user
+        or None if no cache directory is configured
+
+        :param name: cache name
+        :type name: str
+        """
+        if not self.cache_dir:
+            return None
+        server = hashlib.sha1(
+            f"{self.url}:{self._username}".encode("utf-8")
+        ).hexdigest()[:16]
+        return JSONFileStore(
+            os.path.join(self.cache_dir, f"{name}_{server}.json")
+        )
+
+    @property
+    def errata_cache(self):
+        """
+        Returns the errata details cache, loaded on first use
+        """
+        if self._errata is None:
+            store = self._cache_store("errata")
+            if store:
+                store = JSONFileStore(store.path + ".gz", compress=True)
+            self._errata = ErrataCache(store)
+        return self._errata
+
+    def refresh_errata_cache(self):
+        """
+        Drops all cached errata details
+        """
+        self.errata_cache.clear()
+
+    def multicall(self, batch_size=None):
+        """
+        Returns a batch that queues API calls and sends them using
+        system.multicall when leaving the context, e.g.:
+
+            with api_client.multicall() as batch:
+                network = batch.system.getNetwork(system_id)
+            network.get()
+
+        The session key is added to every call automatically.
+
+        :param batch_size: maximum number of calls per request
+        :type batch_size: int
+        """
+        return MultiCallBatch(self, batch_size or self.MULTICALL_BATCH_SIZE)
+
     def get_hosts(self):
         """
         Returns all system IDs
@@ -253,34 +578,107 @@ class UyuniAPIClient:
                 f"Generic remote communication error: {err.faultString!r}"
             ) from err
 
+    def get_hosts_by_hostgroups(self, hostgroups, strict=False):
+        """
+        Returns the system IDs of multiple hostgroups using a single batch
+
+        :param hostgroups: hostgroup names
+        :type hostgroups: list
+        :param strict: raise for unknown hostgroups instead of returning no
+            systems
+        :type strict: bool
+        :rtype: dict
+        """
+        return {
+            hostgroup: list(hosts.values()) for hostgroup, hosts
+            in self.get_hostgroups_systems(hostgroups, strict).items()
+        }
+
+    def get_hostgroups_systems(self, hostgroups, strict=False):
+        """
+        Returns the system IDs by profile name of multiple hostgroups using
+        a single batch
+
+        :param hostgroups: hostgroup names
+        :type hostgroups: list
+        :param strict: raise for unknown hostgroups instead of returning no
+            systems
+        :type strict: bool
+        :rtype: dict
+        """
+        with self.multicall() as batch:
+            members = {
+                x: batch.systemgroup.listSystems(x) for x in hostgroups
+            }
+
+        result = {}
+        for hostgroup, hosts in members.items():
+            try:
+                result[hostgroup] = {
+                    x.get("profile_name") or x.get("name") or str(x["id"]): x["id"]
+                    for x in hosts.get()
+                }
+            except EmptySetException as err:
+                if strict:
+                    raise EmptySetException(
+                        f"System group not found: {hostgroup!r}"
+                    ) from err
+                result[hostgroup] = {}
+        return result
+
     def get_hosts_by_required_reboot(self):
         """
         Returns all systems requiring a reboot
         """
+        hosts = self.get_systems_requiring_reboot()
+        if hosts:
+            return [x["name"] for x in hosts]
+        return None
+
+    def get_systems_requiring_reboot(self):
+        """
+        Returns IDs and names of all systems requiring a reboot
+        """
         try:
-            hosts = self._session.system.listSuggestedReboot(
+            return self._session.system.listSuggestedReboot(
                 self._api_key
             )
-
-            if hosts:
-                return [x["name"] for x in hosts]
         except Fault as err:
             raise SessionException(
                 f"Generic remote communication error: {err.faultString!r}"
             ) from err
 
+    @property
+    def reboot_snapshot(self):
+        """
+        Returns the process-wide snapshot of systems requiring a reboot
+        """
+        return RebootSnapshot.for_client(self)
+
     def get_host_id(self, hostname):
         """
-        Returns the profile ID of a particular system
+        Returns the profile ID of a particular system. Resolutions are
+        cached - if a cache directory is set, the first lookup preloads
+        all systems.
 
         :param hostname: system hostname
         :type hostname: str
         """
+        self._load_host_ids()
+        host_id = self._host_ids.get(hostname)
+        if host_id is not None:
+            return host_id
+        if self._host_id_store and not len(self._host_ids):
+            host_id = self.preload_host_ids().get(hostname)
+            if host_id is not None:
+                return host_id
+
         try:
             host_id = self._session.system.getId(
                 self._api_key, hostname
             )
             if host_id:
+                self._remember_host_ids({hostname: host_id[0]["id"]})
                 return host_id[0]["id"]
             raise EmptySetException(
                 f"System not found: {hostname!r}"
@@ -294,6 +692,48 @@ class UyuniAPIClient:
                 f"Generic remote communication error: {err.faultString!r}"
             ) from err
 
+    def preload_host_ids(self):
+        """
+        Caches the profile IDs of all systems using a single call and
+        returns them by hostname
+        """
+        host_ids = {}
+        for host in self.get_all_hosts():
+            host_ids.setdefault(host["name"], host["id"])
+        self._remember_host_ids(host_ids)
+        return host_ids
+
+    def _load_host_ids(self):
+        """
+        Loads cached hostname to system ID resolutions from disk once
+        """
+        if self._host_id_store is None:
+            self._host_id_store = self._cache_store("host_ids") or False
+            if self._host_id_store:
+                self._host_ids.load(self._host_id_store.load())
+
+    def _remember_host_ids(self, host_ids):
+        """
+        Caches hostname to system ID resolutions
+
+        :param host_ids: system IDs by hostname
+        :type host_ids: dict
+        """
+        for hostname, host_id in host_ids.items():
+            self._host_ids.set(hostname, host_id)
+        if not self._host_id_store:
+            return
+
+        def merge(stored):
+            # keep resolutions stored by other processes meanwhile
+            self._host_ids.load(stored)
+            for hostname, host_id in host_ids.items():
+                self._host_ids.set(hostname, host_id)
+            stored.clear()
+            stored.update(self._host_ids.dump())
+
+        self._host_id_store.update(merge)
+
     def get_hostname_by_id(self, system_id):
         """
         Returns the hostname of a particular system
@@ -398,6 +838,10 @@ class UyuniAPIClient:
             errata = self._session.system.getRelevantErrata(
                 self._api_key, system_id
             )
+            self.errata_cache.validate(
+                {x["advisory_name"]: x.get("update_date") for x in errata}
+            )
+            self.errata_cache.save()
             return errata
         except Fault as err:
             if "no such system" in err.faultString.lower():
@@ -408,6 +852,27 @@ class UyuniAPIClient:
                 f"Generic remote communication error: {err.faultString!r}"
             ) from err
 
+    def get_hosts_patches(self, system_ids):
+        """
+        Returns available patches for multiple systems using a single batch
+
+        :param system_ids: profile IDs
+        :type system_ids: list
+        :rtype: dict
+        """
+        with self.multicall() as batch:
+            errata = {
+                x: batch.system.getRelevantErrata(x) for x in system_ids
+            }
+
+        result = {x: patches.get() for x, patches in errata.items()}
+        self.errata_cache.validate({
+            x["advisory_name"]: x.get("update_date")
+            for patches in result.values() for x in patches
+        })
+        self.errata_cache.save()
+        return result
+
     def get_patch_by_name(self, patch_name):
         """
         Returns a patch by name
@@ -415,10 +880,16 @@ class UyuniAPIClient:
         :param patch_name: Patch name (e.g. openSUSE-2020-1001)
         :type patch_name: str
         """
+        patch = self.errata_cache.get(patch_name)
+        if patch:
+            return patch
+
         try:
             patch = self._session.errata.getDetails(
                 self._api_key, patch_name
             )
+            self.errata_cache.add(patch_name, patch)
+            self.errata_cache.save()
             return patch
         except Fault as err:
             def missing_patch(error_message):
@@ -440,6 +911,24 @@ class UyuniAPIClient:
                 f"Generic remote communication error: {err.faultString!r}"
             ) from err
 
+    def get_patches_by_name(self, patch_names):
+        """
+        Returns multiple patches by name using a single batch
+
+        :param patch_names: Patch names (e.g. openSUSE-2020-1001)
+        :type patch_names: list
+        """
+        patches = {x: self.errata_cache.get(x) for x in patch_names}
+        with self.multicall() as batch:
+            missing = {
+                x: batch.errata.getDetails(x) for x in patches if not patches[x]
+            }
+        for name, patch in missing.items():
+            patches[name] = patch.get()
+            self.errata_cache.add(name, patches[name])
+        self.errata_cache.save()
+        return [patches[x] for x in patch_names]
+
     def get_package_by_file_name(self, file_name):
         """
         Returns a package by file name
@@ -470,40 +959,117 @@ class UyuniAPIClient:
 
     def get_host_upgrades(self, system_id):
         """
-        Returns available package upgrades
+        Returns available package upgrades that are not part of an erratum
 
         :param system_id: profile ID
         :type system_id: int
         """
-        if not isinstance(system_id, int):
-            raise EmptySetException(
-                "No system found - use system profile IDs"
-            )
+        return self.get_hosts_upgrades([system_id])[system_id]
+
+    def get_hosts_upgrades(self, system_ids):
+        """
+        Returns available package upgrades that are not part of an erratum
+        for multiple systems. The providing errata of every distinct
+        package are only looked up once.
+
+        :param system_ids: profile IDs
+        :type system_ids: list
+        :rtype: dict
+        """
+        for system_id in system_ids:
+            if not isinstance(system_id, int):
+                raise EmptySetException(
+                    "No system found - use system profile IDs"
+                )
 
         try:
-            packages = self._session.system.listLatestUpgradablePackages(
-                self._api_key, system_id
-            )
-            _packages = []
-            for pkg in packages:
+            with self.multicall() as batch:
+                upgrades = {
+                    x: batch.system.listLatestUpgradablePackages(x)
+                    for x in system_ids
+                }
+            packages = {}
+            for system_id, upgrade in upgrades.items():
+                try:
+                    packages[system_id] = upgrade.get()
+                except EmptySetException as err:
+                    raise SessionException(
+                        f"System not found: {system_id!r}"
+                    ) from err
+
+            errata = self.prefetch_providing_errata(
+                pkg["to_package_id"] for pkgs in packages.values() for pkg in pkgs
+            )
+            result = {}
+            for system_id, pkgs in packages.items():
                 # exclude if it part of an errata
-                erratum = self._session.packages.listProvidingErrata(
-                    self._api_key, pkg["to_package_id"]
+                result[system_id] = [
+                    pkg for pkg in pkgs if not errata[pkg["to_package_id"]]
+                ]
+                self.LOGGER.debug(
+                    "Found %i upgrades for %s: %s",
+                    len(result[system_id]), system_id, result[system_id]
                 )
-                if not erratum:
-                    _packages.append(pkg)
-
-            self.LOGGER.debug("Found %i upgrades for %s: %s", len(_packages), system_id, _packages)
-            return _packages
+            return result
         except Fault as err:
-            if "no such system" in err.faultString.lower():
-                raise SessionException(
-                    f"System not found: {system_id!r}"
-                ) from err
             raise SessionException(
                 f"Generic remote communication error: {err.faultString!r}"
             ) from err
 
+    @property
+    def providing_errata_cache(self):
+        """
+        Returns the process-wide providing errata cache of this server and
+        user - errata visibility depends on the user's organization
+        """
+        key = (self.url, self._username)
+        if key not in self._PROVIDING_ERRATA:
+            cache = TTLCache(
+                self.PROVIDING_ERRATA_CACHE_SIZE, self.PROVIDING_ERRATA_CACHE_TTL
+            )
+            store = self._cache_store("providing_errata")
+            if store:
+                cache.load(store.load())
+            self._PROVIDING_ERRATA[key] = cache
+        return self._PROVIDING_ERRATA[key]
+
+    def prefetch_providing_errata(self, package_ids):
+        """
+        Returns the advisory names of errata providing the given packages.
+        Uncached packages are looked up in a single batch.
+
+        :param package_ids: package IDs (duplicates are fine)
+        :type package_ids: iterable
+        :rtype: dict
+        """
+        cache = self.providing_errata_cache
+        errata = {}
+        for package_id in package_ids:
+            if package_id not in errata:
+                errata[package_id] = cache.get(str(package_id))
+
+        missing = [x for x in errata if errata[x] is None]
+        if not missing:
+            return errata
+        with self.multicall() as batch:
+            results = {x: batch.packages.listProvidingErrata(x) for x in missing}
+        for package_id, result in results.items():
+            errata[package_id] = [x["advisory"] for x in result.get()]
+            cache.set(str(package_id), errata[package_id])
+
+        store = self._cache_store("providing_errata")
+        if store:
+            def merge(stored):
+                # keep lookups stored by other processes meanwhile
+                cache.load(stored)
+                for package_id in missing:
+                    cache.set(str(package_id), errata[package_id])
+                stored.clear()
+                stored.update(cache.dump())
+
+            store.update(merge)
+        return errata
+
     def get_host_groups(self, system_id):
         """
         Returns groups for a given system
@@ -582,6 +1148,30 @@ class UyuniAPIClient:
                 f"Generic remote communication error: {err.faultString!r}"
             ) from err
 
+    def get_hosts_network(self, system_ids):
+        """
+        Returns network information for multiple systems using a single batch
+
+        :param system_ids: profile IDs
+        :type system_ids: list
+        :rtype: dict
+        """
+        with self.multicall() as batch:
+            details = {x: batch.system.getNetwork(x) for x in system_ids}
+        return {x: details[x].get() for x in system_ids}
+
+    def get_hosts_params(self, system_ids):
+        """
+        Returns the parameters of multiple systems using a single batch
+
+        :param system_ids: profile IDs
+        :type system_ids: list
+        :rtype: dict
+        """
+        with self.multicall() as batch:
+            params = {x: batch.system.getCustomValues(x) for x in system_ids}
+        return {x: params[x].get() for x in system_ids}
+
     def install_patches(self, system_id, patches=None):
         """
         Install patches on a given system
@@ -614,6 +1204,41 @@ class UyuniAPIClient:
                 f"Generic remote communication error: {err.faultString!r}"
             ) from err
 
+    def install_patches_on_hosts(self, host_patches):
+        """
+        Install patches on multiple systems. Systems sharing the same
+        patches are scheduled together, all schedules are sent in a
+        single batch. Returns the action IDs and the errors of schedules
+        that failed, both by profile ID.
+
+        :param host_patches: patch IDs by profile ID
+        :type host_patches: dict
+        :rtype: tuple
+        """
+        groups = {}
+        for system_id, patches in host_patches.items():
+            if patches:
+                groups.setdefault(frozenset(patches), []).append(system_id)
+
+        with self.multicall() as batch:
+            actions = [
+                (system_ids, batch.system.scheduleApplyErrata(
+                    system_ids, sorted(patches)
+                )) for patches, system_ids in groups.items()
+            ]
+
+        result = {}
+        errors = {}
+        for system_ids, action_ids in actions:
+            try:
+                scheduled = action_ids.get()
+            except (EmptySetException, SessionException) as err:
+                # keep the actions of the other schedules
+                errors.update({x: str(err) for x in system_ids})
+                continue
+            result.update({x: scheduled for x in system_ids})
+        return result, errors
+
     def install_upgrades(self, system_id, upgrades=None):
         """
         Install package upgrades on a given system
@@ -718,6 +1343,7 @@ class UyuniAPIClient:
             action_id = self._session.system.scheduleReboot(
                 self._api_key, system_id, earliest_execution
             )
+            self.reboot_snapshot.invalidate()
             return action_id
         except Fault as err:
             if "could not find server" in err.faultString.lower():
@@ -728,14 +1354,23 @@ class UyuniAPIClient:
                 f"Generic remote communication error: {err.faultString!r}"
             ) from err
 
-    def get_host_action(self, system_id, action_id):
+    def get_host_action(self, system_id, action_id, action_type=None, since=None):
         """
-        Retrieves information about a particular host action
+        Retrieves information about a particular host action. The status is
+        looked up by action ID; finished actions are completed with the
+        fields of their system event. Actions the system is not listed for
+        (e.g. archived ones) are searched in the system events of the date
+        window.
 
         :param system_id: profile ID
         :type system_id: int
         :param action_id: task ID
         :type action_id: int
+        :param action_type: action type to narrow down the event search
+            (e.g. Patch Update)
+        :type action_type: str
+        :param since: earliest date for the event search (default: ACTION_LOOKUP_WINDOW)
+        :type since: datetime
         """
         if not isinstance(system_id, int):
             raise EmptySetException(
@@ -747,20 +1382,98 @@ class UyuniAPIClient:
             )
 
         try:
-            # return particular action
-            actions = self.get_host_actions(system_id)
-            action = [x for x in actions if x['id'] == action_id]
-            if not action:
-                raise EmptySetException("Action not found")
-            return action
-        except Fault as err:
-            if "action not found" in err.faultString.lower():
-                raise EmptySetException(
-                    f"Action not found: {action_id!r}"
+            with self.multicall() as batch:
+                states = [
+                    (status, method(action_id)) for status, method in (
+                        ("Completed", batch.schedule.listCompletedSystems),
+                        ("Failed", batch.schedule.listFailedSystems),
+                        ("In Progress", batch.schedule.listInProgressSystems),
+                    )
+                ]
+            for status, systems in states:
+                for system in systems.get():
+                    if system["server_id"] != system_id:
+                        continue
+                    action = {
+                        "id": action_id,
+                        "status": status,
+                        "successful_count": int(status == "Completed"),
+                        "failed_count": int(status == "Failed"),
+                        "message": system.get("message"),
+                        "timestamp": system.get("timestamp"),
+                    }
+                    if status != "In Progress":
+                        event = self._find_action_event(
+                            system_id, action_id, action_type, since
+                        )
+                        action.update(event or {})
+                    return [action]
+        except EmptySetException:
+            # unknown or archived action, search the system events
+            pass
+
+        event = self._find_action_event(system_id, action_id, action_type, since)
+        if not event:
+            raise EmptySetException(f"Action not found: {action_id!r}")
+        return [event]
+
+    def _find_action_event(self, system_id, action_id, action_type=None, since=None):
+        """
+        Returns the system event of an action within the date window or
+        None
+        """
+        if not since:
+            since = datetime.utcnow() - self.ACTION_LOOKUP_WINDOW
+        if action_type:
+            events = self.get_action_by_type(system_id, action_type, since)
+        else:
+            try:
+                events = self._session.system.listSystemEvents(
+                    self._api_key, system_id, DateTime(since.timetuple())
+                )
+            except Fault as err:
+                raise SessionException(
+                    f"Generic remote communication error: {err.faultString!r}"
                 ) from err
-            raise SessionException(
-                f"Generic remote communication error: {err.faultString!r}"
-            ) from err
+        return next((x for x in events if x["id"] == action_id), None)
+
+    def get_actions_by_state(self):
+        """
+        Returns all completed, failed and in progress actions using a
+        single batch. Actions with systems in different states are
+        listed for each of these states. The API offers no filters, the
+        lists include the user's complete action history.
+
+        :rtype: dict
+        """
+        with self.multicall() as batch:
+            states = {
+                "completed": batch.schedule.listCompletedActions(),
+                "failed": batch.schedule.listFailedActions(),
+                "in_progress": batch.schedule.listInProgressActions(),
+            }
+        return {state: actions.get() for state, actions in states.items()}
+
+    def get_actions_systems(self, action_ids):
+        """
+        Returns the systems that completed or failed multiple actions
+        using a single batch
+
+        :param action_ids: action IDs
+        :type action_ids: list
+        :rtype: dict
+        """
+        with self.multicall() as batch:
+            systems = {
+                x: {
+                    "completed": batch.schedule.listCompletedSystems(x),
+                    "failed": batch.schedule.listFailedSystems(x),
+                } for x in action_ids
+            }
+        return {
+            action_id: {state: x.get() for state, x in states.items()}
+            for action_id, states in systems.items()
+        }
 
     def get_host_actions(self, system_id):
         """
@@ -831,23 +1544,18 @@ class UyuniAPIClient:
 
     def is_reboot_required(self, system_id):
         """
-        Checks whether a particular host requires a reboot
+        Checks whether a particular host requires a reboot. The list of
+        systems is always fetched again, use reboot_snapshot to check many
+        hosts at once.
 
         :param system_id: profile ID
         :type system_id: int
         """
-        try:
-            systems = self._session.system.listSuggestedReboot(
-                self._api_key
-            )
-
-            return any(system["id"] == system_id for system in systems)
-        except Fault as err:
-            raise SessionException(
-                f"Generic remote communication error: {err.faultString!r}"
-            ) from err
+        snapshot = self.reboot_snapshot
+        snapshot.refresh()
+        return snapshot.requires_reboot(system_id)
 
-    def get_action_by_type(self, system_id, action_type):
+    def get_action_by_type(self, system_id, action_type, since=None):
         """
         Gets host action by specific type
 
@@ -855,6 +1563,8 @@ class UyuniAPIClient:
         :type system_id: int
         :param action_type: action type
         :type action_type: str
+        :param since: only return actions created after this date
+        :type since: datetime
         """
         if not isinstance(system_id, int):
             raise EmptySetException(
@@ -862,9 +1572,15 @@ class UyuniAPIClient:
             )
 
         try:
-            actions = self._session.system.listSystemEvents(
-                self._api_key, system_id, action_type
-            )
+            if since:
+                actions = self._session.system.listSystemEvents(
+                    self._api_key, system_id, action_type,
+                    DateTime(since.timetuple())
+                )
+            else:
+                actions = self._session.system.listSystemEvents(
+                    self._api_key, system_id, action_type
+                )
             return actions
         except Fault as err:
             if "no such system" in err.faultString.lower():
@@ -1360,25 +2076,48 @@ class UyuniAPIClient:
                 f"Generic remote communication error: {err.faultString!r}"
             ) from err
 
-    def wait_for_action(self, action_id, system_id, timeout=3600, interval=30):
+    def wait_for_action(
+            self, action_id, system_id, timeout=3600, interval=5,
+            max_interval=60, poller=None, action_type=None
+    ):
         """
-        Waits for the action to complete.
+        Waits for the action to complete. The interval between status
+        checks grows exponentially from interval to max_interval.
 
-        :param api_instance: The API instance to use for checking the action status.
         :param action_id: The ID of the action to wait for.
+        :param system_id: profile ID
         :param timeout: The maximum time to wait for the action to complete (in seconds).
-        :param interval: The interval between status checks (in seconds).
+        :param interval: The initial interval between status checks (in seconds).
+        :param max_interval: The maximum interval between status checks (in seconds).
+        :param poller: BackoffPoller to use instead of timeout and intervals.
+        :param action_type: The action type used when looking up the action in system events.
         """
-        start_time = datetime.utcnow()
-        end_time = start_time + timedelta(seconds=timeout)
-        while datetime.utcnow() < end_time:
-            status = self.get_host_action(system_id, action_id)
+        if not poller:
+            poller = BackoffPoller(
+                timeout=timeout, min_interval=interval, max_interval=max_interval
+            )
+
+        since = datetime.utcnow() - self.ACTION_LOOKUP_WINDOW
+
+        def _check():
+            status = self.get_host_action(
+                system_id, action_id, action_type, since
+            )
             if status[0]['successful_count'] + status[0]['failed_count'] > 0:
                 return status
-            next_check = datetime.utcnow() + timedelta(seconds=interval)
-            while datetime.utcnow() < next_check:
-                pass
-        raise TimeoutError(f"Action {action_id} did not complete within {timeout} seconds")
+            return None
+
+        try:
+            status = poller.poll(_check)
+        except TimeoutError as err:
+            raise TimeoutError(
+                f"Action {action_id} did not complete within {poller.timeout} seconds"
+            ) from err
+        self.LOGGER.debug(
+            "Action %s completed after %i polls and %.1f seconds",
+            action_id, poller.polls, poller.waited
+        )
+        return status
 
     def full_pkg_update(self, system_id):
         """
@@ -0,0 +1,461 @@
+"""
+Asyncio counterpart of the Uyuni XMLRPC API client
+"""
+
+from __future__ import (absolute_import, division, print_function)
+import asyncio
+import functools
+import ssl
+import time
+from datetime import datetime
+from xmlrpc.client import DateTime, Fault, dumps, loads
+
+from .exceptions import SessionException
+from .polling import BackoffPoller
+from .retry import is_idempotent
+from .rpc import RPCProxy, is_invalid_session
+from .transport import AsyncTransport
+from .uyuni import UyuniAPIClient
+
+__metaclass__ = type
+
+
+class _NeedCall(BaseException):
+    """
+    Raised when replayed client code reaches a call without result
+    """
+
+    def __init__(self, method, args):
+        super().__init__(method)
+        self.method = method
+        self.args = args
+
+
+class _NeedSession(BaseException):
+    """
+    Raised when replayed client code tries to log in
+    """
+
+
+class _CallMismatch(BaseException):
+    """
+    Raised when replayed client code changes data with other arguments
+    than recorded
+    """
+
+    def __init__(self, method):
+        super().__init__(method)
+        self.method = method
+
+
+def _request_key(method, args):
+    """
+    Returns a call for comparison with recorded calls, leaving out the
+    session key and dates, which may change between runs
+    """
+    def mask(values, session):
+        return tuple(
+            None if (session and index == 0) or isinstance(value, DateTime)
+            else value for index, value in enumerate(values)
+        )
+
+    if method.startswith(("api.", "auth.")):
+        return method, mask(args, False)
+    if method == "system.multicall" and args:
+        return method, tuple(
+            (x.get("methodName"), mask(x.get("params", ()), True))
+            for x in args[0]
+        )
+    return method, mask(args, True)
+
+
+def _rejected(response):
+    """
+    Checks whether a multicall response rejected the session key
+    """
+    return isinstance(response, dict) and is_invalid_session(
+        Fault(response.get("faultCode"), response.get("faultString", ""))
+    )
+
+
+def _rejected_key(method, args, outcome):
+    """
+    Returns the session key if the server rejected it, otherwise None
+    """
+    if method.startswith(("api.", "auth.")) or not args:
+        return None
+    if method == "system.multicall":
+        if isinstance(outcome, list) and any(_rejected(x) for x in outcome):
+            return args[0][0]["params"][0]
+        return None
+    if (
+        isinstance(args[0], str) and isinstance(outcome, Fault)
+        and is_invalid_session(outcome)
+    ):
+        return args[0]
+    return None
+
+
+class _ReplayProxy(RPCProxy):
+    """
+    Answers calls of replayed client code with recorded results and
+    raises _NeedCall for the first call that has not been sent yet.
+    Calls that change data are never sent twice: _CallMismatch is raised
+    if the code makes a recorded call of such a method with other
+    arguments this time.
+    """
+
+    def __init__(self, calls, allow_login=False):
+        super().__init__(None)
+        self._calls = calls
+        self._allow_login = allow_login
+        self._index = 0
+
+    def _find(self, method, args):
+        """
+        Returns the index of the recorded call answering a call or None
+        """
+        request = _request_key(method, args)
+        pending = range(self._index, len(self._calls))
+        # recorded calls the code doesn't make anymore (e.g. because of a
+        # cache hit) are skipped
+        for index in pending:
+            if self._calls[index][0] == request:
+                return index
+        if not is_idempotent(method, args) and any(
+                self._calls[index][0][0] == method for index in pending
+        ):
+            raise _CallMismatch(method)
+        return None
+
+    def call(self, method, args):
+        if method == "auth.login" and not self._allow_login:
+            raise _NeedSession(method)
+        index = self._find(method, args)
+        if index is None:
+            raise _NeedCall(method, args)
+        self._index = index + 1
+        outcome = self._calls[index][1]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+class AsyncUyuniAPIClient(UyuniAPIClient):
+    """
+    Class for communicating with the Uyuni API without blocking an
+    asyncio event loop. It offers the methods of UyuniAPIClient with the
+    same arguments, results and exceptions as coroutines. Each method
+    runs the synchronous implementation, which is interrupted at every
+    API call and run again once the call was answered. Calls changing
+    data are sent only once per method call, also if the session expired.
+    As the implementation runs once per call, methods making many calls
+    take quadratic CPU time and repeat side effects besides API calls,
+    e.g. logging - use multicall batches where possible.
+
+    Create instances with ``await AsyncUyuniAPIClient.create(...)`` and
+    close them with ``await client.close()``.
+
+    .. class:: AsyncUyuniAPIClient
+    """
+
+    def __init__(
+            self, log_level, hostname, username, password,
+            port=443, verify=True, pool_size=10, cache_dir=None,
+            session_key=None, session_store=None, validate_api=True,
+            timeout=60, instrumentation=None, retry_policy=None
+    ):
+        """
+        Constructor creating the class without connecting - use create()
+        or call connect() afterwards.
+
+        :param pool_size: maximum number of simultaneous API requests
+        :type pool_size: int
+        :param timeout: seconds to wait for a connection or response
+        :type timeout: float
+
+        See UyuniAPIClient for the remaining parameters.
+        """
+        self._hostname = hostname
+        self._port = port
+        self._timeout = timeout
+        self._validate_api = validate_api
+        self._transport = None
+        # created in the running event loop on the first login
+        self._async_login_lock = None
+        super().__init__(
+            log_level, hostname, username, password, port=port,
+            verify=verify, pool_size=pool_size, cache_dir=cache_dir,
+            session_key=session_key, session_store=session_store,
+            validate_api=False, instrumentation=instrumentation,
+            retry_policy=retry_policy
+        )
+
+    @classmethod
+    async def create(cls, *args, **kwargs):
+        """
+        Creates a connected client, see the constructor for arguments
+        """
+        client = cls(*args, **kwargs)
+        await client.connect()
+        return client
+
+    def _connect(self):
+        """
+        Sets up the transport, logging in is left to connect()
+        """
+        if not self.verify:
+            context = ssl._create_unverified_context()
+        else:
+            context = ssl.create_default_context()
+        self._transport = AsyncTransport(
+            self._hostname, self._port, ssl_context=context,
+            pool_size=self.pool_size, timeout=self._timeout
+        )
+
+    def instrument(self, instrumentation):
+        """
+        Records all further API calls in an instrumentation registry,
+        replacing the current one - None stops recording
+
+        :param instrumentation: registry to record the calls in
+        :type instrumentation: Instrumentation
+        """
+        self.instrumentation = instrumentation
+
+    async def connect(self):
+        """
+        Logs in unless a session key was given and checks the API version
+        """
+        if not self._api_key:
+            await self.login()
+        if self._validate_api:
+            await self.validate_api_support()
+
+    async def close(self):
+        """
+        Ends the session unless it is shared through a session store and
+        closes all connections
+        """
+        if not self._session_store:
+            await self.logout()
+        self._transport.close()
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def _send(self, method, args):
+        """
+        Sends a call and returns its result or the raised exception,
+        retrying it as the retry policy allows
+        """
+        instrumentation = self.instrumentation
+        if instrumentation:
+            start_ns = time.time_ns()
+            start = time.perf_counter()
+        policy = self.retry_policy
+        if policy:
+            policy.budget.deposit()
+            delays = policy.delays()
+        transfers = [0, 0]
+        attempt = 0
+        while True:
+            try:
+                if policy:
+                    policy.before_call(method)
+                request_body = dumps(args, method).encode("utf-8")
+                transfers[0] += len(request_body)
+                response = await self._transport.request("/rpc/api", request_body)
+                transfers[1] += len(response)
+                outcome = loads(response)[0][0]
+            except Exception as err:  # pylint: disable=broad-except
+                outcome = err
+                delay = policy and policy.retry_delay(
+                    method, args, err, attempt, delays
+                )
+                if delay is not None:
+                    attempt += 1
+                    await asyncio.sleep(delay)
+                    continue
+            else:
+                if policy:
+                    policy.succeeded()
+            break
+
+        if instrumentation:
+            instrumentation.record(
+                method, time.perf_counter() - start,
+                sent=transfers[0], received=transfers[1], retries=attempt,
+                error=outcome if isinstance(outcome, Exception) else None,
+                start_ns=start_ns,
+                attributes={"server.address": f"{self._hostname}:{self._port}"}
+            )
+        return outcome
+
+    async def _send_again(self, method, args, outcome):
+        """
+        Sends a call rejected because of an expired session again with the
+        current session key - of multicalls only the rejected calls
+        """
+        if method != "system.multicall":
+            return await self._send(method, (self._api_key,) + tuple(args[1:]))
+        rejected = [
+            index for index, response in enumerate(outcome) if _rejected(response)
+        ]
+        responses = await self._send(method, ([
+            dict(args[0][x], params=[self._api_key] + list(args[0][x]["params"][1:]))
+            for x in rejected
+        ],))
+        if isinstance(responses, Exception):
+            return responses
+        outcome = list(outcome)
+        for index, response in zip(rejected, responses):
+            outcome[index] = response
+        return outcome
+
+    async def _replay(self, func, *args, allow_login=False, **kwargs):
+        """
+        Runs a method of UyuniAPIClient, sending the API calls it makes
+        asynchronously. A new session is started if the code tries to
+        log in or the session key is rejected, unless allow_login is set.
+        Only the rejected call is sent again with the new session key.
+        """
+        # the synchronous methods work on a view sharing all attributes
+        view = UyuniAPIClient.__new__(UyuniAPIClient)
+        view.__dict__ = self.__dict__
+        calls = []
+        renewed = False
+        while True:
+            self._session = _ReplayProxy(calls, allow_login)
+            try:
+                return func(view, *args, **kwargs)
+            except _NeedCall as call:
+                outcome = await self._send(call.method, call.args)
+                rejected_key = _rejected_key(call.method, call.args, outcome)
+                if rejected_key and not renewed:
+                    renewed = True
+                    await self.renew_session(rejected_key)
+                    outcome = await self._send_again(
+                        call.method, call.args, outcome
+                    )
+                calls.append((_request_key(call.method, call.args), outcome))
+            except _CallMismatch as err:
+                raise SessionException(
+                    f"{err.method} was called with other arguments than "
+                    f"already sent when running {func.__name__} again"
+                ) from err
+            except _NeedSession as err:
+                if renewed:
+                    raise SessionException(
+                        "Unable to renew the session"
+                    ) from err
+                renewed = True
+                await self.renew_session(self._api_key)
+            finally:
+                self._session = None
+
+    async def login(self):
+        """
+        Starts a new session, replacing and ending the current one
+        """
+        if self._async_login_lock is None:
+            self._async_login_lock = asyncio.Lock()
+        async with self._async_login_lock:
+            previous_key = self._api_key
+            self._api_key = await self._replay(
+                UyuniAPIClient._request_session_key, allow_login=True
+            )
+            self.session_expires = time.time() + self.SESSION_TTL
+            if self._session_store:
+                self._session_store.set(
+                    self.url, self._username, self._password,
+                    self._api_key, self.session_expires
+                )
+            if previous_key:
+                await self._replay(UyuniAPIClient._end_session, previous_key)
+
+    async def logout(self):
+        """
+        Ends the current session and removes it from the session store
+        """
+        session_key, self._api_key = self._api_key, None
+        if not session_key:
+            return
+        if self._session_store:
+            self._session_store.delete(
+                self.url, self._username, self._password, session_key
+            )
+        await self._replay(UyuniAPIClient._end_session, session_key)
+
+    async def renew_session(self, rejected_key):
+        """
+        Starts a new session unless the rejected key was already replaced
+        by another task
+
+        :param rejected_key: session key rejected by the server
+        :type rejected_key: str
+        """
+        if rejected_key == self._api_key:
+            self.LOGGER.info("Session expired, logging in again")
+            await self.login()
+
+    async def wait_for_action(
+            self, action_id, system_id, timeout=3600, interval=5,
+            max_interval=60, poller=None, action_type=None
+    ):
+        """
+        Waits for the action to complete without blocking the event loop.
+        See UyuniAPIClient.wait_for_action for the parameters.
+        """
+        if not poller:
+            poller = BackoffPoller(
+                timeout=timeout, min_interval=interval, max_interval=max_interval
+            )
+
+        since = datetime.utcnow() - self.ACTION_LOOKUP_WINDOW
+        try:
+            async for _ in poller.async_attempts():
+                status = await self.get_host_action(
+                    system_id, action_id, action_type, since
+                )
+                if status[0]['successful_count'] + status[0]['failed_count'] > 0:
+                    break
+        except TimeoutError as err:
+            raise TimeoutError(
+                f"Action {action_id} did not complete within {poller.timeout} seconds"
+            ) from err
+        self.LOGGER.debug(
+            "Action %s completed after %i polls and %.1f seconds",
+            action_id, poller.polls, poller.waited
+        )
+        return status
+
+
+def _coroutine(func):
+    """
+    Returns a coroutine function running a method of UyuniAPIClient
+    """
+    @functools.wraps(func)
+    async def method(self, *args, **kwargs):
+        return await self._replay(func, *args, **kwargs)
+    return method
+
+
+def _add_coroutines():
+    """
+    Adds coroutine counterparts of all public UyuniAPIClient methods that
+    AsyncUyuniAPIClient doesn't implement itself
+    """
+    for name, attribute in vars(UyuniAPIClient).items():
+        if (
+            not name.startswith("_") and callable(attribute)
+            and name != "multicall" and name not in vars(AsyncUyuniAPIClient)
+        ):
+            setattr(AsyncUyuniAPIClient, name, _coroutine(attribute))
+
+
+_add_coroutines()
@@ -85,7 +85,22 @@ entity:
 
 from ansible.module_utils.basic import AnsibleModule
 from ..module_utils.exceptions import EmptySetException, SSLCertVerificationError
-from ..module_utils.helper_functions import _configure_connection, get_host_id
+from ..module_utils.helper_functions import (
+    _configure_connection,
+    get_host_id,
+    get_connection_params,
+    publish_metrics,
+    uyuni_argument_spec
+)
+
+# module arguments, shared with the controller-side action plugin
+MODULE_ARGS = dict(
+    argument_spec=uyuni_argument_spec(
+        name=dict(required=True),
+        states=dict(required=True, type='list', elements='str'),
+        test_mode=dict(default=False, type='bool')
+    )
+)
 
 
 def _apply_states(module, api_instance):
@@ -101,37 +116,26 @@ def _apply_states(module, api_instance):
             module.params.get('states'),
             module.params.get('test_mode')
         )
-        module.exit_json(changed=True, action_id=action_id)
+        module.exit_json(**publish_metrics(module, api_instance, dict(
+            changed=True, action_id=action_id
+        )))
     except SSLCertVerificationError:
-        module.fail_json(msg="Failed to verify SSL certificate")
+        module.fail_json(**publish_metrics(module, api_instance, dict(
+            msg="Failed to verify SSL certificate"
+        )))
     except EmptySetException as err:
-        module.fail_json(msg=f"Exception when calling UyuniAPI->apply_states: {err}")
+        module.fail_json(**publish_metrics(module, api_instance, dict(
+            msg=f"Exception when calling UyuniAPI->apply_states: {err}"
+        )))
 
 
 def main():
     """
     Default function, calls module
     """
-    argument_spec = dict(
-        uyuni_host=dict(required=True),
-        uyuni_user=dict(required=True),
-        uyuni_password=dict(required=True, no_log=True),
-        uyuni_port=dict(default=443, type='int'),
-        uyuni_verify_ssl=dict(default=True, type='bool'),
-        name=dict(required=True),
-        states=dict(required=True, type='list', elements='str'),
-        test_mode=dict(default=False, type='bool')
-    )
+    module = AnsibleModule(**MODULE_ARGS)
 
-    module = AnsibleModule(argument_spec=argument_spec)
-
-    connection_params = dict(
-        host=module.params.get('uyuni_host'),
-        username=module.params.get('uyuni_user'),
-        password=module.params.get('uyuni_password'),
-        port=module.params.get('uyuni_port'),
-        verify_ssl=module.params.get('uyuni_verify_ssl')
-    )
+    connection_params = get_connection_params(module.params)
 
     api_instance = _configure_connection(connection_params)
     _apply_states(module, api_instance)
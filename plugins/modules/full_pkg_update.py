@@ -56,11 +56,35 @@ entity:
   description: State whether package installation was scheduled successfully
   returned: success
   type: bool
+polls:
+  description: Number of status checks until the update completed
+  returned: changed
+  type: int
+waited:
+  description: Seconds waited for the update to complete
+  returned: changed
+  type: int
 '''
 
 from ansible.module_utils.basic import AnsibleModule
 from ..module_utils.exceptions import EmptySetException, SSLCertVerificationError
-from ..module_utils.helper_functions import _configure_connection, get_host_id, get_outdated_pkgs
+from ..module_utils.helper_functions import (
+    _configure_connection,
+    get_host_id,
+    get_outdated_pkgs,
+    get_connection_params,
+    publish_metrics,
+    uyuni_argument_spec
+)
+from ..module_utils.polling import BackoffPoller
+
+# module arguments, shared with the controller-side action plugin
+MODULE_ARGS = dict(
+    argument_spec=uyuni_argument_spec(
+        name=dict(required=True)
+    ),
+    supports_check_mode=False
+)
 
 
 def _full_pkg_update(module, api_instance):
@@ -72,11 +96,13 @@ def _full_pkg_update(module, api_instance):
     # is reboot required
     reboot_req = api_instance.is_reboot_required(host)
     if reboot_req is True:
-        module.fail_json(msg="Cannot install updates. Host must be rebooted first.")
+        module.fail_json(**publish_metrics(module, api_instance, dict(
+            msg="Cannot install updates. Host must be rebooted first."
+        )))
     # get number of outdated packages
     upgrades = get_outdated_pkgs(module.params.get('name'), api_instance)
     if upgrades == 0:
-        module.exit_json(changed=False)
+        module.exit_json(**publish_metrics(module, api_instance, dict(changed=False)))
     try:
         # install upgrades
         action_id = api_instance.full_pkg_update(
@@ -86,45 +112,37 @@ def _full_pkg_update(module, api_instance):
             )
         )
         # wait for all packages to be updated
-        api_instance.wait_for_action(action_id, host)
-        module.exit_json(changed=True, installed_updates=upgrades)
+        poller = BackoffPoller()
+        api_instance.wait_for_action(
+            action_id, host, poller=poller, action_type="Package Install"
+        )
+        module.exit_json(**publish_metrics(module, api_instance, dict(
+            changed=True, installed_updates=upgrades,
+            polls=poller.polls, waited=round(poller.waited)
+        )))
     except EmptySetException as err:
         # exit if no upgrades available
         if not upgrades:
-            module.exit_json(changed=False)
+            module.exit_json(**publish_metrics(module, api_instance, dict(changed=False)))
         # exit if invalid upgrade
-        module.fail_json(msg=f"Upgrade(s) not found or applicable: {err}")
+        module.fail_json(**publish_metrics(module, api_instance, dict(
+            msg=f"Upgrade(s) not found or applicable: {err}"
+        )))
     except SSLCertVerificationError:
-        module.fail_json(msg="Failed to verify SSL certificate")
+        module.fail_json(**publish_metrics(module, api_instance, dict(
+            msg="Failed to verify SSL certificate"
+        )))
 
 
 def main():
     """
     Main functions
     """
-    argument_spec = dict(
-        uyuni_host=dict(required=True),
-        uyuni_user=dict(required=True),
-        uyuni_password=dict(required=True, no_log=True),
-        uyuni_port=dict(default=443, type='int'),
-        uyuni_verify_ssl=dict(default=True, type='bool'),
-        name=dict(required=True)
-    )
-
-    module = AnsibleModule(
-        argument_spec=argument_spec,
-        supports_check_mode=False
-    )
-
-    module_params = dict(
-        host=module.params.get('uyuni_host'),
-        username=module.params.get('uyuni_user'),
-        password=module.params.get('uyuni_password'),
-        port=module.params.get('uyuni_port'),
-        verify_ssl=module.params.get('uyuni_verify_ssl')
-    )
-
-    api_instance = _configure_connection(module_params)
+    module = AnsibleModule(**MODULE_ARGS)
+
+    connection_params = get_connection_params(module.params)
+
+    api_instance = _configure_connection(connection_params)
     _full_pkg_update(module, api_instance)
 
 
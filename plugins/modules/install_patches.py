@@ -31,6 +31,8 @@ module: install_patches
 short_description: Install patches
 description:
   - Install patches on a managed host
+  - When using names or group, the patches of all hosts are retrieved
+    in bulk and hosts requiring the same patches are scheduled together
 author:
   - "Christian Stankowic (@stdevel)"
 extends_documentation_fragment:
@@ -38,7 +40,13 @@ extends_documentation_fragment:
 options:
   name:
     description: Name or profile ID of the managed host
-    required: True
+    type: str
+  names:
+    description: Names or profile IDs of multiple managed hosts
+    type: list
+    elements: str
+  group:
+    description: Name of a system group whose members are patched
     type: str
   include_patches:
     description: List of patch names or IDs to install
@@ -48,6 +56,16 @@ options:
     description: List of patch names or IDs to exclude from installation
     type: list
     elements: str
+  wait:
+    description:
+      - Wait for the patches to be installed
+      - The status of all hosts is checked with a single call per poll
+    type: bool
+    default: false
+  wait_timeout:
+    description: Maximum seconds to wait for the patches to be installed
+    type: int
+    default: 3600
 '''
 
 EXAMPLES = '''
@@ -60,6 +78,25 @@ EXAMPLES = '''
     exclude_patches:
       - openSUSE-2022-10013
       - openSUSE-SLE-15.3-2022-2118
+
+- name: Install patches on all web servers at once
+  stdevel.uyuni.install_patches:
+    uyuni_host: 192.168.1.1
+    uyuni_user: admin
+    uyuni_password: admin
+    group: webservers
+  run_once: true
+
+- name: Install patches on some hosts and wait for the installation
+  stdevel.uyuni.install_patches:
+    uyuni_host: 192.168.1.1
+    uyuni_user: admin
+    uyuni_password: admin
+    names:
+      - web01.localdomain.loc
+      - web02.localdomain.loc
+    wait: true
+  run_once: true
 '''
 
 RETURN = '''
@@ -67,43 +104,239 @@ entity:
   description: State whether patch installation was scheduled successfully
   returned: success
   type: bool
+actions:
+  description:
+    - Scheduled action IDs by host name or profile ID
+    - Hosts without applicable patches are omitted
+  returned: when using names, group or wait, also if some schedules failed
+  type: dict
+errors:
+  description: Errors of failed schedules by host name or profile ID
+  returned: failure when using names or group
+  type: dict
+results:
+  description:
+    - Per-action results by host name or profile ID when waiting
+    - Every result contains C(action_id), C(successful) and C(message)
+  returned: when using wait
+  type: dict
+polls:
+  description: Number of status checks made while waiting
+  returned: when using wait
+  type: int
+waited:
+  description: Seconds waited for the installation to complete
+  returned: when using wait
+  type: int
 '''
 
 from ansible.module_utils.basic import AnsibleModule
 from ..module_utils.exceptions import EmptySetException, SSLCertVerificationError
-from ..module_utils.helper_functions import _configure_connection, get_host_id, get_patch_id, patch_already_installed
+from ..module_utils.helper_functions import (
+    _configure_connection,
+    get_host_id,
+    get_patch_id,
+    patch_already_installed,
+    get_connection_params,
+    publish_metrics,
+    uyuni_argument_spec
+)
+from ..module_utils.polling import ActionWaiter, BackoffPoller
 
+# module arguments, shared with the controller-side action plugin
+MODULE_ARGS = dict(
+    argument_spec=uyuni_argument_spec(
+        name=dict(required=False),
+        names=dict(type='list', elements='str', required=False),
+        group=dict(required=False),
+        include_patches=dict(type='list', elements='str', required=False),
+        exclude_patches=dict(type='list', elements='str', required=False),
+        wait=dict(type='bool', required=False, default=False),
+        wait_timeout=dict(type='int', required=False, default=3600)
+    ),
+    mutually_exclusive=[
+        ('include_patches', 'exclude_patches'),
+        ('name', 'names', 'group')
+    ],
+    required_one_of=[('name', 'names', 'group')],
+    supports_check_mode=False
+)
 
-def _install_patches(module, api_instance):
+
+def _get_patch_ids(patches, api_instance):
     """
-    Installs patches on the host
+    Returns the IDs of patches given by name or ID
+    """
+    patch_ids = []
+    for patch in patches:
+        patch = get_patch_id(patch, api_instance)
+        patch_ids.append(patch if isinstance(patch, int) else patch["id"])
+    return patch_ids
+
+
+def _get_patch_filter(module, api_instance):
+    """
+    Returns the IDs of patches to include and exclude
     """
-    # get parameters
-    host = get_host_id(module.params.get('name'), api_instance)
     try:
-        include_patches = [get_patch_id(x, api_instance)["id"] for x in module.params.get('include_patches')]
-    except (UnboundLocalError, TypeError):
-        include_patches = None
+        include_patches = _get_patch_ids(
+            module.params.get('include_patches') or [], api_instance
+        )
+        exclude_patches = _get_patch_ids(
+            module.params.get('exclude_patches') or [], api_instance
+        )
     except EmptySetException:
-        module.fail_json(msg="Patch not found or applicable")
+        module.fail_json(**publish_metrics(module, api_instance, dict(
+            msg="Patch not found or applicable"
+        )))
 
+    return include_patches, exclude_patches
+
+
+def _select_patches(all_patches, include_patches, exclude_patches):
+    """
+    Returns the IDs of patches to install
+    """
+    # exclude or include patches if defined
+    if exclude_patches:
+        return [x["id"] for x in all_patches if x["id"] not in exclude_patches]
+    if include_patches:
+        return [x["id"] for x in all_patches if x["id"] in include_patches]
+    return [x["id"] for x in all_patches]
+
+
+def _get_hosts(module, api_instance):
+    """
+    Returns the profile IDs of all targeted hosts by name
+    """
+    group = module.params.get('group')
+    if group:
+        try:
+            # report group members by name
+            return api_instance.get_hostgroups_systems(
+                [group], strict=True
+            )[group]
+        except EmptySetException as err:
+            module.fail_json(**publish_metrics(module, api_instance, dict(msg=str(err))))
+
+    names = module.params.get('names')
+    # resolve all hostnames with a single call
+    host_ids = {}
+    if any(not x.isdigit() for x in names):
+        host_ids = api_instance.preload_host_ids()
+
+    hosts = {}
+    for name in names:
+        if name.isdigit():
+            hosts[name] = int(name)
+        elif name in host_ids:
+            hosts[name] = host_ids[name]
+        else:
+            module.fail_json(**publish_metrics(module, api_instance, dict(
+                msg=f"System not found: {name!r}"
+            )))
+    return hosts
+
+
+def _wait_for_hosts(module, api_instance, hosts, actions, **extra):
+    """
+    Waits for the scheduled actions of multiple hosts and exits the module,
+    adding the extra results
+    """
+    hostnames = {hosts[name]: name for name in actions}
+    pairs = [
+        (hosts[name], action_id)
+        for name, action_ids in actions.items() for action_id in action_ids
+    ]
+
+    poller = BackoffPoller(timeout=module.params.get('wait_timeout'))
+    results = {}
     try:
-        exclude_patches = [get_patch_id(x, api_instance)["id"] for x in module.params.get('exclude_patches')]
-    except (UnboundLocalError, TypeError):
-        exclude_patches = None
-    except EmptySetException:
-        module.fail_json(msg="Patch not found or applicable")
+        for result in ActionWaiter(api_instance, poller).wait(pairs):
+            results.setdefault(hostnames[result.system_id], []).append({
+                "action_id": result.action_id,
+                "successful": result.successful,
+                "message": result.details.get("message"),
+            })
+    except TimeoutError as err:
+        module.fail_json(**publish_metrics(module, api_instance, dict(
+            extra, msg=str(err), changed=True, actions=actions,
+            results=results, polls=poller.polls, waited=round(poller.waited)
+        )))
+    failed = sorted(
+        name for name, items in results.items()
+        if not all(x["successful"] for x in items)
+    )
+    if failed:
+        module.fail_json(**publish_metrics(module, api_instance, dict(
+            extra, msg=f"Patch installation failed on: {', '.join(failed)}",
+            changed=True, actions=actions, results=results,
+            polls=poller.polls, waited=round(poller.waited)
+        )))
+    module.exit_json(**publish_metrics(module, api_instance, dict(
+        extra, changed=True, actions=actions, results=results,
+        polls=poller.polls, waited=round(poller.waited)
+    )))
+
+
+def _install_patches_on_hosts(module, api_instance):
+    """
+    Installs patches on multiple hosts
+    """
+    hosts = _get_hosts(module, api_instance)
+    include_patches, exclude_patches = _get_patch_filter(module, api_instance)
+
+    try:
+        # get _all_ the patches of _all_ the hosts
+        all_patches = api_instance.get_hosts_patches(list(hosts.values()))
+        actions, errors = api_instance.install_patches_on_hosts({
+            host_id: _select_patches(patches, include_patches, exclude_patches)
+            for host_id, patches in all_patches.items()
+        })
+        actions = {
+            name: actions[host_id] for name, host_id in hosts.items()
+            if host_id in actions
+        }
+        if errors:
+            # report the actions scheduled nevertheless
+            module.fail_json(**publish_metrics(module, api_instance, dict(
+                msg=f"Failed to schedule patches on {len(errors)} system(s)",
+                changed=bool(actions), actions=actions, errors={
+                    name: errors[host_id] for name, host_id in hosts.items()
+                    if host_id in errors
+                }
+            )))
+        if actions and module.params.get('wait'):
+            _wait_for_hosts(module, api_instance, hosts, actions)
+        module.exit_json(**publish_metrics(module, api_instance, dict(
+            changed=bool(actions), actions=actions
+        )))
+    except EmptySetException as err:
+        module.fail_json(**publish_metrics(module, api_instance, dict(
+            msg=f"Patch(es) not found or applicable: {err}"
+        )))
+    except SSLCertVerificationError:
+        module.fail_json(**publish_metrics(module, api_instance, dict(
+            msg="Failed to verify SSL certificate"
+        )))
+
+
+def _install_patches(module, api_instance):
+    """
+    Installs patches on the host
+    """
+    if not module.params.get('name'):
+        _install_patches_on_hosts(module, api_instance)
+        return
+
+    # get parameters
+    host = get_host_id(module.params.get('name'), api_instance)
+    include_patches, exclude_patches = _get_patch_filter(module, api_instance)
 
     try:
         # get _all_ the patches
         all_patches = api_instance.get_host_patches(host)
-        # exclude or include patches if defined
-        if exclude_patches:
-            patches = [x["id"] for x in all_patches if x["id"] not in exclude_patches]
-        elif include_patches:
-            patches = [x["id"] for x in all_patches if x["id"] in include_patches]
-        else:
-            patches = [x["id"] for x in all_patches]
+        patches = _select_patches(all_patches, include_patches, exclude_patches)
 
         # install patches
         action_id = api_instance.install_patches(
@@ -113,7 +346,17 @@ def _install_patches(module, api_instance):
             ),
             patches
         )
-        module.exit_json(changed=True, action_id=action_id)
+        if module.params.get('wait'):
+            # one action per patch
+            name = module.params.get('name')
+            action_ids = action_id if isinstance(action_id, list) else [action_id]
+            _wait_for_hosts(
+                module, api_instance, {name: host}, {name: action_ids},
+                action_id=action_id
+            )
+        module.exit_json(**publish_metrics(module, api_instance, dict(
+            changed=True, action_id=action_id
+        )))
     except EmptySetException:
         # check if already installed
         if patch_already_installed(
@@ -124,44 +367,25 @@ def _install_patches(module, api_instance):
             patches,
             api_instance
         ):
-            module.exit_json(changed=False)
-        module.fail_json(msg="Patch(es) not found or applicable")
+            module.exit_json(**publish_metrics(module, api_instance, dict(changed=False)))
+        module.fail_json(**publish_metrics(module, api_instance, dict(
+            msg="Patch(es) not found or applicable"
+        )))
     except SSLCertVerificationError:
-        module.fail_json(msg="Failed to verify SSL certificate")
+        module.fail_json(**publish_metrics(module, api_instance, dict(
+            msg="Failed to verify SSL certificate"
+        )))
 
 
 def main():
     """
     Main function
     """
-    argument_spec = dict(
-        uyuni_host=dict(required=True),
-        uyuni_user=dict(required=True),
-        uyuni_password=dict(required=True, no_log=True),
-        uyuni_port=dict(default=443, type='int'),
-        uyuni_verify_ssl=dict(default=True, type='bool'),
-        name=dict(required=True),
-        include_patches=dict(type='list', elements='str', required=False),
-        exclude_patches=dict(type='list', elements='str', required=False)
-    )
-
-    module = AnsibleModule(
-        argument_spec=argument_spec,
-        mutually_exclusive=[('include_patches', 'exclude_patches')],
-        supports_check_mode=False
-    )
+    module = AnsibleModule(**MODULE_ARGS)
 
-    module_params = dict(
-        host=module.params.get('uyuni_host'),
-        username=module.params.get('uyuni_user'),
-        password=module.params.get('uyuni_password'),
-        port=module.params.get('uyuni_port'),
-        verify_ssl=module.params.get('uyuni_verify_ssl'),
-        include_patches=module.params.get('include_patches'),
-        exclude_patches=module.params.get('exclude_patches')
-    )
+    connection_params = get_connection_params(module.params)
 
-    api_instance = _configure_connection(module_params)
+    api_instance = _configure_connection(connection_params)
     _install_patches(module, api_instance)
 
 
@@ -70,7 +70,25 @@ entity:
 
 from ansible.module_utils.basic import AnsibleModule
 from ..module_utils.exceptions import EmptySetException, SSLCertVerificationError
-from ..module_utils.helper_functions import _configure_connection, get_host_id, is_blocklisted
+from ..module_utils.helper_functions import (
+    _configure_connection,
+    get_host_id,
+    is_blocklisted,
+    get_connection_params,
+    publish_metrics,
+    uyuni_argument_spec
+)
+
+# module arguments, shared with the controller-side action plugin
+MODULE_ARGS = dict(
+    argument_spec=uyuni_argument_spec(
+        name=dict(required=True),
+        include_upgrades=dict(type='list', elements='str', required=False),
+        exclude_upgrades=dict(type='list', elements='str', required=False)
+    ),
+    mutually_exclusive=[('include_upgrades', 'exclude_upgrades')],
+    supports_check_mode=False
+)
 
 
 def _install_upgrades(module, api_instance):
@@ -118,49 +136,32 @@ def _install_upgrades(module, api_instance):
             ),
             upgrades
         )
-        module.exit_json(changed=True, action_id=action_id)
+        module.exit_json(**publish_metrics(module, api_instance, dict(
+            changed=True, action_id=action_id
+        )))
     except EmptySetException as err:
         # exit if no upgrades available
         if not upgrades:
-            module.exit_json(changed=False)
+            module.exit_json(**publish_metrics(module, api_instance, dict(changed=False)))
         # exit if invalid upgrade
-        module.fail_json(msg=f"Upgrade(s) not found or applicable: {err}")
+        module.fail_json(**publish_metrics(module, api_instance, dict(
+            msg=f"Upgrade(s) not found or applicable: {err}"
+        )))
     except SSLCertVerificationError:
-        module.fail_json(msg="Failed to verify SSL certificate")
+        module.fail_json(**publish_metrics(module, api_instance, dict(
+            msg="Failed to verify SSL certificate"
+        )))
 
 
 def main():
     """
     Main functions
     """
-    argument_spec = dict(
-        uyuni_host=dict(required=True),
-        uyuni_user=dict(required=True),
-        uyuni_password=dict(required=True, no_log=True),
-        uyuni_port=dict(default=443, type='int'),
-        uyuni_verify_ssl=dict(default=True, type='bool'),
-        name=dict(required=True),
-        include_upgrades=dict(type='list', elements='str', required=False),
-        exclude_upgrades=dict(type='list', elements='str', required=False)
-    )
-
-    module = AnsibleModule(
-        argument_spec=argument_spec,
-        mutually_exclusive=[('include_upgrades', 'exclude_upgrades')],
-        supports_check_mode=False
-    )
-
-    module_params = dict(
-        host=module.params.get('uyuni_host'),
-        username=module.params.get('uyuni_user'),
-        password=module.params.get('uyuni_password'),
-        port=module.params.get('uyuni_port'),
-        verify_ssl=module.params.get('uyuni_verify_ssl'),
-        include_upgrades=module.params.get('include_upgrades'),
-        exclude_upgrades=module.params.get('exclude_upgrades')
-    )
-
-    api_instance = _configure_connection(module_params)
+    module = AnsibleModule(**MODULE_ARGS)
+
+    connection_params = get_connection_params(module.params)
+
+    api_instance = _configure_connection(connection_params)
     _install_upgrades(module, api_instance)
 
 
@@ -60,7 +60,20 @@ entity:
 
 from ansible.module_utils.basic import AnsibleModule
 from ..module_utils.exceptions import SSLCertVerificationError
-from ..module_utils.helper_functions import _configure_connection, get_host_id
+from ..module_utils.helper_functions import (
+    _configure_connection,
+    get_host_id,
+    get_connection_params,
+    publish_metrics,
+    uyuni_argument_spec
+)
+
+# module arguments, shared with the controller-side action plugin
+MODULE_ARGS = dict(
+    argument_spec=uyuni_argument_spec(
+        name=dict(required=True)
+    )
+)
 
 
 def _is_reboot_required(module, api_instance):
@@ -76,35 +89,26 @@ def _is_reboot_required(module, api_instance):
             )
         )
         if reboot_required is True:
-            module.exit_json(changed=True, reboot_required=reboot_required)
+            module.exit_json(**publish_metrics(module, api_instance, dict(
+                changed=True, reboot_required=reboot_required
+            )))
         if reboot_required is False:
-            module.exit_json(changed=False, reboot_required=reboot_required)
+            module.exit_json(**publish_metrics(module, api_instance, dict(
+                changed=False, reboot_required=reboot_required
+            )))
     except SSLCertVerificationError:
-        module.fail_json(msg="Failed to verify SSL certificate")
+        module.fail_json(**publish_metrics(module, api_instance, dict(
+            msg="Failed to verify SSL certificate"
+        )))
 
 
 def main():
     """
     Main functions
     """
-    argument_spec = dict(
-        uyuni_host=dict(required=True),
-        uyuni_user=dict(required=True),
-        uyuni_password=dict(required=True, no_log=True),
-        uyuni_port=dict(default=443, type='int'),
-        uyuni_verify_ssl=dict(default=True, type='bool'),
-        name=dict(required=True)
-    )
-
-    module = AnsibleModule(argument_spec=argument_spec)
+    module = AnsibleModule(**MODULE_ARGS)
 
-    connection_params = dict(
-        host=module.params.get('uyuni_host'),
-        username=module.params.get('uyuni_user'),
-        password=module.params.get('uyuni_password'),
-        port=module.params.get('uyuni_port'),
-        verify_ssl=module.params.get('uyuni_verify_ssl')
-    )
+    connection_params = get_connection_params(module.params)
 
     api_instance = _configure_connection(connection_params)
     _is_reboot_required(module, api_instance)
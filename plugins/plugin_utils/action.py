@@ -0,0 +1,181 @@
+"""
+Base class for action plugins running this collection's modules on the
+controller
+"""
+
+from __future__ import (absolute_import, division, print_function)
+import json
+
+from ansible.module_utils.basic import remove_values
+from ansible.module_utils.common.arg_spec import ArgumentSpecValidator
+from ansible.module_utils.parsing.convert_bool import boolean
+from ansible.parsing.ajson import AnsibleJSONEncoder
+from ansible.plugins.action import ActionBase
+from ansible.utils.vars import merge_hash
+
+from ..module_utils.helper_functions import (
+    get_connection_params,
+    publish_metrics
+)
+from .clients import get_api_client, release_api_client
+
+__metaclass__ = type
+
+
+def _no_log_values(argument_spec, params):
+    """
+    Returns the values of parameters that must not be logged, also of
+    suboptions
+    """
+    values = set()
+    for name, spec in argument_spec.items():
+        value = params.get(name)
+        if value is None:
+            continue
+        if spec.get('no_log'):
+            values.add(str(value))
+        if spec.get('options'):
+            for item in value if isinstance(value, list) else [value]:
+                if isinstance(item, dict):
+                    values |= _no_log_values(spec['options'], item)
+    return values
+
+
+class ModuleExit(BaseException):
+    """
+    Exception ending a module run on the controller with a result
+
+    .. class:: ModuleExit
+    """
+
+    def __init__(self, result):
+        super().__init__(result.get('msg'))
+        self.result = result
+
+
+class ControllerModule:
+    """
+    Stand-in for AnsibleModule providing what this collection's module
+    code needs when running on the controller
+
+    .. class:: ControllerModule
+    """
+
+    def __init__(self, params, check_mode=False):
+        """
+        Constructor creating the module
+
+        :param params: validated module parameters
+        :type params: dict
+        :param check_mode: whether to run in check mode
+        :type check_mode: bool
+        """
+        self.params = params
+        self.check_mode = check_mode
+
+    def exit_json(self, **kwargs):
+        """
+        Ends the module run successfully
+        """
+        kwargs.setdefault('changed', False)
+        raise ModuleExit(kwargs)
+
+    def fail_json(self, msg, **kwargs):
+        """
+        Ends the module run with an error
+        """
+        kwargs.update(failed=True, msg=msg)
+        raise ModuleExit(kwargs)
+
+
+class UyuniActionBase(ActionBase):
+    """
+    Runs a module on the controller instead of shipping it to the target
+    if the uyuni_controller_side variable is true, which saves copying
+    the module and starting an interpreter per task. Otherwise the module
+    runs as usual, on the target or delegated host - like async tasks,
+    which always do.
+
+    .. class:: UyuniActionBase
+    """
+
+    TRANSFERS_FILES = False
+    _supports_async = True
+    _MODULE = None
+    """
+    module: module providing MODULE_ARGS
+    """
+    _RUN = None
+    """
+    str: name of the module function expecting the module and an API client
+    """
+
+    def run(self, tmp=None, task_vars=None):
+        """
+        Runs the module
+        """
+        result = super().run(tmp, task_vars)
+        del tmp
+
+        controller_side = self._templar.template(
+            (task_vars or {}).get('uyuni_controller_side', False)
+        )
+        if self._task.async_val or not boolean(controller_side, strict=False):
+            # like the normal action plugin
+            wrap_async = self._task.async_val and not self._connection.has_native_async
+            result = merge_hash(result, self._execute_module(
+                module_name=self._task.resolved_action, task_vars=task_vars,
+                wrap_async=wrap_async
+            ))
+            if not wrap_async:
+                # remove a temporary path we created
+                self._remove_tmp_path(self._connection._shell.tmpdir)
+            return result
+
+        result.update(self._run_module(self._task.args))
+        return result
+
+    def _run_module(self, args):
+        """
+        Validates the arguments and runs the module code
+        """
+        module_args = dict(self._MODULE.MODULE_ARGS)
+        supports_check_mode = module_args.pop('supports_check_mode', False)
+        # pass plain values like a module receives them, e.g. decrypted
+        # vault values and strings XMLRPC can marshal
+        args = json.loads(json.dumps(
+            args, cls=AnsibleJSONEncoder, vault_to_text=True
+        ))
+        validation = ArgumentSpecValidator(**module_args).validate(args)
+        if validation.error_messages:
+            return dict(failed=True, msg=", ".join(validation.error_messages))
+
+        if self._task.check_mode and not supports_check_mode:
+            return dict(
+                skipped=True,
+                msg=f"module ({self._task.action}) does not support check mode"
+            )
+
+        params = validation.validated_parameters
+        no_log_values = _no_log_values(module_args['argument_spec'], params)
+        module = ControllerModule(params, self._task.check_mode)
+        api_instance = None
+        try:
+            api_instance = get_api_client(get_connection_params(params))
+            getattr(self._MODULE, self._RUN)(module, api_instance)
+            result = dict(
+                failed=True,
+                msg=f"Module ({self._task.action}) did not handle its own exit"
+            )
+        except ModuleExit as err:
+            result = err.result
+        except Exception as err:  # pylint: disable=broad-except
+            result = dict(failed=True, msg=f"{type(err).__name__}: {err}")
+            if api_instance is not None:
+                publish_metrics(module, api_instance, result)
+        finally:
+            if api_instance is not None:
+                release_api_client(api_instance)
+
+        result['invocation'] = dict(module_args=params)
+        return remove_values(result, no_log_values)
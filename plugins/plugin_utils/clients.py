@@ -0,0 +1,62 @@
+"""
+Uyuni API clients for controller-side plugins
+"""
+
+from __future__ import (absolute_import, division, print_function)
+import logging
+
+from ..module_utils.cache import session_key_store
+from ..module_utils.helper_functions import (
+    get_instrumentation,
+    get_rate_limiter,
+    get_retry_policy
+)
+from ..module_utils.uyuni import UyuniAPIClient
+
+__metaclass__ = type
+
+
+def get_api_client(connection_params):
+    """
+    Returns an authenticated API client for the given connection
+    parameters. Ansible runs every task in a new worker process, so
+    clients are not kept between tasks. With uyuni_session_cache,
+    session keys are shared with other workers through a store in the
+    cache directory and a new session is only started once the stored
+    one expired. Pass the client to release_api_client() when the task
+    is done.
+
+    :param connection_params: parameters as returned by get_connection_params
+    :type connection_params: dict
+    """
+    session_store = None
+    if connection_params.get('session_cache'):
+        session_store = session_key_store(connection_params.get('cache_dir'))
+
+    return UyuniAPIClient(
+        logging.ERROR,
+        connection_params.get('host'),
+        connection_params.get('username'),
+        connection_params.get('password'),
+        port=connection_params.get('port'),
+        verify=connection_params.get('verify_ssl'),
+        cache_dir=connection_params.get('cache_dir'),
+        session_store=session_store,
+        validate_api=connection_params.get('validate_api', True),
+        rate_limiter=get_rate_limiter(connection_params),
+        retry_policy=get_retry_policy(connection_params),
+        # record the calls of the current task, including logging in
+        instrumentation=get_instrumentation(connection_params)
+    )
+
+
+def release_api_client(client):
+    """
+    Ends the session of a client after a task, unless it is shared with
+    other workers through the session store
+
+    :param client: client returned by get_api_client
+    :type client: UyuniAPIClient
+    """
+    if not client.session_store:
+        client.logout()
@@ -0,0 +1,157 @@
+"""
+Benchmark comparing TCP/TLS handshakes of the default XMLRPC transport and
+the pooled keep-alive transport against a local XMLRPC stub.
+
+The default transport is not thread-safe, so threaded scenarios use one
+client per thread for it, while the pooled transport shares a single client
+with at most --pool-size connections.
+
+Usage:
+  python tests/benchmarks/bench_transport.py [--calls 1000] [--threads 8]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from socketserver import ThreadingMixIn
+from xmlrpc.client import ServerProxy, Transport
+from xmlrpc.server import SimpleXMLRPCRequestHandler, SimpleXMLRPCServer
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+)
+from plugins.module_utils.transport import PooledTransport  # noqa: E402
+
+
+class KeepAliveRequestHandler(SimpleXMLRPCRequestHandler):
+    """
+    Request handler speaking HTTP/1.1 so that connections are kept alive
+    """
+    protocol_version = "HTTP/1.1"
+    rpc_paths = ("/rpc/api",)
+    max_requests = 0
+
+    def setup(self):
+        super().setup()
+        self.requests_served = 0
+
+    def do_POST(self):
+        super().do_POST()
+        self.requests_served += 1
+        # mimic Tomcat's maxKeepAliveRequests
+        if self.max_requests and self.requests_served >= self.max_requests:
+            self.close_connection = True
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+class CountingXMLRPCServer(ThreadingMixIn, SimpleXMLRPCServer):
+    """
+    Threaded XMLRPC stub counting accepted connections (= handshakes)
+    """
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.handshakes = 0
+        self._lock = threading.Lock()
+
+    def get_request(self):
+        with self._lock:
+            self.handshakes += 1
+        return super().get_request()
+
+
+def start_server(max_requests):
+    """
+    Starts the stub server in a background thread
+    """
+    KeepAliveRequestHandler.max_requests = max_requests
+    server = CountingXMLRPCServer(
+        ("127.0.0.1", 0), requestHandler=KeepAliveRequestHandler,
+        logRequests=False, allow_none=True
+    )
+    server.register_function(lambda key, sid: {"id": sid, "ip": "10.0.0.1"}, "system.getNetwork")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(server, make_proxy, calls, threads):
+    """
+    Issues calls against the server and returns handshakes and wall time
+    """
+    url = f"http://127.0.0.1:{server.server_address[1]}/rpc/api"
+    server.handshakes = 0
+    local = threading.local()
+
+    def call(index):
+        if make_proxy.shared:
+            proxy = make_proxy.shared
+        else:
+            # the default transport is not thread-safe: one proxy per thread
+            if not hasattr(local, "proxy"):
+                local.proxy = make_proxy(url)
+            proxy = local.proxy
+        return proxy.system.getNetwork("key", index)
+
+    make_proxy.shared = make_proxy(url) if make_proxy.thread_safe else None
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(call, range(calls)))
+    return server.handshakes, time.perf_counter() - start
+
+
+def default_proxy(url):
+    return ServerProxy(url, transport=Transport())
+
+
+def pooled_proxy(url):
+    return ServerProxy(
+        url, transport=PooledTransport(pool_size=pooled_proxy.pool_size)
+    )
+
+
+default_proxy.thread_safe = False
+pooled_proxy.thread_safe = True
+
+
+def main():
+    """
+    Runs the benchmark scenarios and prints a table
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument(
+        "--max-requests", type=int, default=100,
+        help="requests per connection before the stub closes it"
+    )
+    args = parser.parse_args()
+    pooled_proxy.pool_size = args.pool_size
+
+    scenarios = (
+        ("sequential", 1, 0),
+        ("sequential, server closes", 1, args.max_requests),
+        ("threaded", args.threads, 0),
+        ("threaded, server closes", args.threads, args.max_requests),
+    )
+    print(f"{'scenario':<28} {'transport':<10} {'handshakes/1k':>14} {'seconds':>8}")
+    for name, threads, max_requests in scenarios:
+        server = start_server(max_requests)
+        for label, factory in (("default", default_proxy), ("pooled", pooled_proxy)):
+            handshakes, elapsed = run(server, factory, args.calls, threads)
+            print(
+                f"{name:<28} {label:<10} "
+                f"{handshakes * 1000 / args.calls:>14.1f} {elapsed:>8.2f}"
+            )
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""
+Fixtures for the pytest-benchmark suite measuring this collection against
+fake Uyuni servers, see tests/fake_uyuni. Install the requirements with
+pip install -r tests/benchmarks/requirements.txt first; CI runs the suite
+without the 10k and 50k system inventories.
+
+Every benchmark records the following metrics (median of all rounds) in
+the extra_info of its pytest-benchmark result:
+
+- round_trips: API requests sent, a multicall counts once
+- wall_time: seconds
+- cpu_time: CPU seconds of the benchmarking process - the fake server
+  runs in its own process and isn't included
+- peak_rss: peak resident memory in KiB (reset per round on Linux)
+
+Metrics are compared with a baseline, by default baseline.json next to
+this file, and the benchmark fails if a metric exceeds its baseline by
+more than --perf-threshold (round trips must not grow at all). The
+committed baseline only contains round trips as timings depend on the
+machine - record a local baseline including timings first, e.g.:
+
+  pytest tests/benchmarks --perf-baseline=.benchmarks/local.json \\
+      --perf-update-baseline --perf-metrics=round_trips,wall_time,cpu_time,peak_rss
+
+pytest-benchmark's own --benchmark-save/--benchmark-compare-fail options
+work as usual in addition.
+"""
+
+import json
+import logging
+import os
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, ROOT)
+
+from plugins.module_utils.reboot import RebootSnapshot  # noqa: E402
+from plugins.module_utils.rpc import RPCProxy  # noqa: E402
+from plugins.module_utils.uyuni import UyuniAPIClient  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+STRICT_METRICS = ("round_trips",)
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("perf", "performance regression checks")
+    group.addoption(
+        "--perf-baseline", default=DEFAULT_BASELINE,
+        help="baseline file to compare metrics with"
+    )
+    group.addoption(
+        "--perf-threshold", type=float, default=0.25,
+        help="tolerated growth of timing and memory metrics (default: 0.25)"
+    )
+    group.addoption(
+        "--perf-update-baseline", action="store_true",
+        help="store the measured metrics in the baseline instead of comparing"
+    )
+    group.addoption(
+        "--perf-metrics", default="round_trips",
+        help="comma-separated metrics stored by --perf-update-baseline"
+    )
+
+
+class Baseline:
+    """
+    Stored metrics by benchmark name
+    """
+
+    def __init__(self, path, threshold, update, metrics):
+        self.path = path
+        self.threshold = threshold
+        self.update = update
+        self.metrics = metrics
+        self.data = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as baseline:
+                self.data = json.load(baseline)
+
+    def check(self, name, measured):
+        """
+        Stores the metrics or returns the regressions against the baseline
+        """
+        if self.update:
+            self.data[name] = {
+                x: value for x, value in measured.items() if x in self.metrics
+            }
+            return []
+        regressions = []
+        for metric, expected in self.data.get(name, {}).items():
+            limit = expected
+            if metric not in STRICT_METRICS:
+                limit = expected * (1 + self.threshold)
+            if measured.get(metric, 0) > limit:
+                regressions.append(
+                    f"{metric} {measured[metric]:g} exceeds baseline {expected:g}"
+                )
+        return regressions
+
+    def save(self):
+        """
+        Writes the baseline if it was updated
+        """
+        if not self.update:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as baseline:
+            json.dump(self.data, baseline, indent=2, sort_keys=True)
+            baseline.write("\n")
+
+
+@pytest.fixture(scope="session")
+def baseline(request):
+    config = request.config
+    stored = Baseline(
+        config.getoption("--perf-baseline"),
+        config.getoption("--perf-threshold"),
+        config.getoption("--perf-update-baseline"),
+        config.getoption("--perf-metrics").split(","),
+    )
+    yield stored
+    stored.save()
+
+
+class FakeUyuni:
+    """
+    Fake Uyuni server running in a subprocess, options set to True are
+    passed as flags (e.g. no_multicall)
+    """
+
+    def __init__(self, **options):
+        args = [sys.executable, "-m", "tests.fake_uyuni", "--port", "0"]
+        for option, value in options.items():
+            args.append(f"--{option.replace('_', '-')}")
+            if value is not True:
+                args.append(str(value))
+        # pylint: disable=consider-using-with
+        self.process = subprocess.Popen(
+            args, cwd=ROOT, stdout=subprocess.PIPE, text=True
+        )
+        line = self.process.stdout.readline()
+        match = re.search(r":(\d+)/rpc/api", line)
+        if not match:
+            self.stop()
+            raise RuntimeError(f"Fake Uyuni server didn't start: {line!r}")
+        self.port = int(match.group(1))
+
+    def client(self, **kwargs):
+        """
+        Returns a new API client connected to the server
+        """
+        return UyuniAPIClient(
+            logging.ERROR, "127.0.0.1", "admin", "admin",
+            port=self.port, verify=False, **kwargs
+        )
+
+    def stop(self):
+        """
+        Stops the server
+        """
+        self.process.terminate()
+        self.process.wait()
+        self.process.stdout.close()
+
+
+@pytest.fixture(scope="session")
+def fake_uyuni():
+    """
+    Returns a factory starting fake Uyuni servers with the given command
+    line options, servers are shared by all benchmarks using the same
+    options
+    """
+    servers = {}
+
+    def start(**options):
+        key = tuple(sorted(options.items()))
+        if key not in servers:
+            servers[key] = FakeUyuni(**options)
+        return servers[key]
+
+    yield start
+    for server in servers.values():
+        server.stop()
+
+
+@pytest.fixture
+def round_trips(monkeypatch):
+    """
+    Returns a counter of the API requests sent by all clients
+    """
+    counter = [0]
+    send = RPCProxy._send
+
+    def counting_send(self, method, args):
+        counter[0] += 1
+        return send(self, method, args)
+
+    monkeypatch.setattr(RPCProxy, "_send", counting_send)
+    return counter
+
+
+def _clear_caches():
+    """
+    Drops all process-wide caches, so every round starts cold
+    """
+    UyuniAPIClient._API_VERSIONS.clear()
+    UyuniAPIClient._PROVIDING_ERRATA.clear()
+    with RebootSnapshot._SHARED_LOCK:
+        RebootSnapshot._SHARED.clear()
+
+
+def _reset_peak_rss():
+    """
+    Resets the peak resident memory of the process if supported
+    """
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="utf-8") as refs:
+            refs.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss():
+    """
+    Returns the peak resident memory of the process in KiB
+    """
+    try:
+        with open("/proc/self/status", encoding="utf-8") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KiB elsewhere
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+@pytest.fixture
+def measure(benchmark, baseline, round_trips, request):
+    """
+    Returns a function running a callable as benchmark, recording the
+    metrics and failing on regressions against the baseline
+    """
+    def run(func, setup=None, rounds=5):
+        """
+        Runs func once per round, setup is called before every round and
+        may return the arguments of func as (args, kwargs)
+        """
+        samples = []
+
+        def prepare():
+            _clear_caches()
+            return setup() if setup else None
+
+        def target(*args, **kwargs):
+            _reset_peak_rss()
+            trips = round_trips[0]
+            cpu = time.process_time()
+            wall = time.perf_counter()
+            func(*args, **kwargs)
+            samples.append(dict(
+                wall_time=time.perf_counter() - wall,
+                cpu_time=time.process_time() - cpu,
+                round_trips=round_trips[0] - trips,
+                peak_rss=_peak_rss(),
+            ))
+
+        benchmark.pedantic(target, setup=prepare, rounds=rounds, iterations=1)
+        metrics = {
+            x: statistics.median(sample[x] for sample in samples)
+            for x in ("wall_time", "cpu_time")
+        }
+        metrics.update({
+            x: statistics.median_low(sample[x] for sample in samples)
+            for x in ("round_trips", "peak_rss")
+        })
+        benchmark.extra_info.update(metrics)
+        regressions = baseline.check(request.node.name, metrics)
+        if regressions:
+            pytest.fail("; ".join(regressions))
+        return metrics
+
+    return run
@@ -0,0 +1,108 @@
+"""
+Benchmarks of API client hot paths used by the modules
+"""
+
+import pytest
+
+from plugins.module_utils.helper_functions import (
+    get_recently_installed_patches
+)
+from plugins.module_utils.polling import ActionWaiter, BackoffPoller
+from tests.fake_uyuni import Fleet
+
+SAMPLE = 50
+"""
+int: Number of systems to pick the largest one from
+"""
+
+
+def _largest(fleet, data):
+    """
+    Returns the system of the first SAMPLE systems with the most entries
+    in data - fleets are deterministic, so a small local fleet predicts
+    the data of the server's fleet
+    """
+    return max(
+        (x["id"] for x in fleet.systems[:SAMPLE]),
+        key=lambda system_id: len(data(system_id))
+    )
+
+
+@pytest.mark.parametrize("packages", [200, 800])
+def test_get_host_upgrades(measure, fake_uyuni, packages):
+    options = dict(systems=SAMPLE, packages=4 * packages, max_upgrades=packages)
+    server = fake_uyuni(**options)
+    fleet = Fleet(**options)
+    system_id = _largest(fleet, fleet.upgradable_packages)
+
+    def get_host_upgrades(api_client):
+        upgrades = api_client.get_host_upgrades(system_id)
+        assert len(upgrades) < len(fleet.upgradable_packages(system_id))
+
+    measure(
+        get_host_upgrades,
+        setup=lambda: ((server.client(pool_size=1),), {})
+    )
+
+
+@pytest.mark.parametrize("events", [500, 2000])
+def test_get_recently_installed_patches(measure, fake_uyuni, events):
+    options = dict(systems=SAMPLE, max_events=events)
+    server = fake_uyuni(**options)
+    fleet = Fleet(**options)
+    system_id = _largest(fleet, fleet.events)
+
+    def get_patches(api_client):
+        assert get_recently_installed_patches(system_id, api_client)
+
+    measure(
+        get_patches,
+        setup=lambda: ((server.client(pool_size=1),), {})
+    )
+
+
+def test_wait_for_action(measure, fake_uyuni):
+    server = fake_uyuni(systems=SAMPLE, action_duration=2)
+    api_client = server.client(pool_size=1)
+    system_id = api_client.get_hosts()[0]
+
+    def schedule():
+        return (api_client.reboot_host(system_id),), {}
+
+    def wait(action_id):
+        status = api_client.wait_for_action(
+            action_id, system_id, interval=0.05, max_interval=0.5
+        )
+        assert status[0]["successful_count"] == 1
+
+    metrics = measure(wait, setup=schedule, rounds=3)
+    # polling must not keep the CPU busy while the action runs
+    assert metrics["cpu_time"] < 0.1 * metrics["wall_time"]
+
+
+@pytest.mark.parametrize("multicall", [True, False])
+def test_wait_for_actions(measure, fake_uyuni, multicall):
+    options = dict(systems=SAMPLE, action_duration=1)
+    if not multicall:
+        # servers without system.multicall are served by single calls
+        options["no_multicall"] = True
+    server = fake_uyuni(**options)
+    api_client = server.client(pool_size=1)
+    system_ids = api_client.get_hosts()[:10]
+
+    def schedule():
+        return ([
+            (system_id, api_client.reboot_host(system_id))
+            for system_id in system_ids
+        ],), {}
+
+    def wait(pairs):
+        poller = BackoffPoller(min_interval=0.05, max_interval=0.5)
+        results = list(ActionWaiter(api_client, poller).wait(pairs))
+        assert sorted((x.system_id, x.action_id) for x in results) == sorted(pairs)
+        assert all(x.successful for x in results)
+        # the status of a single action is found in the system's events
+        status = api_client.get_host_action(pairs[0][0], pairs[0][1])
+        assert status[0]["successful_count"] == 1
+
+    measure(wait, setup=schedule, rounds=3)
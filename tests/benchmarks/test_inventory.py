@@ -0,0 +1,109 @@
+"""
+Benchmarks of the inventory plugin building inventories of 1k to 50k hosts
+"""
+
+import pytest
+
+pytest.importorskip("ansible")
+
+from ansible.inventory.data import InventoryData  # noqa: E402
+
+from plugins.inventory.inventory import InventoryModule  # noqa: E402
+
+SIZES = [(1000, 5), (10000, 3), (50000, 1)]
+"""
+list: Fleet sizes and benchmark rounds
+"""
+
+
+class BenchmarkInventory(InventoryModule):
+    """
+    Inventory plugin reading its options from a dict instead of an
+    inventory source
+    """
+
+    def __init__(self, server, **options):
+        super().__init__()
+        self.inventory = InventoryData()
+        self.options = dict(
+            host="127.0.0.1", user="admin", password="admin",
+            port=server.port, verify_ssl=False, groups=None,
+            pending_reboot_only=False, show_custom_values=True,
+            ipv6_only=False, max_workers=1, max_requests_per_second=0, retries=3,
+            incremental=False,
+        )
+        self.options.update(options)
+
+    def get_option(self, option, hostvars=None):
+        return self.options[option]
+
+    def run(self):
+        """
+        Fetches all hosts and populates the inventory like parse() does
+        without caching
+        """
+        self._api_connect()
+        self._populate(self._fetch_data())
+
+
+@pytest.mark.parametrize("systems,rounds", SIZES)
+def test_inventory(measure, fake_uyuni, systems, rounds):
+    server = fake_uyuni(systems=systems)
+    metrics = measure(
+        lambda inventory: inventory.run(),
+        setup=lambda: ((BenchmarkInventory(server),), {}),
+        rounds=rounds
+    )
+    assert metrics["round_trips"] > 0
+
+
+@pytest.mark.parametrize("systems,rounds", SIZES)
+def test_populate(measure, fake_uyuni, systems, rounds):
+    server = fake_uyuni(systems=systems)
+    fetched = BenchmarkInventory(server)
+    fetched._api_connect()
+    data = fetched._fetch_data()
+
+    def populate(inventory):
+        inventory._populate(data)
+        assert len(inventory.inventory.hosts) == systems
+
+    measure(
+        populate,
+        setup=lambda: ((BenchmarkInventory(server),), {}),
+        rounds=rounds
+    )
+
+
+def _contents(inventory):
+    """
+    Returns the hosts with their variables and the groups with their
+    members of an inventory
+    """
+    return (
+        {name: host.vars for name, host in inventory.inventory.hosts.items()},
+        {
+            name: sorted(x.name for x in group.hosts)
+            for name, group in inventory.inventory.groups.items()
+        },
+    )
+
+
+def test_inventory_without_multicall(measure, fake_uyuni):
+    # servers without system.multicall are served by single calls, which
+    # must build the same inventory
+    expected = BenchmarkInventory(fake_uyuni(systems=200))
+    expected.run()
+    server = fake_uyuni(systems=200, no_multicall=True)
+    inventories = []
+
+    def run(inventory):
+        inventory.run()
+        inventories.append(inventory)
+
+    measure(
+        run,
+        setup=lambda: ((BenchmarkInventory(server),), {}),
+        rounds=1
+    )
+    assert _contents(inventories[0]) == _contents(expected)
@@ -0,0 +1,22 @@
+"""
+Benchmarks of helper functions without API access
+"""
+
+from plugins.module_utils.utilities import split_rpm_filename
+
+FILENAMES = [
+    f"{epoch}package{index:05d}-{index % 7}.{index % 13}-{index % 5}.1.x86_64.rpm"
+    for index in range(10000) for epoch in ("", "1:")
+]
+"""
+list: RPM file names with and without epoch
+"""
+
+
+def test_split_rpm_filename(measure):
+    def split_all():
+        for filename in FILENAMES:
+            split_rpm_filename(filename)
+
+    metrics = measure(split_all, rounds=20)
+    assert metrics["round_trips"] == 0
@@ -0,0 +1,14 @@
+"""
+Stand-in for a Uyuni server to measure this collection against offline.
+
+It implements the XMLRPC API methods used by UyuniAPIClient on top of a
+synthetic fleet and can add latency and inject faults. Run it with
+``python -m tests.fake_uyuni --help`` from the repository root or use
+FakeUyuniServer in benchmarks.
+"""
+
+from .api import FakeUyuniAPI
+from .fleet import Fleet
+from .server import FakeUyuniServer, self_signed_certificate
+
+__all__ = ["FakeUyuniAPI", "FakeUyuniServer", "Fleet", "self_signed_certificate"]
@@ -0,0 +1,120 @@
+"""
+Runs a fake Uyuni server until interrupted
+
+Usage:
+  python -m tests.fake_uyuni [--systems 20000] [--port 8443] [--latency 0.01]
+
+Use --port 0 to listen on any free port, the URL is printed on startup.
+"""
+
+import argparse
+
+from .api import FakeUyuniAPI
+from .fleet import Fleet
+from .server import FakeUyuniServer
+
+
+def main():
+    """
+    Parses arguments and serves the fake API
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m tests.fake_uyuni", description=__doc__.split("\n\n")[0]
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8443)
+    parser.add_argument("--systems", type=int, default=10000)
+    parser.add_argument("--groups", type=int, default=20)
+    parser.add_argument("--errata", type=int, default=2000)
+    parser.add_argument("--packages", type=int, default=3000)
+    parser.add_argument("--max-errata", type=int, default=30)
+    parser.add_argument("--max-upgrades", type=int, default=40)
+    parser.add_argument("--max-events", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin")
+    parser.add_argument(
+        "--latency", type=float, default=0.0,
+        help="seconds to delay every HTTP request"
+    )
+    parser.add_argument(
+        "--call-latency", type=float, default=0.0,
+        help="seconds to delay every call, also within multicalls"
+    )
+    parser.add_argument(
+        "--fault-rate", type=float, default=0.0,
+        help="share of calls answered with a fault"
+    )
+    parser.add_argument(
+        "--fault-method", action="append", dest="fault_methods",
+        help="only inject faults into methods matching this pattern"
+    )
+    parser.add_argument(
+        "--session-ttl", type=float,
+        help="seconds until session keys expire"
+    )
+    parser.add_argument(
+        "--action-duration", type=float, default=5.0,
+        help="seconds until scheduled actions complete"
+    )
+    parser.add_argument(
+        "--action-failure-rate", type=float, default=0.0,
+        help="share of systems failing scheduled actions"
+    )
+    parser.add_argument(
+        "--max-keepalive-requests", type=int, default=100,
+        help="requests per connection before closing it (0: unlimited)"
+    )
+    parser.add_argument(
+        "--http-error-rate", type=float, default=0.0,
+        help="share of HTTP requests answered with an error status"
+    )
+    parser.add_argument(
+        "--http-error-status", type=int, default=503,
+        help="HTTP status of these errors"
+    )
+    parser.add_argument(
+        "--no-multicall", dest="multicall", action="store_false",
+        help="answer system.multicall like servers without multicall support"
+    )
+    parser.add_argument("--no-tls", dest="tls", action="store_false")
+    parser.add_argument("--certfile")
+    parser.add_argument("--keyfile")
+    args = parser.parse_args()
+
+    fleet = Fleet(
+        systems=args.systems, groups=args.groups, errata=args.errata,
+        packages=args.packages, max_errata=args.max_errata,
+        max_upgrades=args.max_upgrades, max_events=args.max_events,
+        seed=args.seed
+    )
+    api = FakeUyuniAPI(
+        fleet, users={args.username: args.password},
+        call_latency=args.call_latency, fault_rate=args.fault_rate,
+        fault_methods=args.fault_methods, session_ttl=args.session_ttl,
+        action_duration=args.action_duration,
+        action_failure_rate=args.action_failure_rate, seed=args.seed
+    )
+    server = FakeUyuniServer(
+        api, host=args.host, port=args.port, latency=args.latency,
+        tls=args.tls, certfile=args.certfile, keyfile=args.keyfile,
+        max_keepalive_requests=args.max_keepalive_requests,
+        error_rate=args.http_error_rate, error_status=args.http_error_status,
+        multicall=args.multicall
+    )
+    print(
+        f"Serving {len(fleet.systems)} systems and {len(api.methods)} "
+        f"API methods at {server.url}", flush=True
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        for name, count in sorted(api.stats.items()):
+            print(f"{name:<45} {count:>10}")
+
+
+if __name__ == "__main__":
+    main()
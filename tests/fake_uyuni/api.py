@@ -0,0 +1,811 @@
+"""
+Handlers of the Uyuni XMLRPC API methods used by UyuniAPIClient
+
+Methods are answered from a synthetic Fleet. Sessions, scheduled actions,
+action chains and custom values are kept in memory. Scheduled actions
+complete action_duration seconds after they were scheduled. Calls can be
+slowed down and failed randomly to measure client behaviour offline.
+"""
+
+import fnmatch
+import inspect
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from xmlrpc.client import DateTime, Fault
+
+from .fleet import Fleet
+
+API_VERSION = "25"
+"""
+str: API version reported by api.getVersion
+"""
+INVALID_SESSION_FAULT = 2950
+"""
+int: Fault code for rejected credentials and session keys
+"""
+FIRST_ACTION_ID = 10 ** 9
+"""
+int: ID of the first scheduled action, above all generated event IDs
+"""
+UNAUTHENTICATED = ("api.getVersion", "auth.login")
+"""
+tuple: Methods that don't expect a session key
+"""
+CUSTOM_VALUES = ("environment", "owner")
+"""
+tuple: Custom info keys that every system has a value for
+"""
+
+
+def api_method(name):
+    """
+    Marks a FakeUyuniAPI method as handler of an API method
+    """
+    def decorator(func):
+        func.api_name = name
+        return func
+    return decorator
+
+
+def _ids(value):
+    """
+    Returns a list of IDs for methods accepting one or multiple IDs
+    """
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+def _no_such_system(system_id):
+    """
+    Returns the fault for an unknown system
+    """
+    return Fault(-210, f"No such system - sid = {system_id}")
+
+
+class FakeUyuniAPI:
+    """
+    In-memory implementation of the Uyuni XMLRPC API methods used by
+    this collection
+    """
+
+    def __init__(
+            self, fleet=None, users=None, call_latency=0.0, fault_rate=0.0,
+            fault_methods=None, fault=(-1, "Internal server error"),
+            session_ttl=None, action_duration=0.0, action_failure_rate=0.0,
+            seed=0
+    ):
+        """
+        Constructor creating the API
+
+        :param fleet: fleet to serve (default: 10k systems)
+        :type fleet: Fleet
+        :param users: passwords by username (default: admin/admin)
+        :type users: dict
+        :param call_latency: seconds to delay every call, also every
+            call within a multicall
+        :type call_latency: float
+        :param fault_rate: share of calls answered with an injected fault
+        :type fault_rate: float
+        :param fault_methods: patterns of methods to inject faults into
+            (e.g. system.get*), by default all but login and version checks
+        :type fault_methods: list
+        :param fault: code and message of injected faults
+        :type fault: tuple
+        :param session_ttl: seconds until session keys expire (default:
+            never)
+        :type session_ttl: float
+        :param action_duration: seconds until scheduled actions complete
+        :type action_duration: float
+        :param action_failure_rate: share of systems failing actions
+        :type action_failure_rate: float
+        :param seed: seed for injected faults and action results
+        :type seed: int
+        """
+        self.fleet = fleet if fleet is not None else Fleet()
+        self.users = users or {"admin": "admin"}
+        self.call_latency = call_latency
+        self.fault_rate = fault_rate
+        self.fault_methods = fault_methods
+        self.fault = fault
+        self.session_ttl = session_ttl
+        self.action_duration = action_duration
+        self.action_failure_rate = action_failure_rate
+        self.seed = seed
+        self.stats = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._actions = {}
+        self._next_action_id = FIRST_ACTION_ID
+        self._chains = {}
+        self._custom_keys = {
+            x: f"Synthetic {x}" for x in CUSTOM_VALUES
+        }
+        self._custom_values = {}
+        self._handlers = {}
+        for name in dir(type(self)):
+            api_name = getattr(getattr(type(self), name), "api_name", None)
+            if api_name:
+                self._handlers[api_name] = getattr(self, name)
+        self._signatures = {
+            x: inspect.signature(handler) for x, handler in self._handlers.items()
+        }
+
+    @property
+    def methods(self):
+        """
+        Returns the names of all implemented API methods
+        """
+        return sorted(self._handlers)
+
+    def dispatch(self, method, params):
+        """
+        Answers an API call
+
+        :param method: API method name (e.g. system.getId)
+        :type method: str
+        :param params: call parameters including the session key
+        :type params: tuple
+        """
+        handler = self._handlers.get(method)
+        if not handler:
+            raise Fault(-1, f"Could not find method: {method}")
+        self.count(method)
+        if self.call_latency:
+            time.sleep(self.call_latency)
+
+        if method not in UNAUTHENTICATED:
+            if not params:
+                raise Fault(-1, f"Could not find method: {method}")
+            self._check_session(params[0])
+            if method != "auth.logout":
+                params = params[1:]
+        self._inject_fault(method)
+        try:
+            self._signatures[method].bind(*params)
+        except TypeError as err:
+            # Uyuni reports calls with wrong arguments as unknown methods
+            raise Fault(-1, f"Could not find method: {method}") from err
+        return handler(*params)
+
+    def count(self, name, amount=1):
+        """
+        Adds to a statistics counter - the server counts its connections
+        and requests here as well, so all updates share one lock
+
+        :param name: counter name
+        :type name: str
+        :param amount: value to add
+        :type amount: int
+        """
+        with self._lock:
+            self.stats[name] += amount
+
+    def _check_session(self, session_key):
+        """
+        Raises a fault for unknown and expired session keys
+        """
+        with self._lock:
+            expires = self._sessions.get(session_key)
+            if expires is None:
+                raise Fault(INVALID_SESSION_FAULT, "Could not find session")
+            if expires < time.monotonic():
+                del self._sessions[session_key]
+                raise Fault(INVALID_SESSION_FAULT, "Session has expired")
+
+    def _inject_fault(self, method):
+        """
+        Randomly raises the configured fault
+        """
+        if not self.fault_rate or method in UNAUTHENTICATED + ("auth.logout",):
+            return
+        if self.fault_methods and not any(
+                fnmatch.fnmatchcase(method, x) for x in self.fault_methods
+        ):
+            return
+        with self._lock:
+            if self._rng.random() >= self.fault_rate:
+                return
+            self.stats["faults_injected"] += 1
+        raise Fault(*self.fault)
+
+    def expire_sessions(self):
+        """
+        Invalidates all session keys, e.g. to test renewing sessions
+        """
+        with self._lock:
+            self._sessions.clear()
+
+    # auth and api
+
+    @api_method("auth.login")
+    def login(self, username, password, duration=None):
+        if self.users.get(username) != password:
+            raise Fault(
+                INVALID_SESSION_FAULT,
+                "Either the password or username is incorrect."
+            )
+        session_key = uuid.uuid4().hex
+        ttl = duration or self.session_ttl
+        with self._lock:
+            self._sessions[session_key] = (
+                time.monotonic() + ttl if ttl else float("inf")
+            )
+        return session_key
+
+    @api_method("auth.logout")
+    def logout(self, session_key):
+        with self._lock:
+            self._sessions.pop(session_key, None)
+        return 1
+
+    @api_method("api.getVersion")
+    def get_version(self):
+        return API_VERSION
+
+    @api_method("user.getDetails")
+    def get_user(self, login):
+        if login not in self.users:
+            raise Fault(-213, f"Could not find user {login}")
+        return {
+            "first_name": login,
+            "last_name": "Synthetic",
+            "email": f"{login}@example.com",
+            "org_id": 1,
+            "org_name": "Synthetic Organization",
+            "enabled": True,
+        }
+
+    # systems
+
+    def _system(self, system_id):
+        """
+        Returns a system or raises the fault for unknown systems
+        """
+        system = self.fleet.systems_by_id.get(system_id)
+        if not system:
+            raise _no_such_system(system_id)
+        return system
+
+    @api_method("system.listSystems")
+    def list_systems(self):
+        return self.fleet.systems
+
+    @api_method("system.getId")
+    def get_id(self, name):
+        system = self.fleet.systems_by_name.get(name)
+        if not system:
+            return []
+        return [dict(
+            system,
+            outdated_pkg_count=len(self.fleet.upgradable_packages(system["id"]))
+        )]
+
+    @api_method("system.getName")
+    def get_name(self, system_id):
+        system = self._system(system_id)
+        return {
+            "id": system["id"],
+            "name": system["name"],
+            "last_checkin": system["last_checkin"],
+        }
+
+    @api_method("system.getDetails")
+    def get_details(self, system_id):
+        system = self._system(system_id)
+        return {
+            "id": system["id"],
+            "profile_name": system["name"],
+            "hostname": system["name"],
+            "machine_id": uuid.UUID(int=system["id"]).hex,
+            "minion_id": system["name"],
+            "base_entitlement": "salt_entitled",
+            "addon_entitlements": [],
+            "auto_update": False,
+            "release": "15.5",
+            "description": "Synthetic system",
+            "last_boot": system["last_boot"],
+            "lock_status": False,
+            "contact_method": "default",
+        }
+
+    @api_method("system.getNetwork")
+    def get_network(self, system_id):
+        system = self._system(system_id)
+        index = system["id"] - self.fleet.systems[0]["id"]
+        return {
+            "hostname": system["name"],
+            "ip": f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}",
+            "ip6": f"fd00::{index:x}",
+        }
+
+    @api_method("system.listGroups")
+    def list_groups(self, system_id):
+        self._system(system_id)
+        memberships = self.fleet.system_groups[system_id]
+        return [
+            {
+                "id": group["id"],
+                "sgid": str(group["id"]),
+                "system_group_name": group["name"],
+                "subscribed": int(index in memberships),
+            } for index, group in enumerate(self.fleet.groups)
+        ]
+
+    @api_method("system.getRelevantErrata")
+    def get_relevant_errata(self, system_id):
+        self._system(system_id)
+        return self.fleet.relevant_errata(system_id)
+
+    @api_method("system.listLatestUpgradablePackages")
+    def list_latest_upgradable_packages(self, system_id):
+        self._system(system_id)
+        return self.fleet.upgradable_packages(system_id)
+
+    @api_method("system.listSuggestedReboot")
+    def list_suggested_reboot(self):
+        return [
+            {"id": x["id"], "name": x["name"]} for x in self.fleet.systems
+            if x["id"] in self.fleet.reboot_required
+        ]
+
+    @api_method("system.listSystemEvents")
+    def list_system_events(self, system_id, action_type=None, earliest=None):
+        if action_type is not None and not isinstance(action_type, str):
+            # listSystemEvents(sid, earliestDate)
+            action_type, earliest = None, action_type
+        self._system(system_id)
+        events = self.fleet.events(system_id)
+        with self._lock:
+            actions = [
+                x for x in self._actions.values() if system_id in x["systems"]
+            ]
+        events += [self._event(x, system_id) for x in actions]
+        if action_type:
+            events = [x for x in events if x["action_type"] == action_type]
+        if earliest:
+            events = [x for x in events if x["created_date"] >= earliest]
+        return events
+
+    # custom values
+
+    @api_method("system.custominfo.listAllKeys")
+    def list_all_keys(self):
+        with self._lock:
+            return [
+                {"id": index + 1, "label": label, "description": description,
+                 "system_count": len(self.fleet.systems)}
+                for index, (label, description) in enumerate(self._custom_keys.items())
+            ]
+
+    @api_method("system.custominfo.createKey")
+    def create_key(self, label, description):
+        with self._lock:
+            if label in self._custom_keys:
+                raise Fault(-1, f"Key {label} already exists")
+            self._custom_keys[label] = description
+        return 1
+
+    @api_method("system.custominfo.updateKey")
+    def update_key(self, label, description):
+        with self._lock:
+            if label not in self._custom_keys:
+                raise Fault(-1, f"Key {label} does not exist")
+            self._custom_keys[label] = description
+        return 1
+
+    @api_method("system.custominfo.deleteKey")
+    def delete_key(self, label):
+        with self._lock:
+            if label not in self._custom_keys:
+                raise Fault(-1, f"Key {label} does not exist")
+            del self._custom_keys[label]
+        return 1
+
+    @api_method("system.getCustomValues")
+    def get_custom_values(self, system_id):
+        self._system(system_id)
+        values = {
+            "environment": ("production", "staging", "development")[system_id % 3],
+            "owner": f"team{system_id % 7}",
+        }
+        with self._lock:
+            values.update(self._custom_values.get(system_id, {}))
+            return {
+                x: value for x, value in values.items()
+                if x in self._custom_keys and value is not None
+            }
+
+    @api_method("system.setCustomValues")
+    def set_custom_values(self, system_id, values):
+        self._system(system_id)
+        with self._lock:
+            for label in values:
+                if label not in self._custom_keys:
+                    raise Fault(-1, f"Custom info key {label} was not defined")
+            self._custom_values.setdefault(system_id, {}).update(values)
+        return 1
+
+    @api_method("system.deleteCustomValues")
+    def delete_custom_values(self, system_id, labels):
+        self._system(system_id)
+        with self._lock:
+            for label in labels:
+                if label not in self._custom_keys:
+                    raise Fault(-1, f"Custom info key {label} was not defined")
+            values = self._custom_values.setdefault(system_id, {})
+            values.update({x: None for x in labels})
+        return 1
+
+    # groups, errata and packages
+
+    @api_method("systemgroup.listAllGroups")
+    def list_all_groups(self):
+        return self.fleet.groups
+
+    @api_method("systemgroup.listSystems")
+    def list_group_systems(self, name):
+        group = self.fleet.groups_by_name.get(name)
+        if not group:
+            raise Fault(
+                -1, f"Unable to locate or access server group: {name}"
+            )
+        return self.fleet.group_members[group["id"] - 1]
+
+    @api_method("errata.getDetails")
+    def get_erratum(self, advisory_name):
+        erratum = self.fleet.errata_by_name.get(advisory_name)
+        if not erratum:
+            raise Fault(-208, f"The patch {advisory_name} cannot be found.")
+        return {
+            "id": erratum["id"],
+            "issue_date": erratum["date"],
+            "update_date": erratum["update_date"],
+            "last_modified_date": erratum["update_date"],
+            "synopsis": erratum["advisory_synopsis"],
+            "release": 1,
+            "advisory_status": erratum["advisory_status"],
+            "type": erratum["advisory_type"],
+            "product": "SUSE Linux Enterprise Server 15 SP5",
+            "topic": erratum["advisory_synopsis"],
+            "description": erratum["advisory_synopsis"],
+            "solution": "Apply the update",
+            "reboot_suggested": False,
+            "restart_suggested": False,
+        }
+
+    @api_method("packages.findByNvrea")
+    def find_by_nvrea(self, name, version, release, epoch, arch):
+        package = self.fleet.packages_by_nvrea.get(
+            (name, version, release, epoch or "", arch)
+        )
+        return [package] if package else []
+
+    @api_method("packages.listProvidingErrata")
+    def list_providing_errata(self, package_id):
+        if not 0 < package_id <= 2 * len(self.fleet.packages):
+            raise Fault(-210, f"No such package: {package_id}")
+        return [
+            {
+                "advisory": x["advisory_name"],
+                "issue_date": x["date"],
+                "last_modified_date": x["update_date"],
+                "update_date": x["update_date"],
+                "synopsis": x["advisory_synopsis"],
+                "type": x["advisory_type"],
+            } for x in self.fleet.providing_errata(package_id)
+        ]
+
+    # scheduled actions
+
+    def _schedule(self, action_type, system_ids, name=None, earliest=None, details=None):
+        """
+        Records an action for systems and returns its ID
+        """
+        for system_id in system_ids:
+            self._system(system_id)
+        now = datetime.utcnow()
+        with self._lock:
+            action_id = self._next_action_id
+            self._next_action_id += 1
+            self._actions[action_id] = {
+                "id": action_id,
+                "name": name or action_type,
+                "type": action_type,
+                "scheduler": "admin",
+                "created": DateTime(now.timetuple()),
+                "earliest": earliest or DateTime(now.timetuple()),
+                "scheduled": time.monotonic(),
+                "systems": list(system_ids),
+                "details": details or [],
+            }
+        return action_id
+
+    def _status(self, action, system_id):
+        """
+        Returns the status of an action on a system
+        """
+        if time.monotonic() - action["scheduled"] < self.action_duration:
+            return "In Progress"
+        result = random.Random(f"{self.seed}:{action['id']}:{system_id}")
+        if result.random() < self.action_failure_rate:
+            return "Failed"
+        return "Completed"
+
+    def _event(self, action, system_id):
+        """
+        Returns a scheduled action as system event
+        """
+        status = self._status(action, system_id)
+        return {
+            "id": action["id"],
+            "action_type": action["type"],
+            "name": action["name"],
+            "created_date": action["created"],
+            "earliest_action": action["earliest"],
+            "successful_count": int(status == "Completed"),
+            "failed_count": int(status == "Failed"),
+            "result_msg": status,
+            "additional_info": [
+                {"detail": x, "result": ""} for x in action["details"]
+            ],
+        }
+
+    def _errata(self, errata_ids):
+        """
+        Returns errata by ID or raises the fault for unknown errata
+        """
+        errata = []
+        for erratum_id in errata_ids:
+            if not 0 < erratum_id <= len(self.fleet.errata):
+                raise Fault(-208, f"Invalid errata id: {erratum_id}")
+            errata.append(self.fleet.errata[erratum_id - 1])
+        return errata
+
+    def _schedule_errata(self, system_ids, errata_ids, earliest=None):
+        """
+        Schedules one patch update per erratum like Uyuni does
+        """
+        if not errata_ids:
+            raise Fault(-1, "No errata to apply")
+        return [
+            self._schedule(
+                "Patch Update", system_ids,
+                name=f"Patch Update: {x['advisory_synopsis']}",
+                earliest=earliest,
+                details=[f"{x['advisory_name']} {x['advisory_synopsis']}"]
+            ) for x in self._errata(errata_ids)
+        ]
+
+    @api_method("system.scheduleApplyErrata")
+    def schedule_apply_errata(self, system_ids, errata_ids, earliest=None, *args):
+        del args
+        return self._schedule_errata(_ids(system_ids), errata_ids, earliest)
+
+    @api_method("system.schedulePackageInstall")
+    def schedule_package_install(self, system_id, package_ids, earliest=None):
+        if not all(0 < x <= 2 * len(self.fleet.packages) for x in package_ids):
+            raise Fault(-1, f"Cannot find package: {package_ids}")
+        return self._schedule("Package Install", [system_id], earliest=earliest)
+
+    @api_method("system.schedulePackageUpdate")
+    def schedule_package_update(self, system_ids, earliest=None):
+        return self._schedule(
+            "Package Install", _ids(system_ids), name="Package Update",
+            earliest=earliest
+        )
+
+    @api_method("system.scheduleApplyStates")
+    def schedule_apply_states(self, system_id, states, earliest=None, test=False):
+        return self._schedule(
+            "Apply states", _ids(system_id),
+            name=f"Apply states {states}" + (" in test-mode" if test else ""),
+            earliest=earliest
+        )
+
+    @api_method("system.scheduleApplyHighstate")
+    def schedule_apply_highstate(self, system_id, earliest=None, test=False):
+        return self._schedule(
+            "Apply highstate", _ids(system_id),
+            name="Apply highstate" + (" in test-mode" if test else ""),
+            earliest=earliest
+        )
+
+    @api_method("system.scheduleReboot")
+    def schedule_reboot(self, system_id, earliest=None):
+        if system_id not in self.fleet.systems_by_id:
+            raise Fault(-1, f"Could not find server {system_id}")
+        return self._schedule("Reboot", [system_id], earliest=earliest)
+
+    @api_method("system.scheduleScriptRun")
+    def schedule_script_run(self, system_id, username, groupname, timeout, script, earliest=None):
+        del username, groupname, timeout, script
+        return self._schedule(
+            "Run an arbitrary script", _ids(system_id), earliest=earliest
+        )
+
+    @api_method("system.scap.scheduleXccdfScan")
+    def schedule_xccdf_scan(self, system_ids, path, arguments="", earliest=None):
+        del arguments
+        return self._schedule(
+            "OpenSCAP xccdf scanning", _ids(system_ids),
+            name=f"OpenSCAP xccdf scanning: {path}", earliest=earliest
+        )
+
+    def _list_actions(self, status=None):
+        """
+        Returns the actions with at least one system in a status or all
+        actions
+        """
+        with self._lock:
+            actions = list(self._actions.values())
+        result = []
+        for action in actions:
+            states = Counter(self._status(action, x) for x in action["systems"])
+            if not status or states[status]:
+                result.append({
+                    "id": action["id"],
+                    "name": action["name"],
+                    "type": action["type"],
+                    "scheduler": action["scheduler"],
+                    "earliest": action["earliest"],
+                    "prerequisite": 0,
+                    "completedSystems": states["Completed"],
+                    "failedSystems": states["Failed"],
+                    "inProgressSystems": states["In Progress"],
+                })
+        return result
+
+    def _list_systems(self, action_id, status):
+        """
+        Returns the systems of an action in a status
+        """
+        with self._lock:
+            action = self._actions.get(action_id)
+        if not action:
+            raise Fault(-1, f"No such action: {action_id}")
+        return [
+            {
+                "server_id": x,
+                "server_name": self.fleet.systems_by_id[x]["name"],
+                "base_channel": "sle-product-sles15-sp5-pool-x86_64",
+                "timestamp": action["created"],
+                "message": f"Action {status.lower()}",
+            } for x in action["systems"] if self._status(action, x) == status
+        ]
+
+    @api_method("schedule.listAllActions")
+    def list_all_actions(self):
+        return self._list_actions()
+
+    @api_method("schedule.listCompletedActions")
+    def list_completed_actions(self):
+        return self._list_actions("Completed")
+
+    @api_method("schedule.listFailedActions")
+    def list_failed_actions(self):
+        return self._list_actions("Failed")
+
+    @api_method("schedule.listInProgressActions")
+    def list_in_progress_actions(self):
+        return self._list_actions("In Progress")
+
+    @api_method("schedule.listCompletedSystems")
+    def list_completed_systems(self, action_id):
+        return self._list_systems(action_id, "Completed")
+
+    @api_method("schedule.listFailedSystems")
+    def list_failed_systems(self, action_id):
+        return self._list_systems(action_id, "Failed")
+
+    @api_method("schedule.listInProgressSystems")
+    def list_in_progress_systems(self, action_id):
+        return self._list_systems(action_id, "In Progress")
+
+    # action chains
+
+    def _chain(self, label):
+        """
+        Returns an action chain or raises the fault for unknown chains
+        """
+        chain = self._chains.get(label)
+        if not chain:
+            raise Fault(-1, f"No such action chain: {label}")
+        return chain
+
+    def _add_to_chain(self, label, action_type, system_ids, **kwargs):
+        """
+        Adds an action to a chain and returns its ID
+        """
+        for system_id in system_ids:
+            self._system(system_id)
+        with self._lock:
+            chain = self._chain(label)
+            action_id = len(chain["actions"]) + 1
+            chain["actions"].append(dict(
+                id=action_id, label=action_type, type=action_type,
+                systems=system_ids, created=DateTime(datetime.utcnow().timetuple()),
+                **kwargs
+            ))
+        return action_id
+
+    @api_method("actionchain.listChains")
+    def list_chains(self):
+        with self._lock:
+            return [
+                {"id": x["id"], "label": x["label"], "entrycount": len(x["actions"])}
+                for x in self._chains.values()
+            ]
+
+    @api_method("actionchain.listChainActions")
+    def list_chain_actions(self, label):
+        with self._lock:
+            return [
+                {
+                    "id": x["id"],
+                    "label": x["label"],
+                    "created": x["created"],
+                    "earliest": x["created"],
+                    "type": x["type"],
+                    "modified": x["created"],
+                    "cuid": "",
+                } for x in self._chain(label)["actions"]
+            ]
+
+    @api_method("actionchain.createChain")
+    def create_chain(self, label):
+        if not label:
+            raise Fault(-1, "Label is missing")
+        with self._lock:
+            if label not in self._chains:
+                self._chains[label] = {
+                    "id": len(self._chains) + 1, "label": label, "actions": []
+                }
+            return self._chains[label]["id"]
+
+    @api_method("actionchain.deleteChain")
+    def delete_chain(self, label):
+        with self._lock:
+            self._chain(label)
+            del self._chains[label]
+        return 1
+
+    @api_method("actionchain.scheduleChain")
+    def schedule_chain(self, label, earliest=None):
+        with self._lock:
+            chain = self._chain(label)
+            del self._chains[label]
+        for action in chain["actions"]:
+            if action.get("errata"):
+                self._schedule_errata(action["systems"], action["errata"], earliest)
+            else:
+                self._schedule(action["type"], action["systems"], earliest=earliest)
+        return 1
+
+    @api_method("actionchain.addErrataUpdate")
+    def add_errata_update(self, system_ids, errata_ids, label, *args):
+        del args
+        self._errata(errata_ids)
+        return self._add_to_chain(
+            label, "Patch Update", _ids(system_ids), errata=list(errata_ids)
+        )
+
+    @api_method("actionchain.addPackageUpgrade")
+    def add_package_upgrade(self, system_id, package_ids, label):
+        if not all(0 < x <= 2 * len(self.fleet.packages) for x in package_ids):
+            raise Fault(-1, f"Invalid package: {package_ids}")
+        return self._add_to_chain(label, "Package Install", _ids(system_id))
+
+    @api_method("actionchain.addScriptRun")
+    def add_script_run(self, system_id, label, username, groupname, timeout, script):
+        del username, groupname, timeout, script
+        return self._add_to_chain(
+            label, "Run an arbitrary script", _ids(system_id)
+        )
+
+    @api_method("actionchain.addSystemReboot")
+    def add_system_reboot(self, system_id, label):
+        return self._add_to_chain(label, "Reboot", _ids(system_id))
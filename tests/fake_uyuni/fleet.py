@@ -0,0 +1,263 @@
+"""
+Synthetic fleet of systems, errata and packages served by the fake Uyuni
+
+Everything is derived from a seed, so two fleets created with the same
+arguments are identical. Systems, groups and the errata and package
+catalogs are created upfront, while the patches, upgrades and event
+history of a system are generated on request from a per-system seed to
+keep fleets of 50k systems small.
+"""
+
+import random
+from datetime import datetime, timedelta
+from xmlrpc.client import DateTime
+
+ACTION_TYPES = (
+    "Patch Update",
+    "Package Install",
+    "Apply states",
+    "Reboot",
+    "Run an arbitrary script",
+)
+"""
+tuple: Action types used for generated event histories
+"""
+ERRATA_TYPES = (
+    "Security Advisory",
+    "Bug Fix Advisory",
+    "Product Enhancement Advisory",
+)
+"""
+tuple: Errata types
+"""
+FIRST_SYSTEM_ID = 1000010000
+"""
+int: ID of the first system, as assigned by Uyuni
+"""
+
+
+def _date(value):
+    """
+    Returns an XMLRPC date for a datetime
+    """
+    return DateTime(value.timetuple())
+
+
+class Fleet:
+    """
+    Synthetic systems with errata, package upgrades and event histories
+    """
+
+    def __init__(
+            self, systems=10000, groups=20, errata=2000, packages=3000,
+            max_errata=30, max_upgrades=40, max_events=20, reboot_ratio=0.1,
+            seed=0, domain="fleet.loc", now=None
+    ):
+        """
+        Constructor generating the fleet
+
+        :param systems: number of systems
+        :type systems: int
+        :param groups: number of system groups, every system is a member
+            of one or two groups
+        :type groups: int
+        :param errata: number of errata in the catalog
+        :type errata: int
+        :param packages: number of packages in the catalog, two thirds of
+            their upgrades are provided by an erratum
+        :type packages: int
+        :param max_errata: maximum number of relevant errata per system
+        :type max_errata: int
+        :param max_upgrades: maximum number of upgradable packages per system
+        :type max_upgrades: int
+        :param max_events: maximum number of past events per system
+        :type max_events: int
+        :param reboot_ratio: share of systems requiring a reboot
+        :type reboot_ratio: float
+        :param seed: seed for all generated data
+        :type seed: int
+        :param domain: domain of the system hostnames
+        :type domain: str
+        :param now: reference time of the generated dates
+        :type now: datetime
+        """
+        self.seed = seed
+        self.now = now or datetime.utcnow().replace(microsecond=0)
+        self.max_errata = max_errata
+        self.max_upgrades = max_upgrades
+        self.max_events = max_events
+        rng = random.Random(seed)
+
+        self.groups = [
+            {
+                "id": index + 1,
+                "name": f"group-{index:03d}",
+                "description": f"Synthetic group {index}",
+                "org_id": 1,
+                "system_count": 0,
+            } for index in range(groups)
+        ]
+        self.errata = [self._erratum(index, rng) for index in range(errata)]
+        self.errata_by_name = {x["advisory_name"]: x for x in self.errata}
+        self.packages = [self._package(index) for index in range(packages)]
+        self.packages_by_nvrea = {
+            (x["name"], x["version"], x["release"], x["epoch"], x["arch_label"]): x
+            for package in self.packages for x in package
+        }
+
+        self.systems = []
+        self.system_groups = {}
+        self.group_members = [[] for _ in range(groups)]
+        self.reboot_required = set()
+        for index in range(systems):
+            system = {
+                "id": FIRST_SYSTEM_ID + index,
+                "name": f"host{index:05d}.{domain}",
+                "last_checkin": _date(
+                    self.now - timedelta(minutes=rng.randint(0, 600))
+                ),
+                "last_boot": float(rng.randint(0, 90 * 86400)),
+                "created": _date(
+                    self.now - timedelta(days=rng.randint(30, 1000))
+                ),
+            }
+            self.systems.append(system)
+            memberships = {index % groups, rng.randrange(groups)} if groups else set()
+            self.system_groups[system["id"]] = sorted(memberships)
+            for group in memberships:
+                self.groups[group]["system_count"] += 1
+                self.group_members[group].append(system)
+            if rng.random() < reboot_ratio:
+                self.reboot_required.add(system["id"])
+        self.systems_by_id = {x["id"]: x for x in self.systems}
+        self.systems_by_name = {x["name"]: x for x in self.systems}
+        self.groups_by_name = {x["name"]: x for x in self.groups}
+
+    def _erratum(self, index, rng):
+        """
+        Returns an erratum of the catalog
+        """
+        issued = self.now - timedelta(days=rng.randint(1, 700))
+        updated = issued + timedelta(days=rng.randint(0, 30))
+        return {
+            "id": index + 1,
+            "advisory_name": f"SUSE-{issued.year}-{index:05d}",
+            "advisory_type": ERRATA_TYPES[index % len(ERRATA_TYPES)],
+            "advisory_synopsis": f"Recommended update for package {index}",
+            "advisory_status": "final",
+            "date": _date(issued),
+            "update_date": _date(updated),
+        }
+
+    @staticmethod
+    def _package(index):
+        """
+        Returns the installed and the upgraded version of a package. Their
+        IDs are 2 * index + 1 and 2 * index + 2.
+        """
+        return [
+            {
+                "id": 2 * index + offset,
+                "name": f"package{index:05d}",
+                "version": f"1.{offset}",
+                "release": "1.1",
+                "epoch": "",
+                "arch_label": "x86_64",
+            } for offset in (1, 2)
+        ]
+
+    def providing_errata(self, package_id):
+        """
+        Returns the errata providing a package - upgrades of packages whose
+        index is a multiple of three are not part of any erratum
+
+        :param package_id: package ID
+        :type package_id: int
+        """
+        index, upgrade = divmod(package_id - 1, 2)
+        if not upgrade or index % 3 == 0 or not self.errata:
+            return []
+        return [self.errata[index % len(self.errata)]]
+
+    def _rng(self, system_id, purpose):
+        """
+        Returns the random generator for data of a particular system
+        """
+        return random.Random(f"{self.seed}:{system_id}:{purpose}")
+
+    def relevant_errata(self, system_id):
+        """
+        Returns the errata relevant for a system
+
+        :param system_id: system ID
+        :type system_id: int
+        """
+        rng = self._rng(system_id, "errata")
+        count = min(rng.randint(0, self.max_errata), len(self.errata))
+        return [self.errata[x] for x in sorted(rng.sample(range(len(self.errata)), count))]
+
+    def upgradable_packages(self, system_id):
+        """
+        Returns the latest upgradable packages of a system
+
+        :param system_id: system ID
+        :type system_id: int
+        """
+        rng = self._rng(system_id, "upgrades")
+        count = min(rng.randint(0, self.max_upgrades), len(self.packages))
+        upgrades = []
+        for index in sorted(rng.sample(range(len(self.packages)), count)):
+            installed, upgrade = self.packages[index]
+            upgrades.append({
+                "name": installed["name"],
+                "arch": installed["arch_label"],
+                "from_version": installed["version"],
+                "from_release": installed["release"],
+                "from_epoch": installed["epoch"],
+                "from_package_id": installed["id"],
+                "to_version": upgrade["version"],
+                "to_release": upgrade["release"],
+                "to_epoch": upgrade["epoch"],
+                "to_package_id": upgrade["id"],
+            })
+        return upgrades
+
+    def events(self, system_id):
+        """
+        Returns the past events of a system, newest last. Patch updates
+        name the installed erratum in their details like Uyuni does.
+
+        :param system_id: system ID
+        :type system_id: int
+        """
+        rng = self._rng(system_id, "events")
+        count = rng.randint(0, self.max_events)
+        created = self.now - timedelta(days=count + 1)
+        events = []
+        for index in range(count):
+            created += timedelta(hours=rng.randint(1, 24))
+            action_type = ACTION_TYPES[rng.randrange(len(ACTION_TYPES))]
+            failed = rng.random() < 0.05
+            event = {
+                # IDs below those of scheduled actions
+                "id": (system_id - FIRST_SYSTEM_ID) * 1000 + index + 1,
+                "action_type": action_type,
+                "name": action_type,
+                "created_date": _date(created),
+                "pickup_date": _date(created + timedelta(minutes=1)),
+                "completed_date": _date(created + timedelta(minutes=5)),
+                "earliest_action": _date(created),
+                "successful_count": int(not failed),
+                "failed_count": int(failed),
+                "result_msg": "Failed" if failed else "Completed",
+                "additional_info": [],
+            }
+            if action_type == "Patch Update" and self.errata:
+                erratum = self.errata[rng.randrange(len(self.errata))]
+                event["name"] = f"Patch Update: {erratum['advisory_synopsis']}"
+                event["additional_info"] = [{
+                    "detail": f"{erratum['advisory_name']} {erratum['advisory_synopsis']}",
+                    "result": "",
+                }]
+            events.append(event)
+        return events
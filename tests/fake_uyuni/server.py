@@ -0,0 +1,213 @@
+"""
+Threaded XMLRPC server serving a FakeUyuniAPI over HTTP/1.1 keep-alive
+connections, optionally using TLS like a real Uyuni server
+"""
+
+import os
+import random
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from socketserver import ThreadingMixIn
+from xmlrpc.server import SimpleXMLRPCRequestHandler, SimpleXMLRPCServer
+
+from .api import FakeUyuniAPI
+
+
+class FakeUyuniRequestHandler(SimpleXMLRPCRequestHandler):
+    """
+    Request handler keeping connections alive and delaying responses
+    """
+    protocol_version = "HTTP/1.1"
+    rpc_paths = ("/rpc/api",)
+
+    def setup(self):
+        super().setup()
+        self.requests_served = 0
+
+    def do_POST(self):
+        server = self.server
+        server.api.count("requests")
+        if server.latency:
+            time.sleep(server.latency)
+        self.requests_served += 1
+        if server.error_rate:
+            with server.lock:
+                failing = server.rng.random() < server.error_rate
+            if failing:
+                server.api.count("http_errors")
+                # like an overloaded proxy in front of Tomcat
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                self.send_error(server.error_status)
+                return
+        super().do_POST()
+
+    def end_headers(self):
+        # mimic Tomcat's maxKeepAliveRequests, announcing the last response
+        limit = self.server.max_keepalive_requests
+        if limit and self.requests_served >= limit:
+            self.send_header("Connection", "close")
+        super().end_headers()
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+class FakeUyuniServer(ThreadingMixIn, SimpleXMLRPCServer):
+    """
+    XMLRPC server answering API calls with a FakeUyuniAPI, including
+    system.multicall. Use start() to serve in a background thread and
+    url to connect, e.g.:
+
+        with FakeUyuniServer(FakeUyuniAPI(Fleet(systems=20000))) as server:
+            server.start()
+            client = UyuniAPIClient(
+                logging.ERROR, "127.0.0.1", "admin", "admin",
+                port=server.port, verify=False
+            )
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+    def __init__(
+            self, api=None, host="127.0.0.1", port=0, latency=0.0,
+            tls=True, certfile=None, keyfile=None, max_keepalive_requests=0,
+            error_rate=0.0, error_status=503, multicall=True
+    ):
+        """
+        Constructor creating the server
+
+        :param api: API to serve (default: fleet of 10k systems)
+        :type api: FakeUyuniAPI
+        :param host: address to listen on
+        :type host: str
+        :param port: port to listen on (default: any free port)
+        :type port: int
+        :param latency: seconds to delay every HTTP request
+        :type latency: float
+        :param tls: whether to use TLS like a real server, which
+            UyuniAPIClient requires
+        :type tls: bool
+        :param certfile: certificate (default: self-signed)
+        :type certfile: str
+        :param keyfile: private key of the certificate
+        :type keyfile: str
+        :param max_keepalive_requests: requests after which a connection
+            is closed (default: unlimited)
+        :type max_keepalive_requests: int
+        :param error_rate: share of HTTP requests answered with an error
+            status instead of calling the API
+        :type error_rate: float
+        :param error_status: HTTP status of these errors
+        :type error_status: int
+        :param multicall: whether to support system.multicall, servers
+            without it report it as an unknown method
+        :type multicall: bool
+        """
+        self.api = api if api is not None else FakeUyuniAPI()
+        self.latency = latency
+        self.max_keepalive_requests = max_keepalive_requests
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rng = random.Random(self.api.seed)
+        self.stats = self.api.stats
+        # guards the random generator of injected HTTP errors
+        self.lock = threading.Lock()
+        self._thread = None
+        super().__init__(
+            (host, port), requestHandler=FakeUyuniRequestHandler,
+            logRequests=False, allow_none=True
+        )
+        self.multicall = multicall
+        if multicall:
+            self.register_multicall_functions()
+        self.register_instance(self.api)
+        self.tls = tls
+        if tls:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            if certfile:
+                context.load_cert_chain(certfile, keyfile)
+            else:
+                with tempfile.TemporaryDirectory() as directory:
+                    context.load_cert_chain(*self_signed_certificate(directory))
+            # handshakes happen in the request threads, not when accepting
+            self.socket = context.wrap_socket(
+                self.socket, server_side=True, do_handshake_on_connect=False
+            )
+
+    def _dispatch(self, method, params):
+        if method == "system.multicall" and self.multicall:
+            self.api.count(method)
+            return super()._dispatch(method, params)
+        return self.api.dispatch(method, params)
+
+    def get_request(self):
+        request = super().get_request()
+        self.api.count("connections")
+        return request
+
+    def handle_error(self, request, client_address):
+        # clients closing connections or failing handshakes are expected
+        pass
+
+    @property
+    def port(self):
+        """
+        Returns the port the server listens on
+        """
+        return self.server_address[1]
+
+    @property
+    def url(self):
+        """
+        Returns the API URL
+        """
+        scheme = "https" if self.tls else "http"
+        return f"{scheme}://{self.server_address[0]}:{self.port}/rpc/api"
+
+    def start(self):
+        """
+        Serves requests in a background thread
+        """
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops serving requests and closes the socket
+        """
+        if self._thread:
+            self.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.server_close()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+def self_signed_certificate(directory, hostname="localhost"):
+    """
+    Creates a self-signed certificate using the openssl command and
+    returns the paths of the certificate and its key
+
+    :param directory: directory to create the files in
+    :type directory: str
+    :param hostname: certificate common name
+    :type hostname: str
+    """
+    certfile = os.path.join(directory, "cert.pem")
+    keyfile = os.path.join(directory, "key.pem")
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+            "-days", "1", "-subj", f"/CN={hostname}",
+            "-keyout", keyfile, "-out", certfile,
+        ],
+        check=True, capture_output=True
+    )
+    return certfile, keyfile
@@ -0,0 +1,107 @@
+"""
+Unit tests of the action_completed event source
+"""
+
+from __future__ import (absolute_import, division, print_function)
+import asyncio
+
+from ansible_collections.stdevel.uyuni.extensions.eda.plugins.event_source.action_completed import (
+    ActionTracker,
+    _watch
+)
+
+__metaclass__ = type
+
+
+def _actions(completed=(), failed=(), in_progress=()):
+    """
+    Returns actions by state like get_actions_by_state
+    """
+    return {
+        "completed": [{"id": x, "type": "Patch Update"} for x in completed],
+        "failed": [{"id": x, "type": "Reboot"} for x in failed],
+        "in_progress": [{"id": x} for x in in_progress],
+    }
+
+
+def _update(tracker, actions):
+    finished = [x["id"] for x in tracker.update(actions)]
+    tracker.confirm()
+    return finished
+
+
+def test_first_update_only_waits_for_actions_in_progress():
+    tracker = ActionTracker()
+    assert _update(tracker, _actions(completed=[1, 2], in_progress=[3])) == []
+    assert _update(tracker, _actions(completed=[1, 2, 3])) == [3]
+
+
+def test_new_actions_are_reported_once_finished():
+    tracker = ActionTracker(since_id=0)
+    assert _update(tracker, _actions(completed=[1], in_progress=[2])) == [1]
+    assert _update(tracker, _actions(completed=[1], in_progress=[2])) == []
+    assert _update(tracker, _actions(completed=[1], failed=[2, 3])) == [2, 3]
+    assert _update(tracker, _actions(completed=[1], failed=[2, 3])) == []
+
+
+def test_actions_of_systems_in_different_states_wait_for_all():
+    tracker = ActionTracker(since_id=0)
+    assert _update(tracker, _actions(completed=[1], in_progress=[1])) == []
+    assert _update(tracker, _actions(completed=[1])) == [1]
+
+
+def test_deleted_actions_are_forgotten():
+    tracker = ActionTracker(since_id=0)
+    _update(tracker, _actions(in_progress=[1]))
+    _update(tracker, _actions())
+    assert tracker.pending == set()
+    assert tracker.high_water_mark == 1
+
+
+def test_unconfirmed_actions_are_returned_again():
+    tracker = ActionTracker(since_id=0)
+    actions = _actions(completed=[1, 2])
+    assert [x["id"] for x in tracker.update(actions)] == [1, 2]
+    assert [x["id"] for x in tracker.update(actions)] == [1, 2]
+    tracker.confirm()
+    assert tracker.update(actions) == []
+
+
+class Client:
+    """
+    API client failing to return the systems of the actions once
+    """
+
+    def __init__(self, states):
+        self.states = list(states)
+        self.failures = 1
+
+    async def get_actions_by_state(self):
+        if len(self.states) > 1:
+            return self.states.pop(0)
+        return self.states[0]
+
+    async def get_actions_systems(self, action_ids):
+        if action_ids and self.failures:
+            self.failures -= 1
+            raise ConnectionResetError("connection reset")
+        return {
+            x: {"completed": [{"server_id": 1}], "failed": []} for x in action_ids
+        }
+
+
+def test_watch_reports_actions_after_failed_check():
+    client = Client([
+        _actions(in_progress=[1]),
+        _actions(completed=[1, 2]),
+    ])
+
+    async def watch():
+        events = asyncio.Queue()
+        watcher = asyncio.create_task(_watch(client, events, {"delay": 0}))
+        received = [(await events.get())["action_id"] for _ in range(2)]
+        watcher.cancel()
+        return received
+
+    assert asyncio.run(asyncio.wait_for(watch(), 5)) == [1, 2]
+    assert client.failures == 0
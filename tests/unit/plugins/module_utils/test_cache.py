@@ -0,0 +1,100 @@
+"""
+Unit tests of the caches for Uyuni API data
+"""
+
+from __future__ import (absolute_import, division, print_function)
+from xmlrpc.client import DateTime
+
+from ansible_collections.stdevel.uyuni.plugins.module_utils.cache import (
+    ErrataCache,
+    JSONFileStore,
+    TTLCache
+)
+
+__metaclass__ = type
+
+
+class Clock:
+    """
+    Clock advanced by the tests
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    clock = Clock()
+    cache = TTLCache(ttl=60, clock=clock)
+    cache.set("key", "value")
+    clock.now += 59
+    assert cache.get("key") == "value"
+    clock.now += 1
+    assert cache.get("key") is None
+    assert not cache
+
+
+def test_entries_expire_at_given_time():
+    clock = Clock()
+    cache = TTLCache(ttl=60, clock=clock)
+    cache.set("key", "value", expires=clock.now + 10)
+    clock.now += 10
+    assert cache.get("key", "default") == "default"
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = TTLCache(maxsize=2, clock=Clock())
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_dump_and_load_keep_unexpired_entries():
+    clock = Clock()
+    cache = TTLCache(ttl=60, clock=clock)
+    cache.set("old", 1, expires=clock.now + 10)
+    cache.set("new", 2)
+    dumped = cache.dump()
+    clock.now += 30
+
+    loaded = TTLCache(ttl=60, clock=clock)
+    loaded.load(dumped)
+    assert loaded.get("old") is None
+    assert loaded.get("new") == 2
+    clock.now += 30
+    assert loaded.get("new") is None
+
+
+def test_errata_cache_keeps_dates(tmp_path):
+    details = {
+        "id": 1, "synopsis": "fix",
+        "issue_date": DateTime("20240101T00:00:00"),
+    }
+    path = str(tmp_path / "errata.json.gz")
+    cache = ErrataCache(JSONFileStore(path, compress=True))
+    cache.add("SUSE-2024-1", details)
+    cache.save()
+
+    loaded = ErrataCache(JSONFileStore(path, compress=True))
+    assert loaded.get("SUSE-2024-1") == details
+    assert isinstance(loaded.get(1)["issue_date"], DateTime)
+
+
+def test_errata_cache_drops_updated_errata(tmp_path):
+    path = str(tmp_path / "errata.json")
+    cache = ErrataCache(JSONFileStore(path))
+    cache.add("SUSE-2024-1", {"id": 1})
+    cache.validate({"SUSE-2024-1": DateTime("20240101T00:00:00")})
+    cache.validate({"SUSE-2024-1": DateTime("20240101T00:00:00")})
+    assert cache.get("SUSE-2024-1") == {"id": 1}
+    cache.validate({"SUSE-2024-1": DateTime("20240201T00:00:00")})
+    assert cache.get("SUSE-2024-1") is None
+    cache.save()
+    assert ErrataCache(JSONFileStore(path)).get(1) is None
@@ -0,0 +1,111 @@
+"""
+Unit tests of the batching of API calls
+"""
+
+from __future__ import (absolute_import, division, print_function)
+import logging
+from xmlrpc.client import Fault
+
+import pytest
+
+from ansible_collections.stdevel.uyuni.plugins.module_utils.exceptions import (
+    EmptySetException,
+    SessionException
+)
+from ansible_collections.stdevel.uyuni.plugins.module_utils.multicall import (
+    MultiCallBatch,
+    fault_to_exception
+)
+
+__metaclass__ = type
+
+
+@pytest.mark.parametrize("fault,expected", [
+    (Fault(-208, "The patch SUSE-2024-1 cannot be found."), EmptySetException),
+    (Fault(-210, "No such system - sid = 1"), EmptySetException),
+    (Fault(-213, "Could not find user admin"), EmptySetException),
+    (Fault(-1, "Unable to locate or access server group: web"), EmptySetException),
+    (Fault(-1, "No such action: 1"), EmptySetException),
+    (Fault(-1, "Could not find method: system.getNetwork"), SessionException),
+    (Fault(-1, "Internal server error"), SessionException),
+    (Fault(2950, "Could not find session"), SessionException),
+])
+def test_fault_to_exception(fault, expected):
+    err = fault_to_exception(fault, "system.getNetwork(1,)")
+    assert type(err) is expected  # pylint: disable=unidiomatic-typecheck
+
+
+class Namespace:
+    """
+    Resolves dotted API method names like a ServerProxy
+    """
+
+    def __init__(self, server, name=""):
+        self._server = server
+        self._name = name
+
+    def __getattr__(self, name):
+        return Namespace(self._server, f"{self._name}.{name}".lstrip("."))
+
+    def __call__(self, *args):
+        return self._server.call(self._name, args)
+
+
+class Server:
+    """
+    API answering getId with the system ID and a fault for negative IDs,
+    optionally without multicall support
+    """
+
+    def __init__(self, multicall=True):
+        self.multicall = multicall
+        self.requests = []
+
+    def call(self, method, args):
+        self.requests.append(method)
+        if method == "system.multicall":
+            if not self.multicall:
+                raise Fault(-1, f"Could not find method: {method}")
+            return [self._answer(x["params"]) for x in args[0]]
+        response = self._answer(args)
+        if isinstance(response, dict):
+            raise Fault(response["faultCode"], response["faultString"])
+        return response[0]
+
+    @staticmethod
+    def _answer(args):
+        if args[1] < 0:
+            return {"faultCode": -210, "faultString": f"No such system - sid = {args[1]}"}
+        return [args[1]]
+
+
+class Client:
+    """
+    API client attributes used by batches
+    """
+
+    LOGGER = logging.getLogger("test")
+
+    def __init__(self, server):
+        self._session = Namespace(server)
+        self._api_key = "key"
+        self.multicall_supported = True
+
+
+@pytest.mark.parametrize("multicall", [True, False])
+def test_batch_results_match_single_calls(multicall):
+    server = Server(multicall)
+    client = Client(server)
+    with MultiCallBatch(client, batch_size=2) as batch:
+        results = [batch.system.getId(x) for x in (1, -2, 3)]
+
+    assert results[0].get() == 1
+    with pytest.raises(EmptySetException):
+        results[1].get()
+    assert results[2].get() == 3
+    if multicall:
+        assert server.requests == ["system.multicall"] * 2
+    else:
+        # multicall support is only probed once
+        assert server.requests == ["system.multicall"] + ["system.getId"] * 3
+        assert not client.multicall_supported
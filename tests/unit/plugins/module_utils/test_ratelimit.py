@@ -0,0 +1,126 @@
+"""
+Unit tests of the rate limiters shared between processes
+"""
+
+from __future__ import (absolute_import, division, print_function)
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from ansible_collections.stdevel.uyuni.plugins.module_utils.ratelimit import (
+    SharedRateLimiter
+)
+
+__metaclass__ = type
+
+
+class Clock:
+    """
+    Clock advanced by sleeping
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def _limiter(directory, clock, **kwargs):
+    return SharedRateLimiter(
+        str(directory), clock=clock, sleep=clock.sleep, **kwargs
+    )
+
+
+def test_burst_passes_without_waiting(tmp_path):
+    clock = Clock()
+    limiter = _limiter(tmp_path, clock, rate=5)
+    for _ in range(5):
+        limiter.acquire()
+        limiter.release()
+    assert not clock.slept
+
+
+def test_requests_beyond_burst_wait_for_tokens(tmp_path):
+    clock = Clock()
+    limiter = _limiter(tmp_path, clock, rate=5, burst=1)
+    limiter.acquire()
+    limiter.acquire()
+    assert clock.slept == [pytest.approx(0.2)]
+
+
+def test_bucket_is_shared(tmp_path):
+    clock = Clock()
+    first, second = (_limiter(tmp_path, clock, rate=2) for _ in range(2))
+    first.acquire()
+    first.acquire()
+    second.acquire()
+    assert clock.slept == [pytest.approx(0.5)]
+
+
+def test_tokens_refill_while_idle(tmp_path):
+    clock = Clock()
+    limiter = _limiter(tmp_path, clock, rate=2)
+    limiter.acquire()
+    limiter.acquire()
+    clock.now += 1
+    limiter.acquire()
+    limiter.acquire()
+    assert not clock.slept
+
+
+def test_slots_limit_requests_in_flight(tmp_path):
+    clock = Clock()
+    limiter = _limiter(tmp_path, clock, max_in_flight=2)
+    limiter.acquire()
+    limiter.acquire()
+    other = _limiter(tmp_path, Clock(), max_in_flight=2)
+    waits = []
+
+    def release_on_sleep(seconds):
+        # waiting frees a slot held by the first limiter
+        waits.append(seconds)
+        limiter.release()
+
+    other._sleep = release_on_sleep
+    other.acquire()
+    assert len(waits) == 1
+    other.release()
+    limiter.release()
+
+
+def _hold_slot(directory, held):
+    limiter = SharedRateLimiter(directory, max_in_flight=1)
+    limiter.acquire()
+    held.set()
+    time.sleep(0.5)
+    limiter.release()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork")
+def test_slots_are_shared_between_processes(tmp_path):
+    context = multiprocessing.get_context("fork")
+    held = context.Event()
+    process = context.Process(target=_hold_slot, args=(str(tmp_path), held))
+    process.start()
+    try:
+        assert held.wait(10)
+        limiter = SharedRateLimiter(str(tmp_path), max_in_flight=1)
+        start = time.monotonic()
+        limiter.acquire()
+        limiter.release()
+        assert time.monotonic() - start > 0.2
+    finally:
+        process.join()
+
+
+def test_negative_limits_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        SharedRateLimiter(str(tmp_path), rate=-1)
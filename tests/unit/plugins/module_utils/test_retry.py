@@ -0,0 +1,218 @@
+"""
+Unit tests of the retry policy and circuit breakers
+"""
+
+from __future__ import (absolute_import, division, print_function)
+from xmlrpc.client import Fault, ProtocolError
+
+import pytest
+
+from ansible_collections.stdevel.uyuni.plugins.module_utils.exceptions import (
+    CircuitOpenException
+)
+from ansible_collections.stdevel.uyuni.plugins.module_utils.retry import (
+    CircuitBreaker,
+    RetryBudget,
+    RetryPolicy,
+    SharedCircuitBreaker,
+    is_idempotent,
+    is_transient
+)
+
+__metaclass__ = type
+
+
+class Clock:
+    """
+    Clock advanced by the tests
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _open(breaker):
+    """
+    Records transient failures until the circuit opens
+    """
+    for _ in range(breaker.failure_threshold):
+        breaker.allow("system.listSystems")
+        breaker.record(False)
+
+
+@pytest.fixture(params=["memory", "shared"])
+def breaker(request, tmp_path):
+    clock = Clock()
+    if request.param == "shared":
+        created = SharedCircuitBreaker(
+            str(tmp_path), failure_threshold=3, reset_timeout=30, clock=clock
+        )
+    else:
+        created = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=clock)
+    created.clock = clock
+    return created
+
+
+def test_breaker_opens_after_failures_in_a_row(breaker):
+    breaker.record(False)
+    breaker.record(False)
+    breaker.record(True)
+    breaker.record(False)
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenException):
+        breaker.allow("system.listSystems")
+
+
+def test_breaker_lets_one_call_probe_after_timeout(breaker):
+    _open(breaker)
+    breaker.clock.now += 30
+    breaker.allow("system.listSystems")
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # other calls wait while the probe is running
+    with pytest.raises(CircuitOpenException):
+        breaker.allow("system.listSystems")
+
+
+def test_breaker_closes_after_successful_probe(breaker):
+    _open(breaker)
+    breaker.clock.now += 30
+    breaker.allow("system.listSystems")
+    breaker.record(True)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.allow("system.listSystems")
+
+
+def test_breaker_reopens_after_failed_probe(breaker):
+    _open(breaker)
+    breaker.clock.now += 30
+    breaker.allow("system.listSystems")
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.OPEN
+    breaker.clock.now += 29
+    with pytest.raises(CircuitOpenException):
+        breaker.allow("system.listSystems")
+
+
+def test_shared_breaker_state_is_shared(tmp_path):
+    clock = Clock()
+    first, second = (
+        SharedCircuitBreaker(str(tmp_path), failure_threshold=2, clock=clock)
+        for _ in range(2)
+    )
+    first.record(False)
+    second.record(False)
+    assert first.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenException):
+        second.allow("system.listSystems")
+
+
+def test_breaker_rejects_invalid_threshold():
+    with pytest.raises(ValueError):
+        CircuitBreaker(failure_threshold=0)
+
+
+@pytest.mark.parametrize("method,args,expected", [
+    ("system.listSystems", (), True),
+    ("system.getNetwork", (1,), True),
+    ("system.scheduleReboot", (1,), False),
+    ("system.multicall", ([
+        {"methodName": "system.getNetwork"}, {"methodName": "system.getId"}
+    ],), True),
+    ("system.multicall", ([
+        {"methodName": "system.getNetwork"}, {"methodName": "system.scheduleReboot"}
+    ],), False),
+    ("system.multicall", (), False),
+])
+def test_is_idempotent(method, args, expected):
+    assert is_idempotent(method, args) is expected
+
+
+@pytest.mark.parametrize("err,expected", [
+    (ProtocolError("url", 503, "Service Unavailable", {}), True),
+    (ProtocolError("url", 500, "Internal Server Error", {}), False),
+    (ConnectionResetError(), True),
+    (TimeoutError(), True),
+    (Fault(-1, "Internal server error"), False),
+])
+def test_is_transient(err, expected):
+    assert is_transient(err) is expected
+
+
+def test_budget_limits_retries():
+    budget = RetryBudget(ratio=0.5, reserve=2)
+    assert budget.withdraw()
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw()
+
+
+def _policy(calls, **kwargs):
+    """
+    Returns a policy without delays and a call failing with the given
+    exceptions before succeeding
+    """
+    policy = RetryPolicy(
+        min_delay=0.01, max_delay=0.01, sleep=lambda x: None, **kwargs
+    )
+    sent = []
+
+    def call(method, args):
+        sent.append(method)
+        if len(sent) <= len(calls):
+            raise calls[len(sent) - 1]
+        return "result"
+
+    return policy, call, sent
+
+
+def test_policy_retries_reading_calls():
+    policy, call, sent = _policy([ConnectionResetError(), TimeoutError()])
+    assert policy.middleware(call, "system.listSystems", ()) == "result"
+    assert len(sent) == 3
+
+
+def test_policy_gives_up_after_retries():
+    policy, call, sent = _policy([ConnectionResetError()] * 3, retries=2)
+    with pytest.raises(ConnectionResetError):
+        policy.middleware(call, "system.listSystems", ())
+    assert len(sent) == 3
+
+
+def test_policy_only_retries_changes_if_nothing_was_sent():
+    policy, call, sent = _policy([ConnectionResetError()])
+    with pytest.raises(ConnectionResetError):
+        policy.middleware(call, "system.scheduleReboot", (1,))
+    assert len(sent) == 1
+
+    policy, call, sent = _policy([ConnectionRefusedError()])
+    assert policy.middleware(call, "system.scheduleReboot", (1,)) == "result"
+    assert len(sent) == 2
+
+
+def test_policy_does_not_retry_faults():
+    policy, call, sent = _policy([Fault(-1, "Internal server error")])
+    with pytest.raises(Fault):
+        policy.middleware(call, "system.listSystems", ())
+    assert len(sent) == 1
+    assert policy.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_policy_fails_fast_while_circuit_is_open():
+    policy, call, sent = _policy(
+        [ConnectionResetError()] * 10,
+        breaker=CircuitBreaker(failure_threshold=2, clock=Clock())
+    )
+    with pytest.raises(CircuitOpenException):
+        policy.middleware(call, "system.listSystems", ())
+    assert len(sent) == 2
+    with pytest.raises(CircuitOpenException):
+        policy.middleware(call, "system.listSystems", ())
+    assert len(sent) == 2